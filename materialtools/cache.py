@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""on-disk cache of imported material data
+
+:meth:`materialtools.MaterialData.import_file` with ``cache=True`` stores
+the parsed contents of each source file in a binary file (see
+:func:`materialtools.columnar.save`) in :data:`directory`. Later imports of
+the same file memory-map the stored values instead of parsing it again.
+
+An entry is used only if the source file still has the size and
+modification time it had when the entry was stored, and, for
+``cache='hash'``, the same sha256 digest. Once the entries take up more
+than :data:`maxsize` bytes, the least recently used ones are deleted.
+
+Example
+-------
+
+    from materialtools import MaterialData, cache
+    cache.configure(directory='/scratch/materialtools', maxsize=2**30)
+    materialdata = MaterialData()
+    materialdata.import_file('library.xml', cache=True)
+
+.. moduleauthor:: adlhancock
+"""
+import hashlib
+import json
+import os
+
+from materialtools import columnar
+
+## directory holding the cache entries
+directory = os.environ.get('MATERIALTOOLS_CACHE',
+                           os.path.join(os.path.expanduser('~'),
+                                        '.cache', 'materialtools'))
+## maximum total size of the cache entries in bytes
+maxsize = 512 * 2**20
+## file extension of cache entries
+extension = '.mtc'
+
+
+def configure(directory=None, maxsize=None):
+    """ sets the cache directory and/or its maximum size in bytes """
+    if directory is not None: globals()['directory'] = directory
+    if maxsize is not None: globals()['maxsize'] = maxsize
+
+
+def digest(filename, blocksize=2**20):
+    """ sha256 hex digest of a file's contents """
+    sha = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(blocksize), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def key(filename, **kwargs):
+    """ identifies the cache entry for a source file and the reader
+    arguments used to import it """
+    text = json.dumps([os.path.abspath(filename), kwargs], sort_keys=True,
+                      default=str)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def _source(filename, hashed=False):
+    """ the details of a source file that an entry must match """
+    status = os.stat(filename)
+    source = {'path': os.path.abspath(filename),
+              'size': status.st_size,
+              'mtime': status.st_mtime_ns}
+    if hashed is True: source['sha256'] = digest(filename)
+    return source
+
+
+def entry(filename, **kwargs):
+    """ path of the cache entry for a source file """
+    return os.path.join(directory, key(filename, **kwargs) + extension)
+
+
+def is_current(cachefile, filename, hashed=False):
+    """ True if a cache entry was stored from the current version of a
+    source file """
+    try:
+        stored = columnar.metadata(cachefile)
+    except (OSError, ValueError):
+        return False
+    source = _source(filename)
+    if any(stored.get(k) != v for k, v in source.items()): return False
+    if hashed is True: return stored.get('sha256') == digest(filename)
+    return True
+
+
+def load(filename, hashed=False, verbose=False, **kwargs):
+    """ returns the cached material data for a source file, or None if
+    there is no current entry
+
+    Parameters
+    ----------
+        filename
+            source file
+        hashed
+            also compare the sha256 digest of the source file
+        **kwargs
+            reader arguments the file was imported with
+    """
+    cachefile = entry(filename, **kwargs)
+    if not os.path.isfile(cachefile): return None
+    if not is_current(cachefile, filename, hashed):
+        if verbose is True: print('[cache.py] stale entry for', filename)
+        return None
+    materialdata = columnar.load(cachefile)
+    os.utime(cachefile)
+    if verbose is True: print('[cache.py] loaded', filename, 'from', cachefile)
+    return materialdata
+
+
+def store(materialdata, filename, hashed=False, verbose=False, **kwargs):
+    """ stores material data imported from a source file
+
+    Parameters
+    ----------
+        materialdata
+            data imported from ``filename``
+        filename
+            source file
+        hashed
+            also store the sha256 digest of the source file
+        **kwargs
+            reader arguments the file was imported with
+
+    Returns
+    -------
+        path of the cache entry
+    """
+    os.makedirs(directory, exist_ok=True)
+    cachefile = entry(filename, **kwargs)
+    temporary = '{}.{}.tmp'.format(cachefile, os.getpid())
+    try:
+        columnar.save(materialdata, temporary,
+                      metadata=_source(filename, hashed))
+        os.replace(temporary, cachefile)
+    finally:
+        if os.path.exists(temporary): os.remove(temporary)
+    if verbose is True: print('[cache.py] stored', filename, 'in', cachefile)
+    evict()
+    return cachefile
+
+
+def entries():
+    """ cache entries as (path, size, last used) tuples, oldest first """
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    found = []
+    for name in names:
+        if name.endswith(extension):
+            path = os.path.join(directory, name)
+            try: status = os.stat(path)
+            except FileNotFoundError: continue
+            found.append((path, status.st_size, status.st_mtime))
+    return sorted(found, key=lambda e: e[2])
+
+
+def evict(size=None):
+    """ deletes the least recently used entries until the cache is no
+    larger than ``size`` bytes (default :data:`maxsize`) """
+    if size is None: size = maxsize
+    found = entries()
+    total = sum(e[1] for e in found)
+    for path, entrysize, _ in found:
+        if total <= size: break
+        try: os.remove(path)
+        except FileNotFoundError: pass
+        total -= entrysize
+
+
+def clear():
+    """ deletes every cache entry """
+    evict(0)
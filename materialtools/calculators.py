@@ -6,6 +6,25 @@ Includes a couple of figures of merit as well as tools for checking and updating
 .. :author:: dhancock
 
 """
+import numpy as np
+
+## this is the list of properties needed to calculate the thermal stress fom
+fom_properties = (["Ultimate Tensile Strength"]*2,
+                  ["Thermal Conductivity"]*2,
+                  ["Coefficient of Thermal Expansion"]*2,
+                  ["Elasticity","Poisson's Ratio"],
+                  ["Elasticity","Young's Modulus"])
+
+def _has_parameter(material, propertyname, parametername):
+    """ True if a material has a property with the named parameter, or a
+    :class:`MaterialProperty.Calculated` property, which is evaluated
+    directly whatever parameter is asked for """
+    from materialtools import MaterialProperty
+    if propertyname not in material: return False
+    materialproperty = material[propertyname]
+    if isinstance(materialproperty, MaterialProperty.Calculated): return True
+    return parametername in materialproperty
+
 
 def thermal_stress_fom(material,temperature=20,verbose = False):
     r"""Calculates the Thermal Stress Figure of Merit (**M**) for a :class:`Material`
@@ -45,12 +64,7 @@ def thermal_stress_fom(material,temperature=20,verbose = False):
     """
     
     
-    ## this is the list of properties needed to calculate the fom
-    properties = (["Ultimate Tensile Strength"]*2,
-                  ["Thermal Conductivity"]*2,
-                  ["Coefficient of Thermal Expansion"]*2,
-                  ["Elasticity","Poisson's Ratio"],
-                  ["Elasticity","Young's Modulus"])
+    properties = fom_properties
     
     ## check that the material has the properties needed
     for p in properties:
@@ -58,7 +72,7 @@ def thermal_stress_fom(material,temperature=20,verbose = False):
                                                              material.name,
                                                              material.source)
         ## check each property has the parameters needed        
-        assert p[1] in material[p[0]], \
+        assert _has_parameter(material, p[0], p[1]), \
             "{} not found in {} for {} [{}]".format(p[1],
                                                     p[0], 
                                                     material.name, 
@@ -87,6 +101,106 @@ def thermal_stress_fom(material,temperature=20,verbose = False):
     ## calculate M
     M = (uts * k_th * (1 - nu)) / (a_th * E)
     return M
+
+
+def thermal_stress_fom_matrix(materials,
+                              temperatures,
+                              method = "linear",
+                              tolerance = 100,
+                              verbose = False,
+                              workers = None,
+                              shared = False):
+    r"""Calculates the Thermal Stress Figure of Merit (**M**) for many
+    materials at many temperatures
+    
+    Same equation as :func:`thermal_stress_fom`, but each property is 
+    interpolated once per material over the whole temperature array using
+    :meth:`materialtools.Material.get_values`.
+    
+    Parameters
+    ----------
+        materials:
+            :class:`materialtools.MaterialData`, or a sequence of 
+            :class:`materialtools.Material` objects. For a 
+            :class:`materialtools.MaterialData` the rows follow its 
+            :class:`materialtools.Material` entries in order, other entries
+            are ignored; a sequence must contain only 
+            :class:`materialtools.Material` objects.
+        temperatures:
+            array of temperatures
+        method:
+            interpolation method, see :meth:`materialtools.Material.get_value`
+        tolerance:
+            see :meth:`materialtools.Material.get_value`
+        verbose:
+           :class:`bool`
+        workers:
+            if given, the temperatures are split across this many processes
+            using :func:`materialtools.parallel.sweep`
+        shared:
+            with ``workers``, share the material tables with the workers
+            through shared memory rather than copying them
+    
+    Returns
+    -------
+        M: 
+            :class:`numpy.ndarray` of shape 
+            ``(len(materials),) + temperatures.shape``, one row per material
+            in the order given, ``nan`` where a property is missing or has
+            no value at that temperature
+    """
+    from materialtools import Material
+    if isinstance(materials, Material):
+        materials = [materials]
+    elif isinstance(materials, dict):
+        materials = [m for m in materials.values() if isinstance(m, Material)]
+    else:
+        materials = list(materials)
+        for m in materials:
+            if not isinstance(m, Material):
+                raise TypeError("expected Material objects, not {}".format(
+                    type(m).__name__))
+    temperatures = np.asarray(temperatures, dtype=float)
+
+    if workers is not None:
+        from materialtools import parallel
+        return parallel.sweep(thermal_stress_fom_matrix,
+                              (materials,),
+                              {"temperatures": temperatures},
+                              workers = workers,
+                              shared = shared,
+                              method = method,
+                              tolerance = tolerance,
+                              verbose = verbose)
+
+    M = np.full((len(materials),) + temperatures.shape, np.nan)
+    for i, material in enumerate(materials):
+        ## skip materials without the properties needed
+        missing = [p for p in fom_properties
+                    if not _has_parameter(material, p[0], p[1])]
+        if len(missing) > 0:
+            if verbose is True: 
+                print("{} not found in {} [{}]".format(
+                    ', '.join(p[1] for p in missing), 
+                    material.name, 
+                    material.source))
+            continue
+        ## leave the row as nan if this material's values can't be used
+        try:
+            uts, k_th, a_th, nu, E = (material.get_values(p[0],
+                                                          temperatures,
+                                                          'Temperature',
+                                                          p[1],
+                                                          method=method,
+                                                          tolerance=tolerance)
+                                      for p in fom_properties)
+        except (ValueError, TypeError, KeyError) as error:
+            if verbose is True:
+                print("Could not calculate M for {} [{}]: {}".format(
+                    material.name, material.source, error))
+            continue
+        M[i] = (uts * k_th * (1 - nu)) / (a_th * E)
+    return M
     
     
 def thermal_missmatch_stress(material1, 
@@ -96,7 +210,11 @@ def thermal_missmatch_stress(material1,
                              heat_flux,
                              htc,
                              T_coolant,
-                             T_ref = 293):
+                             T_ref = 293,
+                             convergence = None,
+                             max_iterations = 3,
+                             acceleration = None,
+                             full_output = False):
     r""" Calculates Thermal mismatch stress
     
     Parameters
@@ -119,11 +237,27 @@ def thermal_missmatch_stress(material1,
         
         T_ref:
             reference temperature in :math:`K`
+        
+        convergence, max_iterations, acceleration:
+            settings for the mean temperature iteration,
+            see :func:`solve_layer_temperatures`. By default the mean 
+            temperatures are updated ``max_iterations`` (3) times and the
+            elastic properties are taken at the temperatures of the last
+            update. Give ``convergence`` (e.g. ``0.01``, with a larger 
+            ``max_iterations``) to iterate until the temperatures change by
+            less than this, with every property at the solved temperatures.
+        
+        full_output:
+            if True, also return the solver information
     
     Returns
     -------
         mismatch_stress:
             thermal mismatch stress in :math:`Pa`    
+        
+        info:
+            only if ``full_output`` is True, 
+            see :func:`solve_layer_temperatures`
     
     Calculation
     -----------
@@ -160,13 +294,56 @@ def thermal_missmatch_stress(material1,
     :math:`E_1` and :math:`E_2` are Young's moduli
 
     """    
+    if convergence is None and acceleration is None and full_output is False:
+        return _fixed_iteration_stress(material1, 
+                                       material2,
+                                       thickness_1,
+                                       thickness_2,
+                                       heat_flux,
+                                       htc,
+                                       T_coolant,
+                                       T_ref,
+                                       max_iterations)
+    stress, info = thermal_missmatch_stress_sweep(material1,
+                                                  material2,
+                                                  thickness_1,
+                                                  thickness_2,
+                                                  heat_flux,
+                                                  htc,
+                                                  T_coolant,
+                                                  T_ref,
+                                                  convergence = convergence,
+                                                  max_iterations = max_iterations,
+                                                  acceleration = acceleration,
+                                                  full_output = True)
+    if np.isnan(stress):
+        raise ValueError("no property values available within tolerance "+
+                         "for {} and {}".format(material1.name, material2.name))
+    mismatch_stress = float(stress)
+    #print("T_{:},mean = {:3.0f}, T_{:},mean = {:3.0f}".format(material1.name,T1mean-273,material2.name,T2mean-273))    
+    
+    if full_output is True: return mismatch_stress, info
+    return mismatch_stress
+
+
+def _fixed_iteration_stress(material1, 
+                            material2,
+                            thickness_1,
+                            thickness_2,
+                            heat_flux,
+                            htc,
+                            T_coolant,
+                            T_ref = 293,
+                            iterations = 3):
+    """ scalar :func:`thermal_missmatch_stress` with a fixed number of 
+    temperature updates """
     q = heat_flux
     h = htc
 
     T1,T2 = T_coolant, T_coolant
     method = "linear"
     tolerance = 200
-    for iteration in range(3):
+    for iteration in range(iterations):
         a1, a2  = (material.get_value('Coefficient of Thermal Expansion',
                                       T,
                                       method=method,
@@ -203,8 +380,291 @@ def thermal_missmatch_stress(material1,
     
     mismatch_stress = (a2*(T2mean-T_ref) - a1*(T1mean-T_ref)) / \
                             (((1-nu2)*t1)/(t2*E2) + (1-nu1)/E1)
-    #print("T_{:},mean = {:3.0f}, T_{:},mean = {:3.0f}".format(material1.name,T1mean-273,material2.name,T2mean-273))    
+    return mismatch_stress
+
+
+def _elastic_properties(material, T, method="linear", tolerance=200):
+    """ returns arrays of (CTE, Poisson's ratio, Young's modulus) for a 
+    material at the temperatures ``T`` """
+    a = material.get_values('Coefficient of Thermal Expansion',
+                            T,
+                            method=method,
+                            tolerance=tolerance)
+    nu = material.get_values('Elasticity',
+                             T,
+                             'Temperature',
+                             "Poisson's Ratio",
+                             method=method,
+                             tolerance=tolerance)
+    E = material.get_values('Elasticity',
+                            T,
+                            'Temperature',
+                            "Young's Modulus",
+                            method=method,
+                            tolerance=tolerance)
+    return a, nu, E
+
+
+def _aitken(x0, x1, x2):
+    """ Aitken delta-squared extrapolation of three fixed point iterates """
+    denominator = x2 - 2*x1 + x0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = x0 - (x1 - x0)**2/denominator
+    return np.where(np.isfinite(x) & (np.abs(denominator) > 1e-12), x, x2)
+
+
+def solve_layer_temperatures(material1,
+                             material2,
+                             thickness_1,
+                             thickness_2,
+                             heat_flux,
+                             htc,
+                             T_coolant,
+                             convergence = 0.01,
+                             max_iterations = 50,
+                             acceleration = None,
+                             method = "linear",
+                             tolerance = 200):
+    r""" Solves for the mean layer temperatures used in 
+    :func:`thermal_missmatch_stress`
+    
+    The temperatures depend on the thermal conductivities, which depend on
+    the temperatures, so they are found by fixed point iteration:
     
+    .. math::
+        
+      T_{1,mean} & = T_{coolant} + \frac{q}{h} + \frac{q.t_1}{2.k_1(T_{1,mean})}\\
+      T_{2,mean} & = T_{coolant} + \frac{q}{h} + \frac{q.t_1}{k_1(T_{1,mean})} 
+                    + \frac{q.t_2}{2.k_2(T_{2,mean})}\\
+    
+    Inputs may be arrays, which are broadcast together. Each point stops 
+    iterating once it has converged, so later iterations only evaluate the
+    points that are still changing.
+    
+    Parameters
+    ----------
+        material1, material2, thickness_1, thickness_2, heat_flux, htc, T_coolant:
+            see :func:`thermal_missmatch_stress`
+        
+        convergence:
+            a point has converged when neither temperature changes by more
+            than this in an iteration. If None, every point is updated 
+            exactly ``max_iterations`` times.
+        
+        max_iterations:
+            maximum number of iterations
+            
+        acceleration:
+            ``None`` for plain fixed point iteration, or ``"aitken"`` to 
+            extrapolate each pair of iterations with Aitken's delta-squared
+            method
+        
+        method, tolerance:
+            property interpolation settings, 
+            see :meth:`materialtools.Material.get_value`
+    
+    Returns
+    -------
+        T1mean, T2mean:
+            :class:`numpy.ndarray` of mean layer temperatures
+        
+        info:
+            :class:`dict` of arrays with the broadcast shape:
+            ``"iterations"`` (number of temperature updates evaluated),
+            ``"residual"`` (largest temperature change in the last update),
+            ``"converged"``, and ``"T1previous"`` and ``"T2previous"`` (the
+            temperatures the last update was evaluated at)
+    """
+    if acceleration not in (None, "aitken"):
+        raise ValueError("acceleration must be None or 'aitken', not {}".format(
+                                                                acceleration))
+    t1, t2, q, h, T_c = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x 
+                            in (thickness_1, thickness_2, heat_flux, htc, 
+                                T_coolant)))
+    shape = t1.shape
+    t1, t2, q, h, T_c = (x.ravel() for x in (t1, t2, q, h, T_c))
+
+    def update(i, T1, T2):
+        """ one fixed point update for the points ``i`` """
+        k1 = material1.get_values('Thermal Conductivity',
+                                  T1,
+                                  method=method,
+                                  tolerance=tolerance)
+        k2 = material2.get_values('Thermal Conductivity',
+                                  T2,
+                                  method=method,
+                                  tolerance=tolerance)
+        T_surface = T_c[i] + q[i]/h[i]
+        return (T_surface + (q[i]*t1[i])/(2*k1),
+                T_surface + (q[i]*t1[i])/k1 + (q[i]*t2[i])/(2*k2))
+
+    T1, T2 = T_c.copy(), T_c.copy()
+    P1, P2 = T_c.copy(), T_c.copy()
+    iterations = np.zeros(T1.shape, dtype=int)
+    residual = np.full(T1.shape, np.inf)
+    converged = np.zeros(T1.shape, dtype=bool)
+    active = np.arange(T1.size)
+    for iteration in range(max_iterations):
+        if active.size == 0: break
+        x1, x2 = T1[active], T2[active]
+        P1[active], P2[active] = x1, x2
+        g1, g2 = update(active, x1, x2)
+        iterations[active] += 1
+        r = np.maximum(np.abs(g1 - x1), np.abs(g2 - x2))
+        if acceleration == "aitken":
+            gg1, gg2 = update(active, g1, g2)
+            iterations[active] += 1
+            r = np.maximum(np.abs(gg1 - g1), np.abs(gg2 - g2))
+            P1[active], P2[active] = g1, g2
+            g1, g2 = _aitken(x1, g1, gg1), _aitken(x2, g2, gg2)
+        T1[active], T2[active] = g1, g2
+        residual[active] = r
+        if convergence is None: finished = np.zeros(r.shape, dtype=bool)
+        else: finished = r <= convergence
+        converged[active[finished]] = True
+        active = active[~(finished | np.isnan(r))]
+
+    info = {"iterations": iterations.reshape(shape),
+            "residual": residual.reshape(shape),
+            "converged": converged.reshape(shape),
+            "T1previous": P1.reshape(shape),
+            "T2previous": P2.reshape(shape)}
+    return T1.reshape(shape), T2.reshape(shape), info
+
+
+def sweep_grid(*arrays):
+    """ reshapes 1d arrays so they broadcast to an n-dimensional grid
+    
+    ``sweep_grid(x, y, z)`` gives arrays of shape ``(nx,1,1)``, 
+    ``(1,ny,1)`` and ``(1,1,nz)``, like :func:`numpy.ix_` but for values 
+    rather than indices.
+    """
+    arrays = [np.atleast_1d(np.asarray(a, dtype=float)).ravel() 
+              for a in arrays]
+    n = len(arrays)
+    return [a.reshape((1,)*i + (-1,) + (1,)*(n-i-1)) 
+            for i, a in enumerate(arrays)]
+
+
+def thermal_missmatch_stress_sweep(material1,
+                                   material2,
+                                   thickness_1,
+                                   thickness_2,
+                                   heat_flux,
+                                   htc,
+                                   T_coolant,
+                                   T_ref = 293,
+                                   grid = False,
+                                   method = "linear",
+                                   tolerance = 200,
+                                   convergence = None,
+                                   max_iterations = 3,
+                                   acceleration = None,
+                                   full_output = False,
+                                   workers = None,
+                                   shared = False):
+    r""" Calculates thermal mismatch stress over a design space
+    
+    Same calculation as :func:`thermal_missmatch_stress`, but any of 
+    ``thickness_1``, ``thickness_2``, ``heat_flux``, ``htc`` and 
+    ``T_coolant`` may be arrays. Material properties are interpolated with
+    :meth:`materialtools.Material.get_values` over all points at once.
+    
+    Parameters
+    ----------
+        material1, material2:
+            :class:`materialtools.Material` objects for the armour and
+            substructure respectively
+        
+        thickness_1, thickness_2, heat_flux, htc, T_coolant, T_ref:
+            as :func:`thermal_missmatch_stress`, scalars or arrays
+        
+        grid:
+            if True, the five inputs are treated as the axes of a grid
+            (see :func:`sweep_grid`) rather than broadcast together
+            
+        method, tolerance:
+            property interpolation settings, 
+            see :meth:`materialtools.Material.get_value`
+            
+        convergence, max_iterations, acceleration:
+            settings for the mean temperature iteration, 
+            see :func:`thermal_missmatch_stress`
+        
+        full_output:
+            if True, also return the solver information
+            
+        workers:
+            if given, the design space is split across this many processes
+            using :func:`materialtools.parallel.sweep`
+            
+        shared:
+            with ``workers``, share the material tables with the workers
+            through shared memory rather than copying them
+    
+    Returns
+    -------
+        mismatch_stress:
+            :class:`numpy.ndarray` of thermal mismatch stress in :math:`Pa`
+            with the broadcast (or grid) shape of the inputs, ``nan`` where 
+            a property value is not available
+        
+        info:
+            only if ``full_output`` is True, the ``info`` dict from
+            :func:`solve_layer_temperatures` plus the mean temperatures
+            ``"T1mean"`` and ``"T2mean"``
+    """
+    if grid is True:
+        t1, t2, q, h, T_c = sweep_grid(thickness_1, thickness_2, heat_flux, 
+                                       htc, T_coolant)
+    else:
+        t1, t2, q, h, T_c = (np.asarray(x, dtype=float) for x in 
+                             (thickness_1, thickness_2, heat_flux, 
+                              htc, T_coolant))
+
+    if workers is not None:
+        from materialtools import parallel
+        return parallel.sweep(thermal_missmatch_stress_sweep,
+                              (material1, material2),
+                              {"thickness_1": t1,
+                               "thickness_2": t2,
+                               "heat_flux": q,
+                               "htc": h,
+                               "T_coolant": T_c,
+                               "T_ref": T_ref},
+                              workers = workers,
+                              shared = shared,
+                              method = method,
+                              tolerance = tolerance,
+                              convergence = convergence,
+                              max_iterations = max_iterations,
+                              acceleration = acceleration,
+                              full_output = full_output)
+
+    T1mean, T2mean, info = solve_layer_temperatures(material1,
+                                                    material2,
+                                                    t1,
+                                                    t2,
+                                                    q,
+                                                    h,
+                                                    T_c,
+                                                    convergence,
+                                                    max_iterations,
+                                                    acceleration,
+                                                    method,
+                                                    tolerance)
+    ## the fixed iteration takes the properties at the last update's 
+    ## temperatures, a converged solution at the solved temperatures
+    if convergence is None: T1, T2 = info["T1previous"], info["T2previous"]
+    else: T1, T2 = T1mean, T2mean
+    a1, nu1, E1 = _elastic_properties(material1, T1, method, tolerance)
+    a2, nu2, E2 = _elastic_properties(material2, T2, method, tolerance)
+
+    mismatch_stress = (a2*(T2mean-T_ref) - a1*(T1mean-T_ref)) / \
+                            (((1-nu2)*t1)/(t2*E2) + (1-nu1)/E1)
+    if full_output is True:
+        info.update(T1mean=T1mean, T2mean=T2mean)
+        return mismatch_stress, info
     return mismatch_stress
 
 
@@ -4,6 +4,13 @@ Created on Wed Nov  9 11:58:36 2016
 
 @author: dhancock
 """
+from math import isnan
+
+import numpy as np
+
+from materialtools.interpolate import scalars
+from materialtools.classes import materialproperty as _properties
+from materialtools.classes.materialproperty import MaterialProperty
 
 class Material(dict):
     """Dictionary-based Material object containing MaterialProperty objects
@@ -83,7 +90,8 @@ class Material(dict):
             tolerance (:class:`float`):
                 allows for non-exact values
             method (:class:`str`):
-                "linear" regression or "nearest" value
+                "linear" regression, "nearest" value, or "spline", "pchip"
+                or "akima" piecewise cubic interpolation
                 
         Returns
         -------
@@ -96,6 +104,51 @@ class Material(dict):
         
         """
         
+        # look up arrays of values in one pass
+        if not isinstance(p2val, scalars) and np.ndim(p2val) > 0:
+            return self.get_values(propertyname, p2val, parameter2, parameter1,
+                                   verbose, tolerance, method)
+
+        # reuse previous lookups if the cache is enabled
+        lookups = self.__dict__.get('_lookups')
+        if lookups is not None:
+            # drop everything once any property or parameter has changed
+            if self._lookupversion != _properties.version:
+                lookups.clear()
+                self._lookupversion = _properties.version
+            key = (propertyname, p2val, parameter2, parameter1, method, 
+                   tolerance)
+            try:
+                value = lookups[key]
+            except KeyError:
+                pass
+            except TypeError:
+                key = None
+            else:
+                lookups.move_to_end(key)
+                self._lookupstats['hits'] += 1
+                return value
+            self._lookupstats['misses'] += 1
+            value = self._get_value(propertyname, p2val, parameter2, parameter1,
+                                    verbose, tolerance, method)
+            if key is not None:
+                lookups[key] = value
+                if len(lookups) > self._lookupstats['maxsize']:
+                    lookups.popitem(last=False)
+            return value
+        return self._get_value(propertyname, p2val, parameter2, parameter1,
+                               verbose, tolerance, method)
+
+    def _get_value(self,
+                   propertyname,
+                   p2val,
+                   parameter2,
+                   parameter1,
+                   verbose,
+                   tolerance,
+                   method):
+        """ uncached :meth:`get_value` for a single value """
+
         # calculate fom if it doesn't exist already'
         if propertyname == "Thermal Stress FOM":
             assert parameter2 == "Temperature", "index value must be a temperature"
@@ -107,6 +160,11 @@ class Material(dict):
         assert propertyname in self, '{} not found in {}'.format(propertyname,
                                                                  self.name)
 
+        ## evaluate polynomial properties directly
+        if isinstance(self[propertyname], MaterialProperty.Calculated):
+            if p2val is None: p2val = min(self[propertyname].temperaturerange)
+            return self[propertyname].value(p2val, tolerance, strict=True)
+
         if parameter1 == 'auto': parameter1 = propertyname
 
         ## check this property has these parameters
@@ -126,75 +184,235 @@ class Material(dict):
         ## if no index specified, return first value
         if p2val is None: return values[0]
 
-        ## get list of values for parameter2
-        p2values = self[propertyname][parameter2]['Values']
-
-        ## locate value by index if possible
-        if p2val in p2values: 
-            return values[p2values.index(p2val)]
-
-        elif method is "nearest":
-            ## if precise value for property not found, find nearest
-            differences = [abs(x-p2val) for x in p2values]
+        ## get the sorted breakpoints for this pair of parameters
+        index = self._index(propertyname, parameter2, parameter1, values)
 
-            bestlocation = differences.index(min(differences))
-            bestp2value = p2values[bestlocation]
-            bestvalue = values[bestlocation]
-            if min(differences) > tolerance:
+        if method == "nearest":
+            ## find the nearest value within tolerance
+            bestvalue = index.evaluate(p2val, method, tolerance)
+            if isnan(bestvalue):
                 if verbose is True:
                     print(
                 "No value for {} of {} available within {} of {}".format(
-                    parameter1,self.name,tolerance,p2val)+\
-                "\nNearest value is {:} at {:}".format(bestvalue,bestp2value))
+                    parameter1,self.name,tolerance,p2val))
                 return None
-
-            if verbose is True:
+            if verbose is True and p2val not in index.xp:
                 print('WARNING:',parameter1,'not given for',
                       self.name,'at',parameter2,'=',p2val)
-                print('\tUsing nearest available value at',
-                      parameter2,'=',bestp2value)
-        elif method is "linear":
+                print('\tUsing nearest available value')
+        elif method == "linear":
             # get value by linear regression
-            xn = p2val
-
-            data = [x for x in zip(p2values,values)]
-
-            sorteddata = sorted(data+[(xn,None)])
-            loc = sorteddata.index((xn,None))        
-
-            if p2val < min(p2values):
-                if abs(p2val-p2values[0]) < tolerance:
+            if p2val < index.xmin:
+                if abs(p2val-index.xmin) < tolerance:
                     print("taking first value")
-                    bestvalue = values[0]
+                    bestvalue = index.fp[0]
                 else: 
-                    print("no value available within tolerance for {}".format(xn))
+                    print("no value available within tolerance for {}".format(p2val))
                     raise ValueError
-            elif p2val > max(p2values):
-                if abs(p2val-p2values[-1]) < tolerance:                    
+            elif p2val > index.xmax:
+                if abs(p2val-index.xmax) < tolerance:                    
                     print("taking last value")
-                    bestvalue = values[-1]
+                    bestvalue = index.fp[-1]
                 else: 
-                    print("no value available within tolerance for {}".format(xn))
+                    print("no value available within tolerance for {}".format(p2val))
                     raise ValueError
             else:
-                try: 
-                    x1,y1 = sorteddata[loc-1] 
-                    x2,y2 = sorteddata[loc+1] 
-                    bestvalue = y2 - (x2-xn)*(y2-y1)/(x2-x1)
-                except:
-                    print(x1,y1)
-                    print(x2,y2)
-                    print(xn,bestvalue)
+                bestvalue = index.evaluate(p2val, method, tolerance)
+                if isnan(bestvalue):
+                    print("no value available")
                     raise ValueError
-       
-            
         else:
-            print("no value available")
-            #raise ValueError
-        #print(bestvalue)
+            bestvalue = index.evaluate(p2val, method, tolerance)
+            if isnan(bestvalue):
+                print("no value available within tolerance for {}".format(p2val))
+                raise ValueError
+        bestvalue = float(bestvalue)
         return bestvalue
 
 
+    def get_values(self,
+                   propertyname,
+                   p2vals,
+                   parameter2 = 'Temperature',
+                   parameter1 = 'auto',
+                   verbose = False,
+                   tolerance = 100,
+                   method = "linear",
+                   strict = False):
+        """ return an array of values for a property in one vectorised pass
+
+        Same lookup rules as :meth:`get_value`, but ``p2vals`` may be any
+        array of values of ``parameter2`` (see :mod:`materialtools.interpolate`)
+        
+        Parameters
+        ----------
+            propertyname (:class:`str`): 
+                name of property
+                
+            p2vals (array_like): 
+                values of parameter 2 at which you want the values of 
+                parameter 1
+                
+            parameter2 (:class:`str`):
+                name of independent parameter            
+            
+            parameter1 (:class:`str`):
+                name of dependent parameter
+                
+            verbose (:class:`bool`):
+                how much detail do you want back?
+                
+            tolerance (:class:`float`):
+                allows for values outside the tabulated range
+                
+            method (:class:`str`):
+                "linear" regression, "nearest" value, or "spline", "pchip"
+                or "akima" piecewise cubic interpolation
+                
+            strict (:class:`bool`):
+                raise a :class:`ValueError` instead of returning ``nan``
+                where no value is available
+                
+        Returns
+        -------
+            values (:class:`numpy.ndarray`)
+                values of `parameter1` with the shape of `p2vals`, 
+                ``nan`` where no suitable value exists
+        """
+        p2vals = np.asarray(p2vals, dtype=float)
+
+        if propertyname == "Thermal Stress FOM":
+            assert parameter2 == "Temperature", "index value must be a temperature"
+            from materialtools.calculators import thermal_stress_fom_matrix
+            return thermal_stress_fom_matrix([self], p2vals, method, 
+                                             tolerance, verbose)[0]
+
+        ## check material has this property
+        assert propertyname in self, '{} not found in {}'.format(propertyname,
+                                                                 self.name)
+
+        ## evaluate polynomial properties directly
+        if isinstance(self[propertyname], MaterialProperty.Calculated):
+            return self[propertyname].value(p2vals, tolerance, strict)
+
+        if parameter1 == 'auto': parameter1 = propertyname
+
+        ## check this property has these parameters
+        for x in (parameter1,parameter2):
+            assert x in self[propertyname], \
+                "{} is not in {} for {} [{}]".format(
+                    x,propertyname,self.name,self.source)
+
+        try:
+            values = self[propertyname][parameter1]['Values']
+        except (KeyError, TypeError):
+            values = self[propertyname]["Values"]
+
+        index = self._index(propertyname, parameter2, parameter1, values)
+        result = index.evaluate(p2vals, method, tolerance)
+        
+        missing = np.isnan(result)
+        if missing.any():
+            if verbose is True:
+                print("No value for {} of {} available within {} at {}".format(
+                    parameter1, self.name, tolerance, p2vals[missing]))
+            if strict is True:
+                raise ValueError("no value available within tolerance for "+
+                                 "{} of {}".format(parameter1, self.name))
+        return result
+
+    def _index(self, propertyname, parameter2, parameter1, values):
+        """ returns the cached sorted breakpoints for a pair of parameters
+        
+        The index is built on first use and rebuilt if the parameter values
+        have been replaced since (see :meth:`invalidate`)
+        """
+        p2values = self[propertyname][parameter2]['Values']
+        indexes = self.__dict__.setdefault('_indexes', {})
+        key = (propertyname, parameter2, parameter1)
+        index = indexes.get(key)
+        if index is None or not index.is_current(p2values, values):
+            from materialtools.interpolate import BreakpointIndex
+            index = BreakpointIndex(p2values, values)
+            indexes[key] = index
+        return index
+
+    def enable_cache(self, maxsize=1024):
+        """ remembers the results of :meth:`get_value` calls
+        
+        Repeated calls with the same arguments return the stored value
+        instead of interpolating again. The least recently used results are
+        discarded once there are more than ``maxsize``. The cache is cleared
+        whenever a property is set or replaced through this Material, or a
+        :class:`MaterialProperty` or :class:`MaterialParameter` is changed 
+        (e.g. its ``'Values'`` replaced); call :meth:`invalidate` after 
+        editing individual values in place.
+        
+        Parameters
+        ----------
+            maxsize (:class:`int`):
+                maximum number of stored results
+        """
+        from collections import OrderedDict
+        self._lookups = OrderedDict()
+        self._lookupstats = {'hits': 0, 'misses': 0, 'maxsize': maxsize}
+        self._lookupversion = _properties.version
+
+    def disable_cache(self):
+        """ stops remembering :meth:`get_value` results """
+        self.__dict__.pop('_lookups', None)
+        self.__dict__.pop('_lookupstats', None)
+        self.__dict__.pop('_lookupversion', None)
+
+    def cache_info(self):
+        """ returns the :meth:`get_value` cache statistics
+        
+        Returns
+        -------
+            :class:`dict` of ``hits``, ``misses``, ``maxsize`` and 
+            ``currsize``, or :class:`None` if the cache is not enabled
+        """
+        lookups = self.__dict__.get('_lookups')
+        if lookups is None: return None
+        info = dict(self._lookupstats)
+        info['currsize'] = len(lookups)
+        return info
+
+    def invalidate(self, propertyname=None):
+        """ clears cached lookup data for one or all properties
+        
+        called automatically when properties are set or replaced
+        """
+        lookups = self.__dict__.get('_lookups')
+        if lookups: lookups.clear()
+        indexes = self.__dict__.get('_indexes')
+        if not indexes: return
+        if propertyname is None:
+            indexes.clear()
+        else:
+            for key in [k for k in indexes if k[0] == propertyname]:
+                del indexes[key]
+
+    def __setitem__(self, key, value):
+        self.invalidate(key)
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        self.invalidate(key)
+        dict.__delitem__(self, key)
+
+    def update(self, *args, **kwargs):
+        self.invalidate()
+        dict.update(self, *args, **kwargs)
+
+    def pop(self, key, *args):
+        self.invalidate(key)
+        return dict.pop(self, key, *args)
+
+    def clear(self):
+        self.invalidate()
+        dict.clear(self)
+
     def get_points(self,propertyname,parametername='Temperature',verbose=False):
         """ return all the values for a given :class:`MaterialParameter`
         
@@ -235,6 +453,7 @@ class Material(dict):
         """
         if parameter2name == 'auto': parameter2name = propertyname
 
+        self.invalidate(propertyname)
         newparameter = {propertyname:{
                             parameter1name:{'Values':parameter1values},
                             parameter2name:{'Values':parameter2values},
@@ -245,6 +464,33 @@ class Material(dict):
         self.update(newparameter)
         return
 
+    def compact(self, dtype='float64'):
+        """ stores the numeric values of every property as numpy arrays
+
+        see :meth:`materialtools.MaterialParameter.compact`
+        """
+        from materialtools import MaterialProperty
+        from materialtools.classes.materialproperty import _compact
+        for materialproperty in self.values():
+            if isinstance(materialproperty, MaterialProperty):
+                materialproperty.compact(dtype)
+            elif type(materialproperty) is dict:
+                _compact(materialproperty, dtype)
+                for parameter in materialproperty.values():
+                    if isinstance(parameter, dict):
+                        _compact(parameter, dtype)
+        return self
+
+    def _compact_dtype(self):
+        """ dtype name of the first compact parameter, or None """
+        for materialproperty in self.values():
+            if not isinstance(materialproperty, dict): continue
+            for parameter in materialproperty.values():
+                if isinstance(parameter, dict) and \
+                        isinstance(parameter.get('Values'), np.ndarray):
+                    return parameter['Values'].dtype.name
+        return None
+
     def plotproperty(self,
                      propertyname,
                      xaxis="Temperature",
@@ -264,27 +510,35 @@ class Material(dict):
     def populate_thermal_stress_fom(self,
                                     temperatures=range(0,2000,50),
                                     verbose=False,
+                                    dtype='auto',
                                     ):
-        """populates the thermal stress figure of merit"""
+        """populates the thermal stress figure of merit
+        
+        The values are stored as lists, or as numpy arrays of ``dtype``
+        (see :meth:`compact`). By default (``'auto'``) arrays are only used
+        if this material's values are already compact.
+        """
 	
-        from materialtools import MaterialProperty, MaterialParameter
-        from materialtools.calculators import thermal_stress_fom
+        from materialtools import MaterialParameter
+        from materialtools.calculators import thermal_stress_fom_matrix
         fomparameter = MaterialProperty(name = "Thermal Stress Figure of Merit",
                                   units = ['-'],
                                   source = "calculated")
+        temperatures = np.asarray(temperatures, dtype=float)
+        M = thermal_stress_fom_matrix([self], temperatures, verbose=verbose)[0]
+        calculated = np.isfinite(M)
+        if verbose is True:
+            for temp in temperatures[~calculated]:
+                print("could not calculate tosfm at {}".format(temp))
+        if dtype == 'auto': dtype = self._compact_dtype()
         temps = MaterialParameter(name="Temperature",
                                    units = ["C"],
-                                   values = [])
+                                   values = temperatures[calculated].tolist(),
+                                   dtype = dtype)
         tsfom = MaterialParameter(name="Thermal Stress Figure of Merit",
                                   units = ["-"],
-                                  values = [])
-        for temp in temperatures:
-             try:
-                 tsfom["Values"].append(thermal_stress_fom(self,temp,verbose))
-                 temps["Values"].append(temp)
-             except:
-                 if verbose is True: 
-                     print("could not calculate tosfm at {}".format(temp))
+                                  values = M[calculated].tolist(),
+                                  dtype = dtype)
         assert len(temps["Values"])>0, "Could not calculate any values for thermal stress fom for {}".format(self.name)
         fomparameter["Temperature"] = temps
         fomparameter["Thermal Stress Figure of Merit"] = tsfom
@@ -7,11 +7,88 @@ Created on Wed Nov  9 11:57:46 2016
 
 import sys
 import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from collections.abc import ItemsView, ValuesView
 
 
 import tkinter as tk
 from tkinter import filedialog
 
+from materialtools.classes.material import Material
+from materialtools.classes.matml import LazyMaterial
+
+
+def _reader(filename):
+    """ returns the :mod:`materialtools.read` function for a file, or None
+    if the extension is not recognised """
+    if filename.endswith('.txt'):
+        from materialtools.read import textfile as read
+    elif filename.endswith('.csv'):
+        from materialtools.read import csv as read
+    elif filename.endswith('.xml'):
+        from materialtools.read import matml as read
+    elif filename.endswith('.xlsx'):
+        from materialtools.read import xlsx as read
+    elif filename.endswith('.mtb'):
+        from materialtools.read import mtb as read
+    elif filename.endswith('.jsonl'):
+        from materialtools.read import jsonl as read
+    elif filename.endswith('.json'):
+        from materialtools.read import json as read
+    else:
+        return None
+    return read
+
+
+def _error_message(error):
+    """ one line description of an exception for :attr:`import_errors` """
+    return ''.join(traceback.format_exception_only(type(error), error)).strip()
+
+
+def _load_file(filename, read, cache=False, verbose=False, **kwargs):
+    """ reads a file, through the on-disk cache if ``cache`` is set (see
+    :meth:`MaterialData.import_file`) """
+    usecache = cache is not False and kwargs.get('lazy') is not True
+    hashed = cache == 'hash'
+    materialdata = None
+    if usecache is True:
+        from materialtools.cache import load
+        materialdata = load(filename, hashed, verbose, **kwargs)
+    if materialdata is None:
+        materialdata = read(filename=filename, **kwargs)
+        if usecache is True:
+            from materialtools.cache import store
+            store(materialdata, filename, hashed, verbose, **kwargs)
+    return materialdata
+
+
+def _compact(materialdata, compact):
+    """ applies the ``compact`` option of :meth:`MaterialData.import_file`
+    to newly imported materials """
+    from materialtools import Material
+    if compact is False: return
+    dtype = 'float64' if compact is True else compact
+    for m in dict.values(materialdata):
+        if type(m) is Material: m.compact(dtype)
+        elif type(m) is LazyMaterial: m.dtype = dtype
+
+
+def _read_file(filename, kwargs, cache=False):
+    """ reads one file in a worker process
+    
+    returns:
+        materialdata, error
+            the imported data and None, or None and the error message
+    """
+    try:
+        read = _reader(filename)
+        if read is None: 
+            raise ValueError('file extension not recognised')
+        return _load_file(filename, read, cache, **kwargs), None
+    except Exception as error:
+        return None, _error_message(error)
+
 
 class MaterialData(dict):
     """ Dictionary based object containing Material objects"""
@@ -22,7 +99,7 @@ class MaterialData(dict):
                  ):
         self.source = source
         self.filename = []
-        self.materialnames = []
+        self.import_errors = {}
         
         if source is not None:
             #print("##source is not none ##")
@@ -38,7 +115,163 @@ class MaterialData(dict):
             
             #self.import_directory
         return
-    
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if type(value) is LazyMaterial:
+            value = value.load()
+            self[key] = value
+        return value
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def __iter__(self):
+        # see MatMLData.__iter__: makes dict(), copy() and json load lazy 
+        # materials
+        return dict.__iter__(self)
+
+    def values(self):
+        # views load each lazy material as it is reached
+        return ValuesView(self)
+
+    def items(self):
+        return ItemsView(self)
+
+    def __setitem__(self, key, value):
+        if key in self: self._unindex(key)
+        dict.__setitem__(self, key, value)
+        self._index(key, value)
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self._unindex(key)
+
+    def pop(self, key, *default):
+        if key in self: self._unindex(key)
+        return dict.pop(self, key, *default)
+
+    def popitem(self):
+        key, value = dict.popitem(self)
+        self._unindex(key)
+        return key, value
+
+    def clear(self):
+        dict.clear(self)
+        self.__dict__.pop('_catalogue', None)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        if key not in self: self[key] = default
+        return self[key]
+
+    def _indexes(self):
+        """ keys of the materials by name, condition and data source
+        
+        The indexes are updated as materials are added, replaced and 
+        removed, so looking a material up by name does not scan the data. 
+        Changing the name, condition or source of a material that is 
+        already stored does not update them.
+        """
+        indexes = self.__dict__.get('_catalogue')
+        if indexes is None:
+            indexes = self.__dict__['_catalogue'] = {
+                'entries': {}, 'names': {}, 'conditions': {}, 'sources': {}}
+            for key, value in dict.items(self): self._index(key, value)
+        return indexes
+
+    def _index(self, key, value):
+        """ adds a material to the indexes """
+        if type(value) is LazyMaterial:
+            entry = (value.name, None, value.source)
+        elif type(value) is Material:
+            entry = (dict.get(value, "MaterialName"), 
+                     dict.get(value, "Condition"), 
+                     dict.get(value, "DataSource"))
+        else:
+            return
+        if type(value) is Material and 'idregistry' in self.__dict__:
+            self.__dict__['idregistry'].add_material(value)
+        indexes = self._indexes()
+        indexes['entries'][key] = entry
+        for field, item in zip(('names', 'conditions', 'sources'), entry):
+            try: indexes[field].setdefault(item, set()).add(key)
+            except TypeError: pass
+
+    def _unindex(self, key):
+        """ removes a material from the indexes """
+        indexes = self._indexes()
+        entry = indexes['entries'].pop(key, None)
+        if entry is None: return
+        for field, item in zip(('names', 'conditions', 'sources'), entry):
+            try: keys = indexes[field].get(item)
+            except TypeError: continue
+            if keys is None: continue
+            keys.discard(key)
+            if not keys: del indexes[field][item]
+
+    def _indexed(self, position):
+        """ one field of the index entries, in material order """
+        entries = self._indexes()['entries']
+        return [entries[key][position] for key in self if key in entries]
+
+    @property
+    def materialnames(self):
+        """ names of the materials, in order """
+        return self._indexed(0)
+
+    @property
+    def conditions(self):
+        """ conditions of the materials, in order """
+        return self._indexed(1)
+
+    @property
+    def sources(self):
+        """ data sources of the materials, in order """
+        return self._indexed(2)
+
+    def find(self, name=None, condition=None, source=None):
+        """ keys of the materials with all the given name, condition and 
+        data source, using the indexes
+        
+        Returns
+        -------
+            :class:`set` of keys
+        """
+        indexes = self._indexes()
+        found = None
+        for field, item in (('names', name), 
+                            ('conditions', condition), 
+                            ('sources', source)):
+            if item is None: continue
+            keys = indexes[field].get(item, set())
+            found = set(keys) if found is None else found & keys
+        return set(indexes['entries']) if found is None else found
+
+    def query(self, conditions, mode='all', tolerance=0,
+              parameter2='Temperature', bands=32, verbose=False,
+              parameter1='auto'):
+        """ keys of the materials whose properties satisfy every condition,
+        e.g. ``[('Thermal Conductivity', '>', 150, (400, 800)),
+        ('Density', '<', 8000)]``
+
+        See :func:`materialtools.query.query`. ``parameter1`` names the 
+        dependent parameter for conditions that do not give one. The range
+        index of each property is kept and reused until a material is 
+        added, removed or replaced or its indexed values are replaced.
+
+        Returns
+        -------
+            :class:`list` of keys, in material order
+        """
+        from materialtools.query import query
+        indexes = self.__dict__.setdefault('rangeindexes', {})
+        return query(self, conditions, mode, tolerance, parameter2, bands,
+                     indexes, verbose, parameter1)
+
     def import_material(self,
                         materialdata,
                         materialname,
@@ -64,8 +297,27 @@ class MaterialData(dict):
                     filename=None,
                     materialname = 'auto',
                     testing=False,
-                    verbose=False):
-        """ imports a single file """
+                    verbose=False,
+                    compact=False,
+                    cache=False,
+                    **kwargs):
+        """ imports a single file 
+        
+        if ``compact`` is True (or a numpy dtype such as ``'float32'``) the
+        imported values are stored as numpy arrays, see :meth:`compact`
+        
+        if ``cache`` is True the parsed file is stored in the on-disk cache
+        and later imports of the unchanged file are loaded from there (see 
+        :mod:`materialtools.cache`). ``cache='hash'`` also checks the 
+        file's sha256 digest. Values loaded from the cache are numpy arrays
+        memory-mapped from the cache entry. The cache is not used for 
+        ``lazy=True`` imports.
+        
+        other keyword arguments are passed to the reader in 
+        :mod:`materialtools.read`, e.g. ``streaming=True`` for xml files, or
+        ``lazy=True`` to only parse each xml material when it is first 
+        accessed
+        """
         
         from materialtools import Material #, MaterialParameter, MaterialProperty  
 
@@ -99,74 +351,90 @@ class MaterialData(dict):
                         #initialdir='./',
                         title = "Select material property file",
                         #initialdir = '/python/data/materialtools',
-                        filetypes = [('text, csv, or matml '+
-                            'material property file','*.txt;*.xml;*.csv;*.xlsx')])
+                        filetypes = [('text, csv, matml, json or binary '+
+                            'material property file',
+                            '*.txt;*.xml;*.csv;*.xlsx;*.mtb;*.json;*.jsonl')])
 
-        if filename.endswith('.txt'):
-            from materialtools.read import textfile as read
-        elif filename.endswith('.csv'):
-            from materialtools.read import csv as read
-        elif filename.endswith('.xml'):
-            from materialtools.read import matml as read
-        elif filename.endswith('.xlsx'):
-            from materialtools.read import xlsx as read
-        else:
+        read = _reader(filename)
+        if read is None:
             if filename in (None,''):
                 print('No file name given')
             else:
                 print('file extension not recognised')
                 print(filename)
         try:
-            materialdata = read(filename=filename,
-                                materialname=materialname)
+            materialdata = _load_file(filename, read, cache, verbose,
+                                      materialname=materialname, **kwargs)
             self.filename.append(filename)
-            for m in materialdata:
-                if type(materialdata[m]) is Material:
-                    if m in self.materialnames: 
-                        if verbose is True:
-                            response = input("{} exists. Append conditions to material names? [Y]".format(m))
-                        else:
-                            response = 'Yes'
-                            print("\n{} exists. Appending conditions to material names...".format(m))                        
-                        if response not in ['n','N','no']:
-                            newname = m + ' ({})'.format(materialdata[m]["Condition"])
-                            if newname in self: 
-                                newname += " ({})".format(materialdata[m]["DataSource"])
-                            print("...Creating {}".format(newname))
-                            if m in self:
-                                movedname = '{} ({})'.format(m,self[m]["Condition"])
-                                print("...Moving {} to {}".format(m,movedname))
-                                self[movedname] = self[m]
-                                print("...Deleting old {}".format(m))
-                                del self[m]
-                            print("\n")
-                        else:
-                            print("WARNING: overwriting properties for",m)
-                            newname = m
-                        self[newname] = materialdata[m]
-                            
-                    else:
-                        self[m] = materialdata[m]
+            self._merge(materialdata, interactive=verbose)
         except:
             print('[materialdata.py] No material properties imported')
             raise
-        self.materialnames = [x["MaterialName"] for x in self.values()
-            if type(x) is Material]
-        try:
-            self.sources = [x["DataSource"] for x in self.values()
-                if type(x) is Material]
-        except: pass
+        _compact(materialdata, compact)
         if verbose is True: 
             print('Materials in database:')
             [print('\t',name) for name in self.materialnames]
         return materialdata
         
+    def _merge(self, materialdata, interactive=False):
+        """ adds imported materials, renaming materials whose names exist
+        
+        A material that is already present is renamed by appending its
+        condition (and then its data source) to its name. If 
+        ``interactive`` is True the user is asked before renaming.
+        """
+        names = self._indexes()['names']
+        for m, value in dict.items(materialdata):
+            if type(value) in (Material, LazyMaterial):
+                if m in names: 
+                    if interactive is True:
+                        response = input("{} exists. Append conditions to material names? [Y]".format(m))
+                    else:
+                        response = 'Yes'
+                        print("\n{} exists. Appending conditions to material names...".format(m))                        
+                    if response not in ['n','N','no']:
+                        newname = m + ' ({})'.format(materialdata[m]["Condition"])
+                        if newname in self: 
+                            newname += " ({})".format(materialdata[m]["DataSource"])
+                        print("...Creating {}".format(newname))
+                        if m in self:
+                            movedname = '{} ({})'.format(m,self[m]["Condition"])
+                            print("...Moving {} to {}".format(m,movedname))
+                            self[movedname] = self[m]
+                            print("...Deleting old {}".format(m))
+                            del self[m]
+                        print("\n")
+                    else:
+                        print("WARNING: overwriting properties for",m)
+                        newname = m
+                    self[newname] = materialdata[m]
+
+                else:
+                    self[m] = value
+
     def import_directory(self, 
                          path = None, 
                          filetype = 'xlsx',
-                         verbose = False):
+                         verbose = False,
+                         workers = None,
+                         compact = False,
+                         cache = False,
+                         **kwargs):
+        
+        """ imports a directory 
+        
+        Files are imported in name order. By default each file is imported
+        with :meth:`import_file`. If ``workers`` is given, the files are 
+        read in a pool of that many processes (``1`` reads them in this 
+        process) and merged in name order without prompting. 
+        
+        Either way, a file that cannot be read no longer stops the import:
+        it is skipped and its error is stored in :attr:`import_errors`, 
+        keyed by file name, which is emptied at the start of each call.
         
-        """ imports a directory """
+        ``compact``, ``cache`` and other keyword arguments are used as in 
+        :meth:`import_file`
+        """
      
         
         if path is None:
@@ -178,17 +446,49 @@ class MaterialData(dict):
         
         if path.endswith('/') is False:
             path += '/'
-        files = [y for y in [x for x in os.listdir(path) 
-                                if x.endswith('.'+filetype)] 
-                                    if '~' not in y]
+        files = sorted(y for y in [x for x in os.listdir(path) 
+                                      if x.endswith('.'+filetype)] 
+                                          if '~' not in y)
         
-        materialdata = MaterialData()
-        for f in files:
+        self.import_errors = {}
+        filenames = [path+f for f in files]
+        if workers is None:
+            for filename in filenames:
+                if verbose is True: 
+                    print("Importing {}".format(filename))
+                try:
+                    self.import_file(filename, verbose=verbose, 
+                                     compact=compact, cache=cache, **kwargs)
+                except Exception as error:
+                    self.import_errors[filename] = _error_message(error)
+        elif workers == 1:
+            results = map(_read_file, filenames, [kwargs]*len(filenames),
+                          [cache]*len(filenames))
+            self._merge_files(filenames, results, verbose, compact)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = executor.map(_read_file, 
+                                       filenames, 
+                                       [kwargs]*len(filenames),
+                                       [cache]*len(filenames))
+                self._merge_files(filenames, results, verbose, compact)
+        if self.import_errors:
+            print("\n## {} file(s) could not be imported ##".format(
+                len(self.import_errors)))
+            [print('\t',f,':',e) for f,e in self.import_errors.items()]
+        return self
+
+    def _merge_files(self, filenames, results, verbose=False, compact=False):
+        """ merges the results of :func:`_read_file` in file order """
+        for filename, (materialdata, error) in zip(filenames, results):
+            if error is not None:
+                self.import_errors[filename] = error
+                continue
             if verbose is True: 
-                print("Importing {}".format(f))
-            self.import_file(path+f,verbose=verbose)
-        materialdata = self
-        return materialdata
+                print("Importing {}".format(filename))
+            self.filename.append(filename)
+            self._merge(materialdata)
+            _compact(materialdata, compact)
         
         
     def export_file(self,
@@ -201,6 +501,8 @@ class MaterialData(dict):
             from materialtools.write import csv as write
         elif filename.endswith('.json'):
             from materialtools.write import json as write
+        elif filename.endswith('.jsonl'):
+            from materialtools.write import jsonl as write
         elif filename.endswith('/'):
             print("Assuming folder means multiple xlsx files")
             from materialtools.write import xlsx as write
@@ -211,6 +513,8 @@ class MaterialData(dict):
             from materialtools.write import xlsx as write
         elif filename.endswith('.xml'):
             from materialtools.write import matml as write
+        elif filename.endswith('.mtb'):
+            from materialtools.write import mtb as write
         else:
             if filename is None:
                 print('No file name given')
@@ -222,6 +526,30 @@ class MaterialData(dict):
         output = write(self,filename,verbose,**kwargs)
         return output
         
+    def compact(self, dtype='float64'):
+        """ stores the numeric values of every material as numpy arrays
+        
+        Each :class:`MaterialParameter` keeps its dict interface but holds
+        its values in one contiguous ``dtype`` buffer and a single units
+        string, which is much smaller than lists of python floats.
+        
+        Parameters
+        ----------
+            dtype
+                ``'float64'`` (default) or ``'float32'``
+        """
+        from materialtools import Material
+        for material in self.values():
+            if type(material) is Material: material.compact(dtype)
+        return self
+
+    def enable_cache(self, maxsize=1024):
+        """ enables the :meth:`materialtools.Material.get_value` cache for 
+        every material """
+        from materialtools import Material
+        for material in self.values():
+            if type(material) is Material: material.enable_cache(maxsize)
+
     def list_contents(self,materials='all'):
         """ list contents of materialdata
         
@@ -238,38 +566,34 @@ class MaterialData(dict):
         
         """ generate unique property and parameter ids 
         
+        returns a dict of ids by name from :meth:`id_registry`, so names 
+        keep their ids between calls
         """
-        from materialtools import Material, MaterialParameter, MaterialProperty
-        
-        propertynames, parameternames, pau, pru = [],[],[],[]
-        ids = {}
-        materials = [m for m in self.values() 
-                        if type(m) is Material]
-        # get full lists
-        for material in materials:
-            properties = [p for p in material.values() 
-                            if type(p) is MaterialProperty]
-            for property in properties:
-                propertynames.append(property["Name"])
-                parameters = [p for p in property.values() 
-                                if type(p) is MaterialParameter]
-                for parameter in parameters:
-                    parameternames.append(parameter["Name"])
-                
-        # dedupe lists
-        [pau.append(x) for x in parameternames if x not in pau]
-        [pru.append(x) for x in propertynames if x not in pru]
-        
-        # generate numbers
-        for i,p in enumerate(pau):
-            ids[p]="pa{}".format(i)
-        for i,p in enumerate(pru):
-            ids[p]="pr{}".format(i)
-            
-        # save to materialdata object
-        self.ids = ids
+        self.ids = self.id_registry().ids()
+        return self.ids
+
+    def id_registry(self):
+        """ the :class:`materialtools.ids.IdRegistry` of this data
+        
+        Created from the current materials on first use and then updated 
+        as materials are added.
+        """
+        registry = self.__dict__.get('idregistry')
+        if registry is None:
+            from materialtools.ids import IdRegistry
+            registry = self.__dict__['idregistry'] = IdRegistry().add(self)
+        return registry
+
+    def load_ids(self, filename):
+        """ uses the ids saved by :meth:`save_ids`, adding ids for any new
+        names, so repeated exports keep the same ids """
+        from materialtools.ids import IdRegistry
+        self.__dict__['idregistry'] = IdRegistry.load(filename).add(self)
+        return self.__dict__['idregistry']
 
-        return ids
+    def save_ids(self, filename):
+        """ saves the property and parameter ids to a json file """
+        self.id_registry().save(filename)
         
         
         
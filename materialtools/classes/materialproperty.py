@@ -4,8 +4,89 @@ Created on Wed Nov  9 11:58:51 2016
 
 @author: dhancock
 """
+import numpy as np
 
-class MaterialProperty(dict):
+
+def _asarray(values, dtype='float64'):
+    """ returns numeric values as a contiguous numpy array
+
+    Missing values (:class:`None`) become ``nan``. Returns :class:`None` if
+    the values are not all numeric.
+    """
+    if values is None or isinstance(values, str):
+        return None
+    if not isinstance(values, np.ndarray):
+        try:
+            if not all(isinstance(v, (int, float, np.number)) or v is None
+                       for v in values):
+                return None
+        except TypeError:
+            return None
+    try:
+        return np.ascontiguousarray(values, dtype=dtype)
+    except (TypeError, ValueError):
+        return None
+
+
+def _compact(parameter, dtype='float64'):
+    """ converts the numeric values of a parameter-like dict in place
+
+    ``parameter['Values']`` becomes a contiguous numpy array of ``dtype`` and
+    repeated ``parameter['Units']`` entries collapse to a single string.
+    Missing values (:class:`None`) become ``nan``.
+
+    Returns
+    -------
+        :class:`bool`
+            True if the values are now held in an array
+    """
+    values = _asarray(parameter.get('Values'), dtype)
+    if values is None:
+        return False
+    parameter['Values'] = values
+    units = parameter.get('Units')
+    if type(units) is list and len(units) > 1 \
+            and all(u == units[0] for u in units):
+        parameter['Units'] = [units[0]]
+    return True
+
+
+#: incremented whenever a property or parameter is changed through its dict
+#: methods, so cached lookups (see :meth:`Material.enable_cache`) can tell
+#: when they may be out of date
+version = 0
+
+
+def _changed():
+    """ records that a property or parameter has changed """
+    global version
+    version += 1
+
+
+class _Tracked(dict):
+    """ dict that counts changes made through its methods """
+    def __setitem__(self, key, value):
+        _changed()
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        _changed()
+        dict.__delitem__(self, key)
+
+    def update(self, *args, **kwargs):
+        _changed()
+        dict.update(self, *args, **kwargs)
+
+    def pop(self, key, *args):
+        _changed()
+        return dict.pop(self, key, *args)
+
+    def clear(self):
+        _changed()
+        dict.clear(self)
+
+
+class MaterialProperty(_Tracked):
     
     def __init__(self, 
                  name = None,
@@ -19,12 +100,27 @@ class MaterialProperty(dict):
         self["Units"] = units
         self["Values"] = values
         self["Comments"] = comments
+
+    def compact(self, dtype='float64'):
+        """ stores the property and parameter values as numpy arrays
+
+        see :meth:`MaterialParameter.compact`
+        """
+        _compact(self, dtype)
+        for parameter in self.values():
+            if isinstance(parameter, MaterialParameter):
+                parameter.compact(dtype)
+            elif type(parameter) is dict:
+                _compact(parameter, dtype)
+        return self
         
     class Calculated:
         """
         a material property value in the format:
             self.value = a + b*T + c*T**2... +[x]*T**n
             given coefficients = [a,b,c,...x]
+            
+        valid for temperatures within ``temperaturerange``
         """
         def __init__(self,
                      name,
@@ -32,18 +128,93 @@ class MaterialProperty(dict):
                      coefficients=[0],
                      temperaturerange = [100,3000],
                      comments = "none"):
+            self.name = name
+            self.units = units
+            self.coefficients = [float(c) for c in coefficients]
+            self.temperaturerange = temperaturerange
+            self.comments = comments
 
-            for name,value in locals().items():
-                self.__dict__[name] = value
-
-        def value(self,T):
-            value = 0
-            for i,c in enumerate(self.coefficients):
-                value =+ c*T**i
+        def value(self, T, tolerance=0, strict=False):
+            """ evaluates the polynomial at one or more temperatures
+            
+            Uses Horner's scheme over a numpy array of temperatures.
+            Temperatures outside ``temperaturerange`` by less than 
+            ``tolerance`` take the value at the end of the range, 
+            others are ``nan``.
+            
+            Parameters
+            ----------
+            T
+                temperature or array of temperatures
+            tolerance
+                distance outside ``temperaturerange`` for which the end 
+                values are used
+            strict
+                raise a :class:`ValueError` instead of returning ``nan``
+            
+            Returns
+            -------
+            :class:`float` or :class:`numpy.ndarray` matching ``T``
+            """
+            T = np.asarray(T, dtype=float)
+            lo, hi = min(self.temperaturerange), max(self.temperaturerange)
+            outside = (T < lo - tolerance) | (T > hi + tolerance) | np.isnan(T)
+            if strict is True and outside.any():
+                raise ValueError("{} is only valid between {} and {}".format(
+                                                                self.name,lo,hi))
+            Tc = np.clip(T, lo, hi)
+            value = np.zeros_like(Tc)
+            for c in reversed(self.coefficients):
+                value = value*Tc + c
+            value = np.where(outside, np.nan, value)
+            if value.ndim == 0: return float(value)
             return value
 
-        def tabulate(outfile):
-            pass
+        def tabulate(self, 
+                     temperatures = None, 
+                     npoints = 50,
+                     temperatureunits = 'C',
+                     dtype = 'float64'):
+            """ tabulates the polynomial as a regular :class:`MaterialProperty`
+            
+            Parameters
+            ----------
+            temperatures
+                temperatures to tabulate at, by default ``npoints`` points 
+                spread evenly over ``temperaturerange``
+            npoints
+                number of points if ``temperatures`` is not given
+            temperatureunits
+                units of the temperature parameter
+            dtype
+                numpy dtype for the parameter values
+                
+            Returns
+            -------
+            :class:`MaterialProperty` with "Temperature" and ``name``
+            :class:`MaterialParameter` objects
+            """
+            if temperatures is None:
+                temperatures = np.linspace(min(self.temperaturerange),
+                                           max(self.temperaturerange),
+                                           npoints)
+            temperatures = np.asarray(temperatures, dtype=float)
+            values = self.value(temperatures, strict=True)
+            units = self.units if type(self.units) is list else [self.units]
+            materialproperty = MaterialProperty(name = self.name,
+                                                units = units,
+                                                source = "calculated",
+                                                comments = self.comments)
+            materialproperty["Temperature"] = MaterialParameter(
+                                                "Temperature",
+                                                [temperatureunits],
+                                                temperatures,
+                                                dtype)
+            materialproperty[self.name] = MaterialParameter(self.name,
+                                                            units,
+                                                            values,
+                                                            dtype)
+            return materialproperty
     
     def write_csv(self,
                   filename,
@@ -90,15 +261,42 @@ class MaterialProperty(dict):
             f.write('\n'*2)
         if verbose is True: print('Wrote {} to {}'.format(self['Name'],filename))
             
-class MaterialParameter(dict):
+class MaterialParameter(_Tracked):
     def __init__(self, 
                  name = None, 
                  units = [], 
-                 values = []):
+                 values = [],
+                 dtype = None):
         self.name = name
         self['ParameterName'] = name
         self['Units']= units
         self['Values']= values
+        if dtype is not None: self.compact(dtype)
+
+    def compact(self, dtype='float64'):
+        """ stores the values in a contiguous numpy array
+        
+        The dict interface is unchanged (``parameter['Values']`` still
+        indexes, slices and iterates), but the values are held in a single
+        ``float64`` (or ``float32``) buffer and the units in a single entry
+        list. Non-numeric values (e.g. ``['-']``) are left as they are.
+        
+        Parameters
+        ----------
+        dtype
+            numpy dtype for the values, ``'float64'`` or ``'float32'``
+        
+        Returns
+        -------
+        :class:`bool`
+            True if the values are now held in an array
+        """
+        return _compact(self, dtype)
+
+    @property
+    def is_compact(self):
+        """ True if the values are held in a numpy array """
+        return isinstance(self.get('Values'), np.ndarray)
         
         
 if __name__ == '__main__':
@@ -8,6 +8,66 @@ requires:
     untangle
 """
 #from time import sleep
+from collections.abc import ItemsView, ValuesView
+
+class LazyMaterial:
+    """ placeholder for a material in a MatML file that has not been 
+    parsed yet
+    
+    Stored in :class:`MatMLData` and :class:`materialtools.MaterialData` by
+    ``import_file(..., lazy=True)`` and replaced by the 
+    :class:`materialtools.Material` the first time it is accessed.
+    
+    Parameters
+    ----------
+        name
+            material name
+        filename
+            MatML file
+        span
+            byte offsets of the Material element, see 
+            :func:`materialtools.read.matml_index`
+        ids, units
+            Metadata tables of the file
+        encoding, namespaces
+            declared encoding and namespace declarations of the file
+    """
+    source = None
+    ## numpy dtype to compact the material with when it is loaded
+    dtype = None
+    
+    def __init__(self, name, filename, span, ids, units, 
+                 encoding='utf-8', namespaces=None):
+        self.name = name
+        self.filename = filename
+        self.span = span
+        self.ids = ids
+        self.units = units
+        self.encoding = encoding
+        self.namespaces = namespaces
+        
+    def load(self, verbose=False):
+        """ parses the material, returns :class:`materialtools.Material` """
+        from materialtools.read import matml_material
+        material = matml_material(self.filename, self.span, self.ids, 
+                                  self.units, verbose, self.encoding,
+                                  self.namespaces)
+        if self.dtype is not None: material.compact(self.dtype)
+        return material
+    
+    def __repr__(self):
+        return '<LazyMaterial {} ({})>'.format(self.name, self.filename)
+
+
+def materialize(mapping, key):
+    """ returns ``mapping[key]``, parsing and storing it first if it is a
+    :class:`LazyMaterial` """
+    value = dict.__getitem__(mapping, key)
+    if type(value) is LazyMaterial:
+        value = value.load()
+        dict.__setitem__(mapping, key, value)
+    return value
+
 
 class MatMLData(dict):
     '''
@@ -23,6 +83,23 @@ class MatMLData(dict):
         '''
         self.filename = 'no file imported yet'
 
+    def __getitem__(self, key):
+        return materialize(self, key)
+
+    def get(self, key, default=None):
+        return materialize(self, key) if key in self else default
+
+    def __iter__(self):
+        # a dict subclass that overrides __iter__ is copied by dict(), 
+        # copy() and json through __getitem__, which loads lazy materials
+        return dict.__iter__(self)
+
+    def values(self):
+        # views load each lazy material as it is reached
+        return ValuesView(self)
+
+    def items(self):
+        return ItemsView(self)
         
     def getunits(self, verbose = False):
         metadata = self.matml['Metadata']
@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+"""packing material data into one contiguous array of values
+
+:func:`pack` splits a :class:`materialtools.MaterialData` object into a
+``layout`` describing the materials, properties and parameters (names,
+units, sources and other descriptors) and a single flat numpy array holding
+every numeric ``Values`` list. :func:`unpack` rebuilds the objects from the
+two, with each ``Values`` entry a view on the array rather than a copy, so
+the array can live in shared memory or a memory-mapped file.
+
+The layout only contains built-in python types, so it can be pickled or
+written as json. :func:`save` writes both to a single binary file and
+:func:`load` memory-maps the values back from it.
+
+.. moduleauthor:: adlhancock
+"""
+import json
+
+import numpy as np
+
+## object attributes kept in the layout
+attributes = ('name', 'source', 'filename', 'propertynames')
+
+## first bytes of a file written by save
+magic = b'MTCOLUMN'
+## the values start at a multiple of this many bytes
+alignment = 64
+
+
+def _types():
+    """ classes that can appear in a layout, by name """
+    from materialtools import Material, MaterialProperty, MaterialParameter
+    return {'Material': Material,
+            'MaterialProperty': MaterialProperty,
+            'MaterialParameter': MaterialParameter,
+            'dict': dict,
+            'Calculated': MaterialProperty.Calculated}
+
+
+def _record(obj, key, columns, offset, dtype, depth):
+    """ describes a material, property or parameter and collects its
+    numeric values into ``columns`` """
+    from materialtools import MaterialProperty
+    from materialtools.classes.materialproperty import _asarray
+
+    record = {'key': key,
+              'type': type(obj).__name__,
+              'attributes': {a: obj.__dict__[a] for a in attributes
+                             if a in getattr(obj, '__dict__', {})},
+              'entries': []}
+    for name, value in obj.items():
+        if isinstance(value, MaterialProperty.Calculated):
+            entry = ['calculated', name, dict(name=value.name,
+                                              units=value.units,
+                                              coefficients=value.coefficients,
+                                              temperaturerange=
+                                                value.temperaturerange,
+                                              comments=value.comments)]
+        elif isinstance(value, dict) and depth < 2:
+            entry = ['record', name, None]
+            entry[2], offset = _record(value, name, columns, offset, dtype,
+                                       depth+1)
+        else:
+            array = _asarray(value, dtype) if name == 'Values' else None
+            if array is not None:
+                columns.append(array)
+                entry = ['column', name, [offset, len(array)]]
+                offset += len(array)
+            else:
+                entry = ['item', name, value]
+        record['entries'].append(entry)
+    return record, offset
+
+
+def pack(materialdata, dtype='float64'):
+    """ splits material data into a layout and one array of values
+
+    Parameters
+    ----------
+        materialdata
+            :class:`materialtools.MaterialData`
+        dtype
+            numpy dtype for the values
+
+    Returns
+    -------
+        layout
+            :class:`dict` describing the materials, see :func:`unpack`
+        values
+            contiguous 1d :class:`numpy.ndarray` of every numeric value
+    """
+    from materialtools import Material
+    columns, offset, materials = [], 0, []
+    for key, material in materialdata.items():
+        if isinstance(material, Material):
+            record, offset = _record(material, key, columns, offset, dtype, 0)
+            materials.append(record)
+    layout = {'dtype': np.dtype(dtype).str,
+              'size': offset,
+              'source': getattr(materialdata, 'source', None),
+              'filename': list(getattr(materialdata, 'filename', [])),
+              'materials': materials}
+    if columns:
+        values = np.ascontiguousarray(np.concatenate(columns), dtype=dtype)
+    else:
+        values = np.zeros(0, dtype=dtype)
+    return layout, values
+
+
+def pack_material(material, key=None, dtype='float64'):
+    """ layout record and values of a single material
+    
+    Returns
+    -------
+        record
+            :class:`dict` as in the ``materials`` list of a :func:`pack` 
+            layout, with offsets into ``values``
+        values
+            1d :class:`numpy.ndarray` of the material's numeric values
+    """
+    columns = []
+    if key is None: key = material.name
+    record, _ = _record(material, key, columns, 0, dtype, 0)
+    if columns:
+        values = np.ascontiguousarray(np.concatenate(columns), dtype=dtype)
+    else:
+        values = np.zeros(0, dtype=dtype)
+    return record, values
+
+
+def unpack_material(record, values, readonly=False):
+    """ rebuilds a single material from :func:`pack_material` output """
+    return _build(record, np.asarray(values, dtype=float), _types(), readonly)
+
+
+def _build(record, values, types, readonly):
+    """ rebuilds one object from its record """
+    cls = types[record['type']]
+    obj = cls.__new__(cls)
+    if cls is not dict: obj.__dict__.update(record['attributes'])
+    for kind, name, payload in record['entries']:
+        if kind == 'column':
+            start, length = payload
+            value = values[start:start+length]
+            if readonly is True: value.flags.writeable = False
+        elif kind == 'record':
+            value = _build(payload, values, types, readonly)
+        elif kind == 'calculated':
+            value = types['Calculated'](**payload)
+        else:
+            value = payload
+        dict.__setitem__(obj, name, value)
+    return obj
+
+
+def unpack(layout, values, readonly=True, materialnames=None):
+    """ rebuilds material data from :func:`pack` output
+
+    Parameters
+    ----------
+        layout
+            layout from :func:`pack`
+        values
+            the array from :func:`pack`, or any buffer holding the same
+            values, e.g. shared memory or a memory-mapped file
+        readonly
+            mark the ``Values`` arrays as read-only
+        materialnames
+            only rebuild these materials (keys), default all
+
+    Returns
+    -------
+        :class:`materialtools.MaterialData` whose ``Values`` are views on
+        ``values``
+    """
+    from materialtools import MaterialData
+    types = _types()
+    if isinstance(values, np.ndarray):
+        ## plain views are much cheaper to slice than memmap subclasses
+        values = values.view(np.ndarray)
+    else:
+        values = np.frombuffer(values, dtype=layout['dtype'],
+                               count=layout['size'])
+    materialdata = MaterialData()
+    materialdata.source = layout['source']
+    materialdata.filename = list(layout['filename'])
+    for record in layout['materials']:
+        if materialnames is None or record['key'] in materialnames:
+            materialdata[record['key']] = _build(record, values, types,
+                                                 readonly)
+    return materialdata
+
+
+def _jsonable(value):
+    """ json fallback for numpy values in a layout """
+    if hasattr(value, 'tolist'): return value.tolist()
+    if isinstance(value, (set, frozenset)): return list(value)
+    return str(value)
+
+
+def save(materialdata, filename, dtype='float64', metadata=None):
+    """ writes material data to a single binary file
+    
+    The file holds :data:`magic`, the lengths of the json encoded 
+    ``metadata`` and layout, the two json blocks and then the values (see 
+    :func:`pack`), starting at a multiple of :data:`alignment` bytes so 
+    they can be memory-mapped.
+
+    Parameters
+    ----------
+        materialdata
+            :class:`materialtools.MaterialData`
+        filename
+            file to write
+        dtype
+            numpy dtype for the values
+        metadata
+            optional :class:`dict` stored ahead of the layout, see
+            :func:`metadata`
+
+    Returns
+    -------
+        layout
+            the layout written to the file
+    """
+    layout, values = pack(materialdata, dtype)
+    blocks = [json.dumps(metadata if metadata is not None else {}, 
+                         default=_jsonable).encode('utf-8'),
+              json.dumps(layout, default=_jsonable).encode('utf-8')]
+    start = len(magic) + 16 + sum(len(b) for b in blocks)
+    start += -start % alignment
+    with open(filename, 'wb') as f:
+        f.write(magic)
+        f.write(np.array([len(b) for b in blocks], dtype='<u8').tobytes())
+        for block in blocks: f.write(block)
+        f.write(b'\0' * (start - f.tell()))
+        f.write(values.tobytes())
+    return layout
+
+
+def _lengths(f, filename):
+    """ checks the magic bytes and returns the lengths of the json blocks """
+    if f.read(len(magic)) != magic:
+        raise ValueError('{} is not a materialtools binary file'.format(
+            filename))
+    return [int(n) for n in np.frombuffer(f.read(16), dtype='<u8')]
+
+
+def metadata(filename):
+    """ reads the ``metadata`` stored by :func:`save`, without the layout
+    or values """
+    with open(filename, 'rb') as f:
+        length, _ = _lengths(f, filename)
+        return json.loads(f.read(length).decode('utf-8'))
+
+
+def load(filename, mmap=True, readonly=False, materialnames=None):
+    """ reads material data written by :func:`save`
+    
+    Parameters
+    ----------
+        filename
+            file written by :func:`save`
+        mmap
+            memory-map the values instead of reading them into memory. The
+            map is copy-on-write, so changing a value never changes the file
+        readonly
+            mark the ``Values`` arrays as read-only
+        materialnames
+            only rebuild these materials (keys), default all
+            
+    Returns
+    -------
+        :class:`materialtools.MaterialData`
+    """
+    with open(filename, 'rb') as f:
+        lengths = _lengths(f, filename)
+        f.seek(lengths[0], 1)
+        layout = json.loads(f.read(lengths[1]).decode('utf-8'))
+    offset = len(magic) + 16 + sum(lengths)
+    offset += -offset % alignment
+    if layout['size'] == 0:
+        values = np.zeros(0, dtype=layout['dtype'])
+    elif mmap is True:
+        values = np.memmap(filename, dtype=layout['dtype'], mode='c',
+                           offset=offset, shape=(layout['size'],))
+    else:
+        values = np.fromfile(filename, dtype=layout['dtype'], 
+                             count=layout['size'], offset=offset)
+    return unpack(layout, values, readonly, materialnames)
@@ -6,6 +6,9 @@ Created on Wed Mar  8 11:46:42 2017
 @author: dhancock
 """
 
+import json
+import os
+
 import materialtools
 
 def convert_file(sourcefile,targetfile,verbose = False):
@@ -38,11 +41,168 @@ def convert_file(sourcefile,targetfile,verbose = False):
         print("*"*80)
     return data
 
-"""    
-def convert_directory(sourcedir,targetdir,fileextension):
-    print("NOT READY YET")
-    pass    
-"""
+## source file extensions converted by convert_directory
+extensions = ('xml', 'xlsx', 'csv', 'json', 'jsonl', 'mtb')
+## name of the manifest file kept in the target directory
+manifestname = '.materialtools-manifest.json'
+
+
+def _convert(sourcefile, targetfile):
+    """ converts one file in a worker process
+    
+    returns:
+        sha256, error
+            the digest of the source file and None, or None and the error
+    """
+    import traceback
+    from materialtools.cache import digest
+    try:
+        sha256 = digest(sourcefile)
+        targetdir = os.path.dirname(targetfile)
+        if targetdir: os.makedirs(targetdir, exist_ok=True)
+        data = materialtools.MaterialData()
+        data.import_file(sourcefile)
+        data.export_file(targetfile)
+        return sha256, None
+    except Exception as error:
+        return None, ''.join(
+            traceback.format_exception_only(type(error), error)).strip()
+
+
+def _load_manifest(filename):
+    """ the manifest of a previous run, or an empty one """
+    try:
+        with open(filename) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def convert_directory(sourcedir,
+                      targetdir,
+                      fileextension,
+                      sourceextensions = extensions,
+                      workers = None,
+                      force = False,
+                      verbose = False):
+    """ converts every material property file in a directory tree
+    
+    The tree below ``sourcedir`` is mirrored in ``targetdir``, with each 
+    file converted to ``fileextension`` (e.g. ``'xml'``, ``'json'`` or 
+    ``'xlsx'``). A file is skipped if its output is newer than it, or if
+    its sha256 digest matches the one recorded in the manifest 
+    (:data:`manifestname` in ``targetdir``) when it was last converted.
+    
+    arguments:
+        sourcedir: 
+            string path
+        targetdir: 
+            string path
+        fileextension:
+            extension of the converted files
+        sourceextensions:
+            extensions of the files to convert
+        workers:
+            number of processes to convert files in, None converts them in
+            this process
+        force:
+            convert every file
+        verbose: 
+            boolean prints each converted file
+            
+    returns:
+        dict with lists of ``converted`` and ``skipped`` source files and a
+        dict of ``failed`` source files and their errors
+    """
+    from materialtools.cache import digest
+    fileextension = fileextension.lstrip('.')
+    sourceextensions = tuple('.' + e.lstrip('.') for e in sourceextensions)
+    manifestfile = os.path.join(targetdir, manifestname)
+    manifest = _load_manifest(manifestfile)
+    result = {'converted': [], 'skipped': [], 'failed': {}}
+    
+    ## find the files to convert
+    tasks = []
+    for root, dirs, files in os.walk(sourcedir):
+        dirs.sort()
+        for name in sorted(files):
+            if not name.endswith(sourceextensions) or '~' in name: continue
+            sourcefile = os.path.join(root, name)
+            relative = os.path.relpath(sourcefile, sourcedir)
+            targetfile = os.path.join(
+                targetdir, os.path.splitext(relative)[0]+'.'+fileextension)
+            if force is False and os.path.exists(targetfile):
+                if os.path.getmtime(targetfile) >= \
+                        os.path.getmtime(sourcefile) or \
+                        manifest.get(relative, {}).get('sha256') == \
+                        digest(sourcefile):
+                    result['skipped'].append(sourcefile)
+                    continue
+            tasks.append((relative, sourcefile, targetfile))
+    
+    ## convert them
+    sources = [t[1] for t in tasks]
+    targets = [t[2] for t in tasks]
+    if workers is None or workers == 1:
+        outcomes = list(map(_convert, sources, targets))
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            outcomes = list(executor.map(_convert, sources, targets))
+    for (relative, sourcefile, targetfile), (sha256, error) in \
+            zip(tasks, outcomes):
+        if error is not None:
+            result['failed'][sourcefile] = error
+            print("convert_directory: could not convert {}: {}".format(
+                sourcefile, error))
+            continue
+        manifest[relative] = {'sha256': sha256,
+                              'target': os.path.relpath(targetfile, targetdir)}
+        result['converted'].append(sourcefile)
+        if verbose is True: 
+            print("convert_directory: {} -> {}".format(sourcefile, targetfile))
+    
+    ## record the converted files
+    os.makedirs(targetdir, exist_ok=True)
+    temporary = manifestfile + '.tmp'
+    with open(temporary, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(temporary, manifestfile)
+    if verbose is True:
+        print("convert_directory: {converted} converted, {skipped} skipped, "
+              "{failed} failed".format(**{k: len(v) for k, v in result.items()}))
+    return result
+
+
+def main(argv=None):
+    """ command line entry point for :func:`convert_directory`, or 
+    :func:`convert_file` if the source is a file """
+    import argparse
+    parser = argparse.ArgumentParser(
+        prog='materialtools-convert',
+        description='Convert material property files between formats.')
+    parser.add_argument('source', help='source file or directory')
+    parser.add_argument('target', help='target file or directory')
+    parser.add_argument('-f', '--format', 
+                        help='extension of the converted files '
+                             '(directories only), e.g. xml, json or xlsx')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='number of processes')
+    parser.add_argument('--force', action='store_true',
+                        help='convert files even if they are up to date')
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args(argv)
+    
+    if os.path.isfile(args.source):
+        convert_file(args.source, args.target, args.verbose)
+        return 0
+    if args.format is None:
+        parser.error('--format is needed to convert a directory')
+    result = convert_directory(args.source, args.target, args.format,
+                               workers=args.workers,
+                               force=args.force,
+                               verbose=args.verbose)
+    return 1 if result['failed'] else 0
 
 
 if __name__ == "__main__":
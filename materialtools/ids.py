@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""property and parameter ids for MatML export
+
+MatML refers to properties and parameters by ids (``pr0``, ``pa0``, ...)
+defined once in the document's Metadata. An :class:`IdRegistry` assigns an
+id to each new name as materials are added and never changes an id once
+assigned, so a registry saved with :meth:`IdRegistry.save` and loaded for
+the next export keeps the ids of existing names stable.
+
+Example
+-------
+
+    registry = IdRegistry.load('library-ids.json')
+    registry.add(materialdata)
+    materialdata.export_file('library.xml', ids=registry)
+    registry.save('library-ids.json')
+
+.. moduleauthor:: adlhancock
+"""
+import json
+import os
+
+
+def name(item):
+    """ the name used for a material, property or parameter in MatML """
+    return item.get("Name", item.name)
+
+
+class IdRegistry:
+    """ ids of property and parameter names
+
+    Attributes
+    ----------
+        properties
+            :class:`dict` of property ids by name, in the order assigned
+        parameters
+            :class:`dict` of parameter ids by name, in the order assigned
+    """
+    def __init__(self, properties=None, parameters=None):
+        self.properties = dict(properties or {})
+        self.parameters = dict(parameters or {})
+
+    def property_id(self, propertyname):
+        """ the id of a property, assigning the next one if it is new """
+        pid = self.properties.get(propertyname)
+        if pid is None:
+            pid = self.properties[propertyname] = 'pr{}'.format(
+                len(self.properties))
+        return pid
+
+    def parameter_id(self, parametername):
+        """ the id of a parameter, assigning the next one if it is new """
+        pid = self.parameters.get(parametername)
+        if pid is None:
+            pid = self.parameters[parametername] = 'pa{}'.format(
+                len(self.parameters))
+        return pid
+
+    def add_material(self, material):
+        """ assigns ids to the properties and parameters of a material """
+        from materialtools import MaterialProperty, MaterialParameter
+        for materialproperty in dict.values(material):
+            if type(materialproperty) is not MaterialProperty: continue
+            self.property_id(name(materialproperty))
+            for parameter in dict.values(materialproperty):
+                if type(parameter) is MaterialParameter:
+                    self.parameter_id(name(parameter))
+        return self
+
+    def add(self, materialdata):
+        """ assigns ids to every material in a MaterialData object """
+        from materialtools import Material
+        for key in materialdata:
+            material = materialdata[key]
+            if type(material) is Material: self.add_material(material)
+        return self
+
+    def ids(self):
+        """ a single :class:`dict` of ids by name, as returned by
+        :meth:`materialtools.MaterialData.generate_ids`. Where a property
+        and a parameter share a name the property id is given. """
+        ids = dict(self.parameters)
+        ids.update(self.properties)
+        return ids
+
+    def save(self, filename):
+        """ writes the registry to a json file """
+        temporary = filename + '.tmp'
+        with open(temporary, 'w') as f:
+            json.dump({'properties': self.properties,
+                       'parameters': self.parameters}, f, indent=1)
+        os.replace(temporary, filename)
+
+    @classmethod
+    def load(cls, filename, missing_ok=True):
+        """ reads a registry written by :meth:`save`, or returns an empty
+        one if the file does not exist and ``missing_ok`` is True """
+        if missing_ok is True and not os.path.exists(filename):
+            return cls()
+        with open(filename) as f:
+            data = json.load(f)
+        return cls(data.get('properties'), data.get('parameters'))
+
+    def __len__(self):
+        return len(self.properties) + len(self.parameters)
+
+    def __repr__(self):
+        return '<IdRegistry {} properties, {} parameters>'.format(
+            len(self.properties), len(self.parameters))
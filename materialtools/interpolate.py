@@ -0,0 +1,347 @@
+# -*- coding: utf-8 -*-
+"""vectorised interpolation of tabulated material property values
+
+Used by :meth:`materialtools.Material.get_values` to look up a property at
+many values of an independent parameter (usually temperature) in one pass.
+
+The tolerance rules follow :meth:`materialtools.Material.get_value`:
+
+    linear
+        values between the first and last breakpoints are interpolated,
+        values outside them take the first or last value if they are within
+        ``tolerance`` of it.
+
+    nearest
+        the value at the nearest breakpoint, if it is within ``tolerance``.
+        
+    spline, pchip, akima
+        piecewise cubic interpolation (natural cubic spline, monotone 
+        piecewise cubic Hermite, or Akima) between the breakpoints, with the
+        same end value rule as linear. The cubic coefficients are computed 
+        once by :func:`coefficients` and cached by :class:`BreakpointIndex`.
+
+Points that do not satisfy these rules are returned as ``nan``.
+
+.. moduleauthor:: adlhancock
+"""
+from bisect import bisect_left
+
+import numpy as np
+
+methods = ("linear", "nearest", "spline", "pchip", "akima")
+cubicmethods = ("spline", "pchip", "akima")
+
+#: types treated as scalars without the cost of :func:`numpy.ndim`
+scalars = (int, float, np.number)
+
+
+def breakpoints(p2values, values):
+    """ returns sorted breakpoints for a pair of parameter value lists
+
+    Pairs where either value is missing or not finite are dropped.
+
+    Parameters
+    ----------
+        p2values
+            values of the independent parameter
+        values
+            values of the dependent parameter
+
+    Returns
+    -------
+        xp, fp
+            :class:`numpy.ndarray` of floats, sorted by ``xp``
+    """
+    xp = np.asarray(p2values, dtype=float)
+    fp = np.asarray(values, dtype=float)
+    n = min(len(xp), len(fp))
+    xp, fp = xp[:n], fp[:n]
+    valid = np.isfinite(xp) & np.isfinite(fp)
+    if not valid.all():
+        xp, fp = xp[valid], fp[valid]
+    order = np.argsort(xp, kind='stable')
+    return xp[order], fp[order]
+
+
+def _outside(xp, x, tolerance):
+    """ returns masks of points outside the breakpoint range and tolerance """
+    below = x < xp[0]
+    above = x > xp[-1]
+    toofar = (below & (np.abs(x - xp[0]) >= tolerance)) | \
+             (above & (np.abs(x - xp[-1]) >= tolerance))
+    return below | above, toofar
+
+
+def linear(xp, fp, x, tolerance=100):
+    """ linear interpolation with endpoint values used within tolerance
+
+    Parameters
+    ----------
+        xp, fp
+            sorted breakpoints, see :func:`breakpoints`
+        x
+            value or array of values at which to interpolate
+        tolerance
+            distance outside the breakpoints for which the end values are used
+
+    Returns
+    -------
+        :class:`numpy.ndarray`
+            interpolated values, ``nan`` where no value is available
+    """
+    x = np.asarray(x, dtype=float)
+    if len(xp) == 0: return np.full(x.shape, np.nan)
+    values = np.interp(x, xp, fp)
+    _, toofar = _outside(xp, x, tolerance)
+    return np.where(toofar | np.isnan(x), np.nan, values)
+
+
+def nearest(xp, fp, x, tolerance=100):
+    """ value at the nearest breakpoint if it is within tolerance
+
+    Parameters
+    ----------
+        xp, fp
+            sorted breakpoints, see :func:`breakpoints`
+        x
+            value or array of values to look up
+        tolerance
+            maximum distance to the nearest breakpoint
+
+    Returns
+    -------
+        :class:`numpy.ndarray`
+            nearest values, ``nan`` where no value is available
+    """
+    x = np.asarray(x, dtype=float)
+    if len(xp) == 0: return np.full(x.shape, np.nan)
+    right = np.clip(np.searchsorted(xp, x), 1, len(xp) - 1) \
+        if len(xp) > 1 else np.zeros(x.shape, dtype=int)
+    left = np.maximum(right - 1, 0)
+    useleft = np.abs(x - xp[left]) <= np.abs(xp[right] - x)
+    best = np.where(useleft, left, right)
+    return np.where(np.abs(x - xp[best]) <= tolerance, fp[best], np.nan)
+
+
+def _spline_slopes(h, delta):
+    """ knot slopes of a natural cubic spline (tridiagonal solve) """
+    n = len(h) + 1
+    # second derivatives with M[0] = M[-1] = 0
+    M = np.zeros(n)
+    if n > 2:
+        lower = h[1:-1].copy()
+        diag = 2*(h[:-1] + h[1:])
+        rhs = 6*(delta[1:] - delta[:-1])
+        for i in range(1, n-2):
+            w = lower[i-1]/diag[i-1]
+            diag[i] -= w*h[i]
+            rhs[i] -= w*rhs[i-1]
+        M[n-2] = rhs[-1]/diag[-1]
+        for i in range(n-4, -1, -1):
+            M[i+1] = (rhs[i] - h[i+1]*M[i+2])/diag[i]
+    slopes = np.empty(n)
+    slopes[:-1] = delta - h*(2*M[:-1] + M[1:])/6
+    slopes[-1] = delta[-1] + h[-1]*(M[-2] + 2*M[-1])/6
+    return slopes
+
+
+def _pchip_slopes(h, delta):
+    """ knot slopes of a monotone piecewise cubic Hermite interpolant 
+    (Fritsch-Carlson) """
+    n = len(h) + 1
+    slopes = np.zeros(n)
+    if n == 2:
+        slopes[:] = delta[0]
+        return slopes
+    w1 = 2*h[1:] + h[:-1]
+    w2 = h[1:] + 2*h[:-1]
+    samesign = delta[:-1]*delta[1:] > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        harmonic = (w1 + w2)/(w1/delta[:-1] + w2/delta[1:])
+    slopes[1:-1] = np.where(samesign, harmonic, 0)
+
+    def edge(h0, h1, d0, d1):
+        slope = ((2*h0 + h1)*d0 - h0*d1)/(h0 + h1)
+        if np.sign(slope) != np.sign(d0):
+            slope = 0.
+        elif np.sign(d0) != np.sign(d1) and abs(slope) > abs(3*d0):
+            slope = 3*d0
+        return slope
+    slopes[0] = edge(h[0], h[1], delta[0], delta[1])
+    slopes[-1] = edge(h[-1], h[-2], delta[-1], delta[-2])
+    return slopes
+
+
+def _akima_slopes(h, delta):
+    """ knot slopes of an Akima interpolant """
+    n = len(h) + 1
+    if n == 2:
+        return np.full(n, delta[0])
+    m = np.empty(n + 3)
+    m[2:-2] = delta
+    m[1] = 2*m[2] - m[3]
+    m[0] = 2*m[1] - m[2]
+    m[-2] = 2*m[-3] - m[-4]
+    m[-1] = 2*m[-2] - m[-3]
+    dm = np.abs(np.diff(m))
+    w1, w2 = dm[2:], dm[:-2]
+    denominator = w1 + w2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slopes = (w1*m[1:-2] + w2*m[2:-1])/denominator
+    return np.where(denominator > 0, slopes, 0.5*(m[1:-2] + m[2:-1]))
+
+
+def coefficients(xp, fp, method="pchip"):
+    """ piecewise cubic coefficients for the sorted breakpoints
+
+    Repeated breakpoints are reduced to their first value.
+
+    Parameters
+    ----------
+        xp, fp
+            sorted breakpoints, see :func:`breakpoints`
+        method
+            one of :data:`cubicmethods`
+
+    Returns
+    -------
+        xk, c
+            knots and a ``(4, len(xk)-1)`` array of coefficients such that
+            ``y = c[0] + c[1]*dx + c[2]*dx**2 + c[3]*dx**3`` with 
+            ``dx = x - xk[i]`` in interval ``i``
+    """
+    xk, first = np.unique(xp, return_index=True)
+    yk = fp[first]
+    if len(xk) < 2:
+        c = np.zeros((4, len(xk)))
+        c[0] = yk
+        return xk, c
+    h = np.diff(xk)
+    delta = np.diff(yk)/h
+    if method == "spline":
+        slopes = _spline_slopes(h, delta)
+    elif method == "pchip":
+        slopes = _pchip_slopes(h, delta)
+    elif method == "akima":
+        slopes = _akima_slopes(h, delta)
+    else:
+        raise ValueError("cubic method must be one of {}, not {}".format(
+            cubicmethods, method))
+    c = np.empty((4, len(h)))
+    c[0] = yk[:-1]
+    c[1] = slopes[:-1]
+    c[2] = (3*delta - 2*slopes[:-1] - slopes[1:])/h
+    c[3] = (slopes[:-1] + slopes[1:] - 2*delta)/h**2
+    return xk, c
+
+
+def piecewise(xk, c, x, tolerance=100):
+    """ evaluates piecewise cubic coefficients from :func:`coefficients`
+
+    Values outside the knots take the end values within ``tolerance``
+    as for :func:`linear`, others are ``nan``.
+    """
+    x = np.asarray(x, dtype=float)
+    if len(xk) == 0: return np.full(x.shape, np.nan)
+    xc = np.clip(x, xk[0], xk[-1])
+    i = np.clip(np.searchsorted(xk, xc, side='right') - 1, 0, c.shape[1] - 1)
+    dx = xc - xk[i]
+    values = ((c[3, i]*dx + c[2, i])*dx + c[1, i])*dx + c[0, i]
+    _, toofar = _outside(xk, x, tolerance)
+    return np.where(toofar | np.isnan(x), np.nan, values)
+
+
+class BreakpointIndex:
+    """ sorted breakpoints for one property/parameter pair
+
+    Built once from the parameter value lists and reused for every lookup,
+    so each lookup is a binary search rather than a sort. The index keeps a
+    reference to the lists it was built from; :meth:`is_current` is False
+    once either list has been replaced or resized.
+
+    Parameters
+    ----------
+        p2values
+            values of the independent parameter
+        values
+            values of the dependent parameter
+    """
+    def __init__(self, p2values, values):
+        self.p2values = p2values
+        self.values = values
+        self.length = (len(p2values), len(values))
+        self.xp, self.fp = breakpoints(p2values, values)
+        # python float copies for scalar lookups, which are much faster
+        # with bisect than through 0-d numpy arrays
+        self._xp, self._fp = self.xp.tolist(), self.fp.tolist()
+        if len(self.xp) > 0:
+            self.xmin, self.xmax = self._xp[0], self._xp[-1]
+        else:
+            self.xmin, self.xmax = np.nan, np.nan
+        self._coefficients = {}
+
+    def is_current(self, p2values, values):
+        """ True if the index was built from these parameter values """
+        return (p2values is self.p2values and values is self.values and
+                (len(p2values), len(values)) == self.length)
+
+    def coefficients(self, method):
+        """ cubic coefficients for ``method``, computed on first use """
+        if method not in self._coefficients:
+            self._coefficients[method] = coefficients(self.xp, self.fp, method)
+        return self._coefficients[method]
+
+    def evaluate(self, x, method="linear", tolerance=100):
+        """ interpolates at ``x``, see :func:`evaluate`
+
+        A scalar ``x`` returns a :class:`float` (``nan`` where no value is
+        available), an array returns a :class:`numpy.ndarray`.
+        """
+        if method in cubicmethods:
+            xk, c = self.coefficients(method)
+            value = piecewise(xk, c, x, tolerance)
+            return float(value) if value.ndim == 0 else value
+        if not isinstance(x, scalars) and np.ndim(x) > 0:
+            return evaluate(self.xp, self.fp, x, method, tolerance)
+        if method == "linear":
+            return self._linear(float(x), tolerance)
+        elif method == "nearest":
+            return self._nearest(float(x), tolerance)
+        raise ValueError("interpolation method must be one of {}, not {}".format(
+            methods, method))
+
+    def _linear(self, x, tolerance):
+        """ scalar version of :func:`linear` """
+        xp, fp = self._xp, self._fp
+        if not xp or x != x: return np.nan
+        if x <= xp[0]:
+            return fp[0] if xp[0] - x < tolerance or x == xp[0] else np.nan
+        if x >= xp[-1]:
+            return fp[-1] if x - xp[-1] < tolerance or x == xp[-1] else np.nan
+        i = bisect_left(xp, x)
+        x1, x2, y1, y2 = xp[i-1], xp[i], fp[i-1], fp[i]
+        if x == x2: return y2
+        return y1 + (x - x1)*(y2 - y1)/(x2 - x1)
+
+    def _nearest(self, x, tolerance):
+        """ scalar version of :func:`nearest` """
+        xp, fp = self._xp, self._fp
+        if not xp or x != x: return np.nan
+        right = bisect_left(xp, x)
+        if right == len(xp): best = right - 1
+        elif right == 0: best = 0
+        else: best = right - 1 if x - xp[right-1] <= xp[right] - x else right
+        return fp[best] if abs(x - xp[best]) <= tolerance else np.nan
+
+
+def evaluate(xp, fp, x, method="linear", tolerance=100):
+    """ interpolates using the named method, see :data:`methods` """
+    if method == "linear":
+        return linear(xp, fp, x, tolerance)
+    elif method == "nearest":
+        return nearest(xp, fp, x, tolerance)
+    elif method in cubicmethods:
+        xk, c = coefficients(xp, fp, method)
+        return piecewise(xk, c, x, tolerance)
+    raise ValueError("interpolation method must be one of {}, not {}".format(
+        methods, method))
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""running calculator sweeps across a process pool
+
+Splits a parameter space into chunks and evaluates them with a
+:class:`concurrent.futures.ProcessPoolExecutor`. The materials are sent to
+each worker once, when the worker starts, and only the chunks of the swept
+arrays are sent with each task.
+
+Example
+-------
+
+    from materialtools import parallel, calculators
+    stress = parallel.sweep(calculators.thermal_missmatch_stress_sweep,
+                            (armour, heatsink),
+                            dict(thickness_1=t1,
+                                 thickness_2=t2,
+                                 heat_flux=q,
+                                 htc=h,
+                                 T_coolant=T),
+                            workers=8)
+
+.. moduleauthor:: adlhancock
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+## materials held by each worker process, set by _initialise
+_materials = ()
+## shared material data attached by each worker process
+_shared = None
+
+
+def _initialise(materials):
+    """ stores the materials in the worker process """
+    global _materials
+    _materials = materials
+
+
+def _initialise_shared(descriptor, keys):
+    """ attaches the materials from shared memory in the worker process """
+    from materialtools.sharedmemory import attach
+    global _materials, _shared
+    _shared = materialdata = attach(descriptor)
+    _materials = tuple(materialdata if key is None else
+                       [materialdata[k] for k in key] if type(key) is list
+                       else materialdata[key]
+                       for key in keys)
+
+
+def _share(materials):
+    """ publishes materials in shared memory, returns the shared block and
+    the keys needed to rebuild the materials tuple from it """
+    from materialtools import Material, MaterialData
+    from materialtools.sharedmemory import SharedMaterialData
+    library, keys = MaterialData(), []
+    for i, item in enumerate(materials):
+        if isinstance(item, MaterialData) and len(materials) == 1:
+            library, keys = item, [None]
+        elif isinstance(item, Material):
+            key = '{}:{}'.format(i, item.name)
+            library[key] = item
+            keys.append(key)
+        elif isinstance(item, (list, tuple)) and \
+                all(isinstance(m, Material) for m in item):
+            keys.append([])
+            for j, material in enumerate(item):
+                key = '{}.{}:{}'.format(i, j, material.name)
+                library[key] = material
+                keys[-1].append(key)
+        else:
+            raise TypeError("shared sweeps need Material objects, lists of "+
+                            "Material objects, or a single MaterialData, "+
+                            "not {}".format(type(item)))
+    return SharedMaterialData(library), keys
+
+
+def _run_chunk(function, arrays, kwargs):
+    """ evaluates one chunk in a worker process """
+    return function(*_materials, **arrays, **kwargs)
+
+
+def _combine(results, shape):
+    """ joins chunk results along their last axis and restores the shape
+    of the swept arrays """
+    first = results[0]
+    if isinstance(first, dict):
+        return {key: _combine([r[key] for r in results], shape)
+                for key in first}
+    if isinstance(first, tuple):
+        return tuple(_combine([r[i] for r in results], shape)
+                     for i in range(len(first)))
+    values = np.concatenate([np.asarray(r) for r in results], axis=-1)
+    return values.reshape(values.shape[:-1] + shape)
+
+
+def chunks(arrays, chunksize):
+    """ broadcasts a dict of arrays together and splits it into chunks
+
+    Parameters
+    ----------
+        arrays
+            :class:`dict` of array_like values
+        chunksize
+            number of points in each chunk
+
+    Returns
+    -------
+        shape
+            broadcast shape of the arrays
+        chunks
+            :class:`list` of dicts of 1d arrays, in order
+    """
+    names = list(arrays)
+    values = np.broadcast_arrays(*(np.asarray(arrays[n], dtype=float)
+                                   for n in names))
+    shape = values[0].shape if values else ()
+    values = [v.ravel() for v in values]
+    size = int(np.prod(shape))
+    return shape, [{n: v[start:start+chunksize] for n, v in zip(names, values)}
+                   for start in range(0, size, max(chunksize, 1))]
+
+
+def sweep(function,
+          materials,
+          arrays,
+          workers = None,
+          chunksize = None,
+          shared = False,
+          **kwargs):
+    """ evaluates a vectorised calculator over a parameter space in parallel
+
+    Parameters
+    ----------
+        function
+            module level function called as
+            ``function(*materials, **chunk, **kwargs)`` that returns an
+            array (or a tuple or dict of arrays) whose last axis matches
+            the points in ``chunk``, e.g.
+            :func:`materialtools.calculators.thermal_missmatch_stress_sweep`
+            or :func:`materialtools.calculators.thermal_stress_fom_matrix`
+        materials
+            tuple of positional arguments sent to each worker once
+        arrays
+            :class:`dict` of swept arguments, broadcast together
+        workers
+            number of worker processes, ``None`` or ``0`` for
+            :func:`os.cpu_count`. ``1`` evaluates the chunks in this process
+        chunksize
+            points per task, by default the points are split into about
+            four tasks per worker
+        shared
+            publish the materials' numeric tables in shared memory once
+            (see :mod:`materialtools.sharedmemory`) instead of pickling the
+            materials for each worker. ``materials`` must then be
+            :class:`materialtools.Material` objects, lists of them, or a
+            single :class:`materialtools.MaterialData`
+        **kwargs
+            other keyword arguments passed to ``function``
+
+    Returns
+    -------
+        results from ``function`` with the chunk axis replaced by the
+        broadcast shape of ``arrays``. Chunks are always combined in order,
+        so results do not depend on the number of workers.
+    """
+    if not workers: workers = os.cpu_count() or 1
+    if workers < 0:
+        raise ValueError("workers must be positive, not {}".format(workers))
+    size = int(np.prod(np.broadcast_shapes(*(np.shape(a)
+                                             for a in arrays.values()))))
+    if chunksize is None:
+        chunksize = max(1, -(-size // (4*workers)))
+    shape, tasks = chunks(arrays, chunksize)
+    if len(tasks) == 0:
+        return function(*materials, **{n: np.asarray(a, dtype=float).ravel()
+                                       for n, a in arrays.items()}, **kwargs)
+
+    if workers == 1:
+        results = [function(*materials, **task, **kwargs) for task in tasks]
+        return _combine(results, shape)
+
+    if shared is True:
+        block, keys = _share(materials)
+        initializer, initargs = _initialise_shared, (block.descriptor, keys)
+    else:
+        block = None
+        initializer, initargs = _initialise, (tuple(materials),)
+    try:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=initializer,
+                                 initargs=initargs) as executor:
+            results = list(executor.map(_run_chunk,
+                                        [function]*len(tasks),
+                                        tasks,
+                                        [kwargs]*len(tasks)))
+    finally:
+        if block is not None: block.close()
+    return _combine(results, shape)
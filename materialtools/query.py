@@ -0,0 +1,497 @@
+# -*- coding: utf-8 -*-
+"""property queries across a library of materials
+
+Finds the materials whose properties satisfy a set of conditions, such as
+a thermal conductivity above 150 between 400 and 800 C and a density below
+8000. Each condition is a tuple
+
+    (propertyname, operator, value)
+    (propertyname, operator, value, between)
+
+where ``operator`` is one of :data:`operators` and ``between`` is a
+temperature, a ``(low, high)`` temperature range, or None for the whole
+range of the data. ``propertyname`` may be a ``(propertyname, parameter1)``
+tuple to compare a dependent parameter other than the one named after the
+property, e.g. ``(('Elasticity', "Young's Modulus"), '>', 200e9)``. Values are compared in the units the property is
+stored in, using the linear interpolation of :meth:`Material.get_values`
+(or the polynomial of a calculated property), with end values used up to
+``tolerance`` outside the data. A property given without temperatures
+is taken to hold at every temperature.
+
+A :class:`RangeIndex` holds the minimum and maximum of one property for
+each material in a number of temperature bands. Most materials pass or
+fail a condition on these bounds alone; only the rest are interpolated.
+
+Example
+-------
+
+    from materialtools import query
+    keys = query.query(materialdata,
+                       [('Thermal Conductivity', '>', 150, (400, 800)),
+                        ('Density', '<', 8000)])
+
+or, reusing the indexes between queries,
+
+    keys = materialdata.query([('Thermal Conductivity', '>', 150, (400, 800)),
+                               ('Density', '<', 8000)])
+
+.. moduleauthor:: adlhancock
+"""
+import traceback
+
+import numpy as np
+
+## comparison operators accepted in conditions
+operators = {'>': np.greater,
+             '>=': np.greater_equal,
+             '<': np.less,
+             '<=': np.less_equal}
+
+
+def extremes(xp, fp, edges):
+    """ minimum and maximum of a linear interpolation within each band
+
+    Parameters
+    ----------
+        xp, fp
+            sorted breakpoints, see :func:`materialtools.interpolate.breakpoints`
+        edges
+            sorted band edges
+
+    Returns
+    -------
+        lo, hi
+            :class:`numpy.ndarray` of the minimum and maximum in each of the
+            ``len(edges)-1`` bands, ``nan`` for bands outside the breakpoints
+    """
+    edges = np.asarray(edges, dtype=float)
+    lo = np.full(len(edges)-1, np.nan)
+    hi = np.full(len(edges)-1, np.nan)
+    if len(xp) == 0: return lo, hi
+    xmin, xmax = xp[0], xp[-1]
+    bands = np.flatnonzero((edges[:-1] <= xmax) & (edges[1:] >= xmin))
+    if len(bands) == 0: return lo, hi
+
+    # the extremes within a band are at its ends or at a breakpoint, so
+    # insert the band edges as points and reduce over each band's points
+    inner = edges[(edges > xmin) & (edges < xmax)]
+    x = np.concatenate([xp, inner])
+    f = np.concatenate([fp, np.interp(inner, xp, fp)])
+    order = np.argsort(x, kind='stable')
+    x, f = x[order], np.append(f[order], np.nan)
+    start = np.searchsorted(x, np.maximum(edges[bands], xmin), 'left')
+    stop = np.searchsorted(x, np.minimum(edges[bands+1], xmax), 'right')
+    limits = np.column_stack([start, stop]).ravel()
+    lo[bands] = np.minimum.reduceat(f, limits)[::2]
+    hi[bands] = np.maximum.reduceat(f, limits)[::2]
+    return lo, hi
+
+
+def polynomial_extremes(coefficients, low, high):
+    """ minimum and maximum of ``a + b*T + c*T**2 ...`` between two
+    temperatures, given coefficients ``[a, b, c, ...]`` """
+    from numpy.polynomial import polynomial
+    points = [low, high]
+    if len(coefficients) > 2:
+        roots = polynomial.polyroots(polynomial.polyder(coefficients))
+        roots = roots.real[np.abs(roots.imag) < 1e-9]
+        points.extend(roots[(roots > low) & (roots < high)])
+    values = polynomial.polyval(np.asarray(points, dtype=float), coefficients)
+    return values.min(), values.max()
+
+
+class Constant:
+    """ values of a property given without values of the independent 
+    parameter, taken to hold over its whole range
+
+    Parameters
+    ----------
+        values
+            values of the property
+    """
+    def __init__(self, values):
+        self.values = values
+        self.length = len(values)
+        finite = np.asarray(values, dtype=float).ravel()
+        finite = finite[np.isfinite(finite)]
+        if len(finite) == 0: raise ValueError('no numeric values')
+        self.min, self.max = finite.min(), finite.max()
+
+    def is_current(self, p2values, values):
+        """ True if the values have not been replaced or resized and there
+        are still no values of the independent parameter """
+        return (p2values is None and values is self.values and 
+                len(values) == self.length)
+
+
+class RangeIndex:
+    """ value ranges of one property for every material in a library
+
+    Parameters
+    ----------
+        materialdata
+            :class:`materialtools.MaterialData` to index. Lazily loaded
+            materials are loaded.
+        propertyname
+            name of the property
+        parameter2
+            name of the independent parameter
+        parameter1
+            name of the dependent parameter, ``'auto'`` for the property
+            name. A ValueError is raised if it is ``'auto'`` and a 
+            material's property has several dependent parameters, none of
+            them named after the property.
+        bands
+            number of bands the range of ``parameter2`` is split into
+
+    Attributes
+    ----------
+        keys
+            keys of the materials with the property, in order
+        xmin, xmax
+            range of ``parameter2`` covered by each material's data, 
+            ``-inf`` to ``inf`` for properties without values of 
+            ``parameter2`` (see :class:`Constant`)
+        edges
+            edges of the bands
+        lo, hi
+            minimum and maximum of each material in each band, with one
+            row per material
+        units
+            units of the property for each material
+        errors
+            :class:`dict` of the error message for each material whose
+            values could not be indexed, keyed by material key
+    """
+    def __init__(self,
+                 materialdata,
+                 propertyname,
+                 parameter2 = 'Temperature',
+                 parameter1 = 'auto',
+                 bands = 32):
+        from materialtools import Material, MaterialProperty
+        self.propertyname = propertyname
+        self.parameter2 = parameter2
+        self.parameter1 = propertyname if parameter1 == 'auto' else parameter1
+        self.keys, self.tables, self.units, ranges = [], [], [], []
+        self.materials, self.errors = {}, {}
+        for key in materialdata:
+            material = self.materials[key] = materialdata[key]
+            if type(material) is not Material: continue
+            if parameter1 == 'auto': self._check_parameter1(material)
+            try:
+                table = self._table(material)
+            except (ValueError, TypeError) as error:
+                self.errors[key] = ''.join(traceback.format_exception_only(
+                    type(error), error)).strip()
+                continue
+            if table is None: continue
+            table, xrange, units = table
+            self.keys.append(key)
+            self.tables.append(table)
+            self.units.append(units)
+            ranges.append(xrange)
+
+        ranges = np.asarray(ranges, dtype=float).reshape(-1, 2)
+        self.xmin, self.xmax = ranges[:, 0], ranges[:, 1]
+        finite = ranges[np.isfinite(ranges).all(axis=1)]
+        if len(finite) > 0 and finite[:, 1].max() > finite[:, 0].min():
+            self.edges = np.linspace(finite[:, 0].min(), finite[:, 1].max(), 
+                                     bands+1)
+        elif len(finite) > 0:
+            self.edges = finite[:, 0].min() + np.array([0., 1.])
+        else:
+            self.edges = np.array([0., 1.])
+        self.lo = np.full((len(self.keys), len(self.edges)-1), np.nan)
+        self.hi = np.full((len(self.keys), len(self.edges)-1), np.nan)
+        for row, table in enumerate(self.tables):
+            if type(table) is Constant:
+                self.lo[row], self.hi[row] = table.min, table.max
+            elif isinstance(table, MaterialProperty.Calculated):
+                for band in np.flatnonzero(
+                        (self.edges[:-1] <= self.xmax[row]) &
+                        (self.edges[1:] >= self.xmin[row])):
+                    self.lo[row, band], self.hi[row, band] = \
+                        polynomial_extremes(
+                            table.coefficients,
+                            max(self.edges[band], self.xmin[row]),
+                            min(self.edges[band+1], self.xmax[row]))
+            else:
+                self.lo[row], self.hi[row] = extremes(table.xp, table.fp,
+                                                      self.edges)
+
+    def _check_parameter1(self, material):
+        """ raises a ValueError if the dependent parameter of a material's
+        property is ambiguous, i.e. there is no parameter named after the
+        property and there are several other than ``parameter2`` """
+        materialproperty = dict.get(material, self.propertyname)
+        if not isinstance(materialproperty, dict): return
+        if self.parameter1 in materialproperty: return
+        dependent = [name for name, parameter in materialproperty.items() 
+                     if isinstance(parameter, dict) 
+                     and name != self.parameter2]
+        if len(dependent) > 1:
+            raise ValueError(
+                "{} of {} has several dependent parameters ({}), give "
+                "parameter1 or a (propertyname, parameter1) condition".format(
+                    self.propertyname, material.name, ', '.join(dependent)))
+
+    def _values(self, materialproperty):
+        """ the values of ``parameter2`` (None if the property has none) and
+        ``parameter1`` of a tabulated property """
+        try:
+            values = materialproperty[self.parameter1]['Values']
+        except (KeyError, TypeError):
+            values = materialproperty['Values']
+        try:
+            p2values = materialproperty[self.parameter2]['Values']
+        except (KeyError, TypeError):
+            p2values = None
+        return p2values, values
+
+    def _table(self, material):
+        """ the table of values indexed for one material, the range of 
+        ``parameter2`` it covers and its units, or None if the material 
+        does not have the property """
+        from materialtools import MaterialProperty
+        try:
+            materialproperty = material[self.propertyname]
+        except (KeyError, TypeError):
+            return None
+        if isinstance(materialproperty, MaterialProperty.Calculated):
+            return (materialproperty,
+                    (min(materialproperty.temperaturerange),
+                     max(materialproperty.temperaturerange)),
+                    materialproperty.units)
+        try:
+            p2values, values = self._values(materialproperty)
+        except (KeyError, TypeError):
+            return None
+        try: units = materialproperty[self.parameter1]['Units']
+        except (KeyError, TypeError): units = None
+        if p2values is None:
+            return Constant(values), (-np.inf, np.inf), units
+        table = material._index(self.propertyname, self.parameter2,
+                                self.parameter1, values)
+        if len(table.xp) == 0: return None
+        return table, (table.xmin, table.xmax), units
+
+    def is_current(self, materialdata):
+        """ True if no material has been added, removed or replaced and no
+        indexed parameter values have been replaced since the index was
+        built """
+        from materialtools import MaterialProperty
+        if len(materialdata) != len(self.materials): return False
+        for key, material in self.materials.items():
+            if dict.get(materialdata, key) is not material: return False
+        for key, table in zip(self.keys, self.tables):
+            materialproperty = dict.get(self.materials[key],
+                                        self.propertyname)
+            if isinstance(table, MaterialProperty.Calculated):
+                if materialproperty is not table: return False
+                continue
+            try:
+                p2values, values = self._values(materialproperty)
+            except (KeyError, TypeError):
+                return False
+            if not table.is_current(p2values, values): return False
+        return True
+
+    def _extremes(self, row, low, high):
+        """ exact minimum and maximum of one material between two values
+        within its data """
+        from materialtools import MaterialProperty
+        table = self.tables[row]
+        if type(table) is Constant:
+            return table.min, table.max
+        if isinstance(table, MaterialProperty.Calculated):
+            return polynomial_extremes(table.coefficients, low, high)
+        inside = table.fp[(table.xp > low) & (table.xp < high)]
+        values = np.concatenate([np.interp([low, high], table.xp, table.fp),
+                                 inside])
+        return values.min(), values.max()
+
+    def select(self,
+               operator,
+               value,
+               between = None,
+               mode = 'all',
+               tolerance = 0,
+               keys = None,
+               verbose = False):
+        """ keys of the materials satisfying one condition
+
+        Parameters
+        ----------
+            operator
+                one of :data:`operators`
+            value
+                value compared against, in the units of the property
+            between
+                a value of ``parameter2``, a ``(low, high)`` range, or None
+                for the whole range of each material's data
+            mode
+                ``'all'``: the condition holds everywhere in ``between``
+                and the data covers it to within ``tolerance``.
+                ``'any'``: it holds somewhere in ``between``
+            tolerance
+                distance outside the data for which the end values are used
+            keys
+                only consider these keys
+            verbose
+                print how many materials were decided by the index
+
+        Returns
+        -------
+            :class:`list` of keys, in material order
+        """
+        if operator not in operators:
+            raise ValueError("operator must be one of {}, not {}".format(
+                list(operators), operator))
+        if mode not in ('all', 'any'):
+            raise ValueError("mode must be 'all' or 'any', not {}".format(mode))
+        compare = operators[operator]
+        rows = np.ones(len(self.keys), dtype=bool)
+        if keys is not None:
+            rows &= np.fromiter((k in keys for k in self.keys), bool,
+                                len(self.keys))
+        considered = rows.sum()
+
+        # clip the range to each material's data
+        if between is None:
+            low, high = self.xmin, self.xmax
+        else:
+            bounds = np.ravel(np.asarray(between, dtype=float))
+            low, high = bounds.min(), bounds.max()
+            if mode == 'all':
+                rows &= ((low >= self.xmin - tolerance) &
+                         (high <= self.xmax + tolerance))
+            else:
+                rows &= ((high >= self.xmin - tolerance) &
+                         (low <= self.xmax + tolerance))
+            low = np.clip(low, self.xmin, self.xmax)
+            high = np.clip(high, self.xmin, self.xmax)
+
+        # bounds from the bands overlapping the clipped range
+        nbands = len(self.edges) - 1
+        first = np.clip(np.searchsorted(self.edges, low, 'right') - 1,
+                        0, nbands-1)
+        last = np.clip(np.searchsorted(self.edges, high, 'left') - 1,
+                       first, nbands-1)
+        columns = np.arange(nbands)
+        overlap = ((columns >= first[:, None]) & (columns <= last[:, None]) &
+                   ~np.isnan(self.lo))
+        lower = np.where(overlap, self.lo, np.inf).min(axis=1)
+        upper = np.where(overlap, self.hi, -np.inf).max(axis=1)
+
+        # a condition on the minimum ('>' everywhere, '<' somewhere) or
+        # the maximum, which lies between the bounds
+        greater = operator in ('>', '>=')
+        if greater:
+            passed, possible = compare(lower, value), compare(upper, value)
+        else:
+            passed, possible = compare(upper, value), compare(lower, value)
+        passed &= rows
+        undecided = np.flatnonzero(rows & possible & ~passed)
+        minimum = greater == (mode == 'all')
+        for row in undecided:
+            lo, hi = self._extremes(row, low[row], high[row])
+            passed[row] = compare(lo if minimum else hi, value)
+        if verbose is True:
+            print('[query.py] {} {} {}: {} of {} materials decided without '
+                  'interpolation'.format(self.propertyname, operator, value,
+                                         considered - len(undecided),
+                                         considered))
+        return [self.keys[row] for row in np.flatnonzero(passed)]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __repr__(self):
+        return '<RangeIndex {} ({}) for {} materials in {} bands>'.format(
+            self.propertyname, self.parameter1, len(self.keys), 
+            len(self.edges)-1)
+
+
+def parse(condition, parameter1='auto'):
+    """ splits a condition into (propertyname, parameter1, operator, value,
+    between) """
+    if len(condition) == 3:
+        propertyname, operator, value = condition
+        between = None
+    elif len(condition) == 4:
+        propertyname, operator, value, between = condition
+    else:
+        raise ValueError("conditions are (propertyname, operator, value[, "
+                         "between]), not {}".format(condition))
+    if isinstance(propertyname, tuple):
+        propertyname, parameter1 = propertyname
+    return propertyname, parameter1, operator, value, between
+
+
+def query(materialdata,
+          conditions,
+          mode = 'all',
+          tolerance = 0,
+          parameter2 = 'Temperature',
+          bands = 32,
+          indexes = None,
+          verbose = False,
+          parameter1 = 'auto'):
+    """ keys of the materials satisfying every condition
+
+    Parameters
+    ----------
+        materialdata
+            :class:`materialtools.MaterialData` to search
+        conditions
+            a condition or list of conditions, see :mod:`materialtools.query`
+        mode
+            ``'all'`` or ``'any'``, see :meth:`RangeIndex.select`
+        tolerance
+            distance outside the data for which the end values are used
+        parameter2
+            name of the independent parameter of the ranges
+        bands
+            number of bands in new indexes
+        indexes
+            :class:`dict` of :class:`RangeIndex` by (property name,
+            ``parameter1``, ``parameter2``, ``bands``), reused while 
+            current and updated with any that are built
+        verbose
+            print the progress of the query
+        parameter1
+            name of the dependent parameter for conditions that do not give
+            one, see :class:`RangeIndex`
+
+    Returns
+    -------
+        :class:`list` of keys, in material order
+    """
+    ## a single condition has its operator second
+    if len(conditions) > 1 and isinstance(conditions[1], str):
+        conditions = [conditions]
+    if indexes is None: indexes = {}
+    keys = None
+    for condition in conditions:
+        propertyname, p1, operator, value, between = parse(condition, 
+                                                            parameter1)
+        indexkey = (propertyname, p1, parameter2, bands)
+        index = indexes.get(indexkey)
+        if index is None or not index.is_current(materialdata):
+            if verbose is True: print('[query.py] indexing', propertyname)
+            index = indexes[indexkey] = RangeIndex(materialdata,
+                                                   propertyname,
+                                                   parameter2,
+                                                   p1,
+                                                   bands)
+            if index.errors:
+                print("\n## {} material(s) could not be indexed for {} "
+                      "##".format(len(index.errors), propertyname))
+                [print('\t',k,':',e) for k,e in index.errors.items()]
+        found = index.select(operator, value, between, mode, tolerance,
+                             keys, verbose)
+        keys = set(found)
+        if not keys: break
+    if keys is None: return list(materialdata)
+    return [key for key in materialdata if key in keys]
@@ -11,10 +11,21 @@ def matml(filename = None,
           materialname = 'auto',
           filetype = 'ANSYS', 
           testing = False, 
-          verbose = False):
+          verbose = False,
+          streaming = False,
+          lazy = False):
     
     """Uses xmlto dict to import MatML data in xml format
     
+    if ``streaming`` is True, the file is read incrementally with 
+    :func:`matml_iter` instead, so the whole document is never held in 
+    memory (the raw xml is then not attached to the materials)
+    
+    if ``lazy`` is True, only the material names, their positions in the 
+    file and the Metadata are read (see :func:`matml_index`). Each material
+    is parsed when it is first accessed, see 
+    :class:`materialtools.classes.matml.LazyMaterial`
+    
     returns:
         materialdata
     """
@@ -25,6 +36,31 @@ def matml(filename = None,
     if testing is True:
         filename = './sampledata/testdata.xml'
         filename = '/python/materialtools/sampledata/testdata.xml'
+
+    if lazy is True:
+        from materialtools.classes.matml import LazyMaterial
+        index = matml_index(filename)
+        for name, span in index['materials']:
+            if name not in materialdata:
+                dict.__setitem__(materialdata, name, 
+                                 LazyMaterial(name, filename, span, 
+                                              index['ids'], index['units'],
+                                              index['encoding'],
+                                              index['namespaces']))
+        materialdata.ids, materialdata.units = index['ids'], index['units']
+        materialdata.filename = filename
+        if verbose is True: print('[read.py] matml file indexed:',filename)
+        return materialdata
+
+    if streaming is True:
+        metadata = {}
+        for material in matml_iter(filename, verbose, metadata):
+            if material.name not in materialdata:
+                materialdata[material.name] = material
+        materialdata.ids, materialdata.units = metadata['ids'], metadata['units']
+        materialdata.filename = filename
+        if verbose is True: print('[read.py] matml file streamed:',filename)
+        return materialdata
  
     def importxml(filename,filetype='ANSYS'):
         import xmltodict
@@ -53,13 +89,323 @@ def matml(filename = None,
     materialdata.filename = filename
     return materialdata
     
+def _tag(element):
+    """ element tag without any namespace """
+    return element.tag.rsplit('}', 1)[-1]
+
+def _child(element, tag):
+    """ first child with this tag (ignoring namespaces) or None """
+    for child in element:
+        if _tag(child) == tag: return child
+    return None
+
+def _children(element, tag):
+    """ children with this tag (ignoring namespaces) """
+    return [child for child in element if _tag(child) == tag]
+
+def _text(element, tag, default=None):
+    """ text of the first child with this tag """
+    child = _child(element, tag)
+    if child is None or child.text is None: return default
+    return child.text
+
+def _matml_details(element):
+    """ returns (id, name, units) for a ParameterDetails or PropertyDetails
+    element, following :meth:`materialtools.MatMLData.getunits` """
+    units = _child(element, 'Units')
+    if units is not None:
+        u = []
+        for unit in _children(units, 'Unit'):
+            name = _text(unit, 'Name', '')
+            if unit.get('power') is not None:
+                name += '^' + unit.get('power')
+            u.append(name)
+        units = '.'.join(u)
+    elif _child(element, 'Unitless') is not None and \
+            _tag(element) == 'ParameterDetails':
+        units = 'Unitless'
+    else:
+        units = '-'
+    return element.get('id'), _text(element, 'Name'), units
+
+def _matml_qualifiers(element):
+    """ dict of qualifiers for a PropertyData or ParameterValue element """
+    return {q.get('name'): (q.text or '').split(',') 
+            for q in _children(element, 'Qualifier')}
+
+def _matml_material(element, ids, units, verbose=False):
+    """ builds a :class:`materialtools.Material` from a MatML Material 
+    element, giving the same structure as :class:`materialtools.MatMLData`
+    """
+    from materialtools import Material, MaterialProperty, MaterialParameter
+    bulkdetails = _child(element, 'BulkDetails')
+    materialname = _text(bulkdetails, 'Name')
+    material = Material(materialname)
+    description = _text(bulkdetails, 'Description')
+    if description is None:
+        print(material.name,'has no description') 
+        description = '-'
+    material['Description'] = description
+
+    for xmlproperty in _children(bulkdetails, 'PropertyData'):
+        propertyid = xmlproperty.get('property')
+        propertyname = ids[propertyid]
+        if propertyname in material: continue
+        if verbose is True: print('[read.py] ',materialname,'::',propertyname)
+
+        materialproperty = MaterialProperty(propertyname)
+        propertyvalues = [float(x) for x 
+                          in _text(xmlproperty, 'Data', '-').split(',') 
+                          if x != '-']
+        if propertyvalues == []: propertyvalues = ['-']
+        materialproperty['Values'] = propertyvalues
+        materialproperty['Units'] = [units.get(propertyid, '-')]
+        materialproperty.update(_matml_qualifiers(xmlproperty))
+
+        # get parameters
+        materialparameters = {}
+        xmlparameters = _children(xmlproperty, 'ParameterValue')
+        for xmlparameter in xmlparameters:
+            parameterid = xmlparameter.get('parameter')
+            parametername = ids[parameterid]
+            try:
+                parametervalues = [float(x) for x 
+                                   in _text(xmlparameter, 'Data').split(',')
+                                   if x != '-']
+            except (AttributeError, ValueError):
+                parametervalues = ['-']
+            # built as MatMLData.getparameters does
+            materialparameter = MaterialParameter()
+            materialparameter['Name'] = parametername
+            materialparameter['Units'] = [units.get(parameterid, '-')]
+            materialparameter['Values'] = parametervalues
+            materialparameter.update(_matml_qualifiers(xmlparameter))
+            materialparameters[parametername] = materialparameter
+
+        # add propertyvalues to parametervalues if they exist
+        if xmlparameters and propertyname not in materialparameters:
+            materialparameters[propertyname] = {
+                item: materialproperty[item] for item in materialproperty 
+                if type(materialproperty[item]) is list}
+            materialparameters[propertyname]["PropertyName"] = propertyname
+        materialproperty.update(materialparameters)
+        material[propertyname] = materialproperty
+    return material
+
+def matml_metadata(filename):
+    """ reads the MatML Metadata ids and units without building the document
+    
+    returns:
+        ids, units
+            dicts of names and units by property/parameter id
+    """
+    from xml.etree.ElementTree import iterparse
+    ids, units = {}, {}
+    parent = None
+    for event, element in iterparse(filename, events=('start', 'end')):
+        tag = _tag(element)
+        if event == 'start':
+            if tag == 'MatML_Doc': parent = element
+            continue
+        if tag in ('ParameterDetails', 'PropertyDetails'):
+            pid, name, unit = _matml_details(element)
+            ids[pid], units[pid] = name, unit
+            element.clear()
+        elif tag == 'Material':
+            element.clear()
+            if parent is not None: parent.clear()
+    return ids, units
+
+def matml_iter(filename, verbose = False, metadata = None):
+    """ yields the materials in a MatML file one at a time
+    
+    Uses :func:`xml.etree.ElementTree.iterparse`, discarding each Material
+    element once it has been converted, so memory use does not grow with 
+    the size of the file. The Metadata ids and units are read in a first 
+    pass (see :func:`matml_metadata`).
+    
+    arguments:
+        filename:
+            path to a MatML (e.g. ANSYS Engineering Data) xml file
+        metadata:
+            optional dict, filled with the ``ids`` and ``units`` tables
+    
+    yields:
+        :class:`materialtools.Material`
+    """
+    from xml.etree.ElementTree import iterparse
+    ids, units = matml_metadata(filename)
+    if metadata is not None: metadata.update(ids=ids, units=units)
+    parent, depth = None, 0
+    for event, element in iterparse(filename, events=('start', 'end')):
+        tag = _tag(element)
+        if event == 'start':
+            if tag == 'MatML_Doc': parent = element
+            elif tag == 'Material': depth += 1
+            continue
+        if tag == 'Material':
+            depth -= 1
+            if depth == 0:
+                yield _matml_material(element, ids, units, verbose)
+                element.clear()
+                if parent is not None: parent.clear()
+
+def _matml_fragment(f, span):
+    """ reads the xml of one element given the byte offsets of its start tag
+    and its end tag """
+    start, end = span
+    f.seek(start)
+    fragment = f.read(end - start)
+    tail = b''
+    while b'>' not in tail:
+        chunk = f.read(256)
+        if not chunk: break
+        tail += chunk
+    return fragment + tail[:tail.find(b'>') + 1]
+
+def _matml_parse(fragment, encoding='utf-8', namespaces=None):
+    """ parses an element read by :func:`_matml_fragment`
+    
+    The fragment is wrapped in an element carrying the namespace 
+    declarations of the file it came from, under an xml declaration with 
+    the file's encoding, so prefixed tags and non-ascii text parse as they
+    do in the whole document.
+    """
+    from xml.etree.ElementTree import fromstring
+    from xml.sax.saxutils import quoteattr
+    declarations = ''.join(' {}={}'.format(name, quoteattr(uri)) 
+                           for name, uri in (namespaces or {}).items())
+    head = '<?xml version="1.0" encoding="{}"?><fragment{}>'.format(
+                                                    encoding, declarations)
+    return fromstring(head.encode(encoding) + fragment + 
+                      '</fragment>'.encode(encoding))[0]
+
+def matml_index(filename):
+    """ indexes a MatML file without building any materials
+    
+    A single :mod:`xml.parsers.expat` pass records the name and byte 
+    offsets of each Material element; only the Metadata elements are 
+    parsed.
+    
+    returns:
+        dict with
+            materials:
+                list of (name, (start, end)) in file order, where start and
+                end are the byte offsets of the start and end tags
+            ids, units:
+                dicts of names and units by property/parameter id
+            encoding:
+                the encoding declared by the file (default ``'utf-8'``)
+            namespaces:
+                dict of the ``xmlns`` declarations on the elements 
+                enclosing the materials, needed to parse them on their own
+    """
+    from xml.parsers import expat
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+    stack, materials, details = [], [], []
+    current = {}
+    namespaces = {}
+    declaration = {'encoding': None}
+
+    def xmldecl(version, encoding, standalone):
+        declaration['encoding'] = encoding
+
+    def start(name, attributes):
+        tag = name.rsplit(':', 1)[-1]
+        if 'Material' not in stack:
+            namespaces.update((key, value) for key, value 
+                              in attributes.items() 
+                              if key == 'xmlns' or key.startswith('xmlns:'))
+        if tag == 'Material' and stack[-1:] == ['MatML_Doc']:
+            current['material'] = parser.CurrentByteIndex
+            current['name'] = []
+        elif tag in ('ParameterDetails', 'PropertyDetails'):
+            current['details'] = parser.CurrentByteIndex
+        stack.append(tag)
+
+    def end(name):
+        tag = stack.pop()
+        if tag == 'Material' and stack[-1:] == ['MatML_Doc']:
+            materials.append((''.join(current['name']),
+                              (current['material'], parser.CurrentByteIndex)))
+        elif tag in ('ParameterDetails', 'PropertyDetails'):
+            details.append((current['details'], parser.CurrentByteIndex))
+
+    def text(data):
+        if stack[-4:] == ['MatML_Doc', 'Material', 'BulkDetails', 'Name']:
+            current['name'].append(data)
+
+    parser.XmlDeclHandler = xmldecl
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    parser.CharacterDataHandler = text
+    with open(filename, 'rb') as f:
+        parser.ParseFile(f)
+        encoding = declaration['encoding'] or 'utf-8'
+        ids, units = {}, {}
+        for span in details:
+            element = _matml_parse(_matml_fragment(f, span), encoding, 
+                                   namespaces)
+            pid, name, unit = _matml_details(element)
+            ids[pid], units[pid] = name, unit
+    return {'materials': materials, 'ids': ids, 'units': units,
+            'encoding': encoding, 'namespaces': namespaces}
+
+def matml_material(filename, span, ids, units, verbose=False,
+                   encoding='utf-8', namespaces=None):
+    """ builds one material from a MatML file using its byte offsets, 
+    encoding and namespaces from :func:`matml_index` 
+    
+    returns:
+        :class:`materialtools.Material`
+    """
+    with open(filename, 'rb') as f:
+        element = _matml_parse(_matml_fragment(f, span), encoding, 
+                               namespaces)
+    return _matml_material(element, ids, units, verbose)
+
+def _xlsx_rows(ws, width=2):
+    """ row values of a read-only worksheet, padded to at least ``width`` """
+    for row in ws.iter_rows(values_only=True):
+        row = list(row)
+        if len(row) < width: row += [None]*(width - len(row))
+        yield row
+
+def _xlsx_columns(ws):
+    """ reads a property sheet in one pass
+    
+    returns:
+        names, units, columns
+            the first two rows and the remaining values by column
+    """
+    rows = ws.iter_rows(values_only=True)
+    names = list(next(rows, []))
+    width = len(names)
+    units = (list(next(rows, [])) + [None]*width)[:width]
+    columns = [[] for _ in range(width)]
+    padding = [None]*width
+    for row in rows:
+        for column, value in zip(columns, row + tuple(padding)):
+            column.append(value)
+    return names, units, columns
+
 def xlsx(filename, 
          materialname = 'auto',
          filetype = 'xlsx',
          testing = False,
-         verbose = False):
+         verbose = False,
+         dtype = None):
 
     """Imports an xlsx file 
+    
+    The workbook is opened in read-only mode and each sheet is read in a 
+    single pass. Numeric parameter values are stored as lists, or as 
+    ``dtype`` numpy arrays if ``dtype`` is given (see 
+    :meth:`materialtools.MaterialParameter.compact`, or the ``compact`` 
+    option of :meth:`materialtools.MaterialData.import_file`). Formulas are
+    read as their last calculated values.
+    
     returns: 
         materialdata
     """
@@ -74,22 +420,31 @@ def xlsx(filename,
     material.filename = filename
     
     # open workbook
-    wb = load_workbook(filename)
-    
-    # get metadata information
-    if verbose is True: 
-        print(filename)
-    #ws = wb.get_sheet_by_name("Metadata") ## deprecated
-    ws = wb["Metadata"]
-    for row in ws.rows:
-        if row[0].value not in (
-                "Propertynames",
-                "Abbreviations",
-                "DataSources",
-                "Comments"):
-            material[row[0].value] = row[1].value
-    if materialname is 'auto':
-        #print('auto')
+    wb = load_workbook(filename, read_only=True, data_only=True)
+    try:
+        # get metadata information
+        if verbose is True: 
+            print(filename)
+        lists = {}
+        for row in _xlsx_rows(wb["Metadata"]):
+            if row[0] in (
+                    "Propertynames",
+                    "Abbreviations",
+                    "DataSources",
+                    "Comments"):
+                lists[row[0]] = row[1:]
+            else:
+                material[row[0]] = row[1]
+        
+        # read the property sheets
+        sheets = {}
+        for sheetname in wb.sheetnames:
+            if sheetname != "Metadata":
+                sheets[sheetname] = _xlsx_columns(wb[sheetname])
+    finally:
+        wb.close()
+        
+    if materialname == 'auto':
         material.name = material["MaterialName"]
     else:
         material.name = materialname
@@ -108,59 +463,35 @@ def xlsx(filename,
         material["Condition"] = material["DataSource"]
 
     # get dictionary of abbreviations
-    propertynames,abbreviations = [],[]
-    for row in ws.rows:
-        if row[0].value == "Propertynames":
-            propertynames = [cell.value for cell in row[1:]]
-        if row[0].value == "Abbreviations":
-            abbreviations = [cell.value for cell in row[1:]]
-        if row[0].value == "DataSources":
-            datasources = [cell.value for cell in row[1:]]
-        if row[0].value == "Comments":
-            comments = [cell.value for cell in row[1:]]
+    propertynames = lists.get("Propertynames", [])
+    abbreviations = lists.get("Abbreviations", [])
     assert abbreviations != [], "no property abbreviations found"
     propertydict = {x[0]:x[1] for x in zip(abbreviations,propertynames)}
-    try:
-        commentsdict = {x[0]:x[1] for x in zip(abbreviations,comments)}
-    except:
+    if "Comments" in lists:
+        commentsdict = {x[0]:x[1] for x in zip(abbreviations,lists["Comments"])}
+    else:
         commentsdict = {x:"" for x in abbreviations}
-            
-    try:
-        sourcedict = {x[0]:x[1] for x in zip(abbreviations,datasources)}
-    except:
+    if "DataSources" in lists:
+        sourcedict = {x[0]:x[1] for x in zip(abbreviations,lists["DataSources"])}
+    else:
         sourcedict = {x:material.source for x in abbreviations}
-    #print('\n\n\n',sourcedict)
-
-    # get names of remaining worksheets
-    #sheetnames = wb.get_sheet_names() ## deprecated
-    sheetnames = wb.sheetnames
-    sheetnames.pop(sheetnames.index("Metadata"))
-    for sheetname in sheetnames:
-        #ws = wb.get_sheet_by_name(sheetname) ## deprecated
-        ws = wb[sheetname]
+
+    for sheetname, (parameternames, parameterunits, parametervalues) \
+            in sheets.items():
         propertyname = propertydict[sheetname]
-        propertysource = sourcedict[sheetname]
-        propertycomments = commentsdict[sheetname]
         materialproperty = MaterialProperty(name = propertyname, 
-                                            source = propertysource,
-                                            comments = propertycomments)
-        #materialproperty["DataSource"] = propertysource
+                                            source = sourcedict[sheetname],
+                                            comments = commentsdict[sheetname])
 
         # write parameters        
-        parameternames = [cell.value for cell in [r for r in ws.rows][0]]
-        parameterunits = [cell.value for cell in [r for r in ws.rows][1]]
-        parametervalues = []
-        for i,parametername in enumerate(parameternames):
-            parametervalues.append(
-                [cell.value for cell in [c for c in ws.columns][i]][2:])
-        for i,p in enumerate(parameternames):
-            #print(parameterunits[i]*len(parametervalues[i]))
-            if parameterunits[i] is None: parameterunits[i] = ['']
-            units = [parameterunits[i]]*len(parametervalues[i])
-            materialproperty[p] = MaterialParameter(
-                                    parameternames[i],
-                                    units, 
-                                    parametervalues[i])
+        for p, unit, values in zip(parameternames, 
+                                   parameterunits, 
+                                   parametervalues):
+            if unit is None: unit = ''
+            materialproperty[p] = MaterialParameter(p, 
+                                                    [unit]*len(values), 
+                                                    values,
+                                                    dtype)
         
         material[propertyname] = materialproperty
 
@@ -173,6 +504,126 @@ def xlsx(filename,
         print('Imported: {} from {}'.format(material["MaterialName"],material.source))
     return materialdata
 
+def mtb_index(filename):
+    """ reads the index of a materialtools binary (.mtb) file without 
+    loading any materials
+    
+    returns:
+        dict with the ``format`` version, the ``materials`` (keys), their 
+        ``sources`` and the ``source`` and ``filename`` of the library
+    """
+    from materialtools import columnar
+    return columnar.metadata(filename)
+
+def mtb(filename, 
+        materialname = 'auto',
+        testing = False,
+        verbose = False,
+        mmap = True,
+        readonly = False):
+    """ imports a materialtools binary (.mtb) file written by 
+    :func:`materialtools.write.mtb`
+    
+    The values are memory-mapped from the file (copy-on-write, so the file
+    is never changed) unless ``mmap`` is False. If ``materialname`` is 
+    given only that material is loaded.
+    
+    returns:
+        materialdata
+    """
+    from materialtools import columnar
+    materialnames = None if materialname == 'auto' else [materialname]
+    materialdata = columnar.load(filename, mmap, readonly, materialnames)
+    if verbose is True: 
+        print('[read.py] {} materials loaded from {}'.format(
+            len(materialdata), filename))
+    return materialdata
+
+def jsonl_iter(filename, verbose = False):
+    """ yields the materials in a json lines file written by 
+    :func:`materialtools.write.jsonl` one at a time
+    
+    yields:
+        key, :class:`materialtools.Material`
+    """
+    from json import loads
+    from materialtools import columnar
+    with open(filename, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip() == '': continue
+            record = loads(line)
+            values = record.pop('values', [])
+            if verbose is True: print('[read.py] ', record['key'])
+            yield record['key'], columnar.unpack_material(record, values)
+
+def jsonl(filename, 
+          materialname = 'auto',
+          testing = False,
+          verbose = False):
+    """ imports a json lines file written by :func:`materialtools.write.jsonl`
+    
+    The file is read one line (material) at a time. If ``materialname`` is
+    given only that material is kept.
+    
+    returns:
+        materialdata
+    """
+    from materialtools import MaterialData
+    materialdata = MaterialData()
+    for key, material in jsonl_iter(filename, verbose):
+        if materialname in ('auto', key) and key not in materialdata:
+            materialdata[key] = material
+    materialdata.filename = [filename]
+    return materialdata
+
+def _json_object(cls, data, name):
+    """ builds a dict subclass from json data without its default entries """
+    obj = cls.__new__(cls)
+    obj.name = name
+    dict.update(obj, data)
+    return obj
+
+def json(filename, 
+         materialname = 'auto',
+         testing = False,
+         verbose = False):
+    """ imports a json file written by :func:`materialtools.write.json`
+    
+    The json file does not record object types, so these are inferred: 
+    dicts with a ``MaterialName`` become materials, dicts within them with
+    a ``PropertyName`` become properties and dicts within those with a 
+    ``ParameterName`` become parameters.
+    
+    returns:
+        materialdata
+    """
+    from json import load
+    from materialtools import (MaterialData, 
+                               Material, 
+                               MaterialProperty, 
+                               MaterialParameter)
+    with open(filename, 'r', encoding='utf-8') as f:
+        data = load(f)
+    materialdata = MaterialData()
+    for key, m in data.items():
+        if not (isinstance(m, dict) and 'MaterialName' in m): continue
+        if materialname not in ('auto', key): continue
+        material = _json_object(Material, m, m['MaterialName'])
+        material.source = m.get('DataSource')
+        for p, prop in m.items():
+            if not (isinstance(prop, dict) and 'PropertyName' in prop): continue
+            materialproperty = _json_object(MaterialProperty, prop, 
+                                            prop['PropertyName'])
+            for q, par in prop.items():
+                if isinstance(par, dict) and 'ParameterName' in par:
+                    dict.__setitem__(materialproperty, q, _json_object(
+                        MaterialParameter, par, par['ParameterName']))
+            dict.__setitem__(material, p, materialproperty)
+        materialdata[key] = material
+        if verbose is True: print('[read.py] ', key)
+    materialdata.filename = [filename]
+    return materialdata
+
 def textfile(filename = None, 
              materialname = 'auto',
              filetype = 'text', 
@@ -231,76 +682,113 @@ def textfile(filename = None,
     
     return materialdata
 
+def _csv_array(rows, width):
+    """ converts rows of strings to a 2d float array, empty or non-numeric
+    cells become nan """
+    import numpy as np
+    padding = ['']*width
+    cells = [cell if cell.strip() else 'nan' 
+             for row in rows for cell in (row + padding)[:width]]
+    try:
+        values = np.fromiter(map(float, cells), float, len(cells))
+    except ValueError:
+        def tofloat(cell):
+            try: return float(cell)
+            except ValueError: return np.nan
+        values = np.fromiter(map(tofloat, cells), float, len(cells))
+    return values.reshape(len(rows), width)
+
+def _csv_blocks(rows, materialname):
+    """ splits csv rows into (name, header, data rows) for each material, 
+    starting a new material at each row whose first cell contains "Name" """
+    blocks = []
+    for row in rows:
+        if not ''.join(row).strip(): continue
+        if "Name" in row[0]:
+            blocks.append([row[1].strip() if len(row) > 1 else materialname,
+                           None, []])
+        elif len(blocks) == 0 or blocks[-1][1] is None:
+            if len(blocks) == 0: blocks.append([materialname, None, []])
+            blocks[-1][1] = [cell.strip() for cell in row]
+        else:
+            blocks[-1][2].append(row)
+    return blocks
+
 def csv(filename,
         materialname = 'auto',
         filetype='csv',
-        testing=False):
+        testing=False,
+        verbose=False,
+        dtype=None):
     """ imports a csv file
+    
+    The file may hold several materials, each starting with a row whose 
+    first cell contains "Name" and whose second cell is the material name,
+    followed by a row of property names (the first must be "Temperature")
+    and the rows of values. ``materialname`` is used for a material without
+    a "Name" row ('auto' uses the file name).
+    
+    Each block of values is converted to a numpy array in one go. Missing 
+    or non-numeric values are masked out of each property, together with 
+    their temperatures. Values are stored as lists of floats, or as 
+    ``dtype`` numpy arrays if ``dtype`` is given.
+    
+    returns:
+        materialdata
     """
     
     import csv
+    import os
+    import numpy as np
     from materialtools import Material, MaterialData
-    material = Material()
-    rawdata = []
+
+    if materialname == 'auto':
+        materialname = os.path.splitext(os.path.basename(filename))[0]
 
     # import data from file
-    with open(filename, mode = 'r') as importedfile:
-        for row in csv.reader(importedfile):
-            rawdata.append(row)
-
-    materialnames = [row[0] for rows in [row for row in rawdata if "Name" in row[0]]]
-    print(materialnames)
-    # strip material name from top of file
-    if "Name" in rawdata[0][0]:
-        materialname = rawdata[0][1]
-        materialdata = rawdata[1:]
-
-    # strip property names from next line
-    propertynames = [propertyname.strip() for propertyname in materialdata[0]]
-    allvalues = materialdata[1:]
-
-    # check left hand column is temperature and get temperature values
-    assert propertynames[0] == "Temperature", "Temperature must be first column"
-    temperaturevalues = [row[0] for row in allvalues]
-
-    # populate material property values
-    for n,propertyname in enumerate(propertynames):
-        if propertyname not in ['','Temperature']:
-
-            # set up data structure
-            material[propertyname] = {propertyname:{"Units":'',"Values":[]},
-                            "Temperature":{
-                                "Units":'',"Values":[
-                                    x for x in temperaturevalues]},
-                            "Units":'',
-                            "Values":[]}
-
-            # fill in numbers
-            for i, row in enumerate(allvalues):
-                try:
-                    # get the datapoints in float format
-                    propval = float(row[n].strip())
-                    material[propertyname]["Values"].append(propval)
-                    material[
-                        propertyname][propertyname]["Values"].append(propval)
-                except:
-                    # say if there's no datapoint at this temperature
-                    missingt = material[
-                        propertyname]["Temperature"]["Values"][i]
-                    print("no value for",propertyname,"at",missingt)
-
-                    # mask off the temperature point
-                    material[propertyname]["Temperature"]["Values"][i]=None
-
-            # clean up the empty rows
-            material[propertyname]["Temperature"]["Values"] = [
-                x for x in material[
-                    propertyname]["Temperature"]["Values"] if x is not None]
-
-    # put the material data for each material in materialdata
+    with open(filename, mode = 'r', newline = '') as importedfile:
+        rows = list(csv.reader(importedfile))
+
     materialdata = MaterialData()
-    materialdata.update({materialname:material})
-    print("imported {} from {}".format(materialname,filename))
+    for name, propertynames, datarows in _csv_blocks(rows, materialname):
+        assert propertynames is not None and \
+            propertynames[0] == "Temperature", \
+            "Temperature must be first column"
+        values = _csv_array(datarows, len(propertynames))
+        if dtype is not None: values = values.astype(dtype)
+        temperatures = values[:, 0]
+        material = Material(name)
+
+        # populate material property values
+        for n, propertyname in enumerate(propertynames):
+            if propertyname in ['','Temperature']: continue
+            column = values[:, n]
+            mask = np.isfinite(column) & np.isfinite(temperatures)
+            if verbose is True and not mask.all():
+                print("no value for {} at {} temperatures".format(
+                    propertyname, np.count_nonzero(~mask)))
+            if dtype is None:
+                propertyvalues = column[mask].tolist()
+                parametervalues = column[mask].tolist()
+                temperaturevalues = temperatures[mask].tolist()
+            else:
+                propertyvalues = parametervalues = np.ascontiguousarray(
+                    column[mask])
+                temperaturevalues = np.ascontiguousarray(temperatures[mask])
+            material[propertyname] = {
+                propertyname:{"Units":'',"Values":parametervalues},
+                "Temperature":{"Units":'',"Values":temperaturevalues},
+                "Units":'',
+                "Values":propertyvalues}
+
+        # put the material data for each material in materialdata
+        if name in materialdata:
+            print("WARNING: {} appears more than once in {}, keeping the "
+                  "first".format(name, filename))
+            continue
+        materialdata[name] = material
+        if verbose is True: 
+            print("imported {} from {}".format(name,filename))
     return materialdata
     
 
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""sharing material data between processes without copying
+
+The numeric values of a :class:`materialtools.MaterialData` object are
+published once in a :class:`multiprocessing.shared_memory.SharedMemory`
+block. Worker processes receive only a small descriptor and attach
+read-only :class:`materialtools.Material` views on that block.
+
+Example
+-------
+
+    with SharedMaterialData(materialdata) as shared:
+        with ProcessPoolExecutor(initializer=setup,
+                                 initargs=(shared.descriptor,)) as pool:
+            ...
+
+    def setup(descriptor):
+        global library
+        library = attach(descriptor)
+
+.. moduleauthor:: adlhancock
+"""
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from materialtools import columnar
+
+
+def _open(name):
+    """ attaches to an existing shared memory block without registering
+    it for cleanup by this process """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        ## python < 3.13 always registers it with the resource tracker,
+        ## which is shared with the publishing process
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedMaterialData:
+    """ publishes the numeric tables of a MaterialData in shared memory
+
+    Parameters
+    ----------
+        materialdata
+            :class:`materialtools.MaterialData`
+        dtype
+            numpy dtype for the values
+        name
+            name for the shared memory block, default chosen by the system
+
+    Attributes
+    ----------
+        descriptor
+            small picklable :class:`dict` to send to workers,
+            see :func:`attach`
+    """
+    def __init__(self, materialdata, dtype='float64', name=None):
+        layout, values = columnar.pack(materialdata, dtype)
+        self.block = shared_memory.SharedMemory(create=True,
+                                                size=max(values.nbytes, 1),
+                                                name=name)
+        buffer = np.ndarray(values.shape, values.dtype, buffer=self.block.buf)
+        buffer[:] = values
+        del buffer
+        self.descriptor = {'name': self.block.name, 'layout': layout}
+
+    def attach(self, readonly=True):
+        """ returns a :class:`materialtools.MaterialData` view in this
+        process """
+        return attach(self.descriptor, readonly)
+
+    def close(self):
+        """ releases the shared memory block """
+        if self.block is not None:
+            self.block.close()
+            self.block.unlink()
+            self.block = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def attach(descriptor, readonly=True):
+    """ attaches to material data published by :class:`SharedMaterialData`
+
+    Parameters
+    ----------
+        descriptor
+            :attr:`SharedMaterialData.descriptor`
+        readonly
+            mark the ``Values`` arrays as read-only
+
+    Returns
+    -------
+        :class:`materialtools.MaterialData` whose ``Values`` arrays are
+        views on the shared memory block. The block stays attached for as
+        long as the returned object exists.
+    """
+    block = _open(descriptor['name'])
+    layout = descriptor['layout']
+    values = np.ndarray((layout['size'],), dtype=layout['dtype'],
+                        buffer=block.buf)
+    materialdata = columnar.unpack(layout, values, readonly)
+    materialdata.sharedmemory = block
+    return materialdata
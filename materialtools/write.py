@@ -9,19 +9,53 @@ def textfile(materialdata,filename,verbose=False):
     print('exporting text file not yet supported')
     pass
 
+def _tolist(x):
+    """ numpy values are not json serialisable """
+    import numpy as np
+    if isinstance(x, (np.ndarray, np.number)): return x.tolist()
+    raise TypeError('{} is not JSON serializable'.format(type(x)))
+
 def json(materialdata,filename,verbose=False):
         '''
         exports material property data from MatML_Data object in json format
         '''
-        data = dict(materialdata)
+        data = {name: materialdata[name] for name in materialdata}
         from json import dump
         with open(filename,'w') as f:
             dump(data,
                  f,
-                 indent=4)
+                 indent=4,
+                 default=_tolist)
         if verbose is True: print('exported json to',filename)
         return
         
+def jsonl(materialdata,filename,verbose=False,dtype='float64'):
+    """ exports material property data as json lines, one material per line
+    
+    Each line is the layout record of one material with its numeric values
+    inline (see :func:`materialtools.columnar.pack_material`), so 
+    :func:`materialtools.read.jsonl` can rebuild the Material, 
+    MaterialProperty and MaterialParameter objects one line at a time.
+    
+    returns:
+        dict with the ``filename`` and the number of ``materials``
+    """
+    from json import dumps
+    from materialtools import Material, columnar
+    summary = {'filename': filename, 'materials': 0}
+    with open(filename, 'w', encoding='utf-8') as f:
+        for key in materialdata:
+            material = materialdata[key]
+            if type(material) is not Material: continue
+            record, values = columnar.pack_material(material, key, dtype)
+            record['values'] = values.tolist()
+            f.write(dumps(record, default=_tolist))
+            f.write('\n')
+            summary['materials'] += 1
+    if verbose is True: 
+        print("wrote {materials} materials to {filename}".format(**summary))
+    return summary
+        
 def csv(materialdata,filename,verbose=False):
     """ exports materialdata as a csv file
     
@@ -77,269 +111,293 @@ def csv(materialdata,filename,verbose=False):
             tabulate_csv_data(outfile,materialdata)
     return
     
-def xlsx(materialdata,filepath,verbose=False):
-    """ writes to an excel file"""
+def _xlsx_column(values):
+    """ list of cell values, with missing numbers as empty cells """
+    if hasattr(values, 'tolist'): values = values.tolist()
+    return [None if isinstance(v, float) and v != v else v for v in values]
+
+def _xlsx_sheets(material, source, filenames, verbose=False):
+    """ the rows of each worksheet for one material
     
+    returns:
+        list of (sheet title, list of rows)
+    """
+    from itertools import zip_longest
+    from materialtools import MaterialProperty, MaterialParameter
+
+    ## this bit just takes the "useful" bits of metadata
+    metadata = [["MaterialName",material.name],
+                ["Condition",material["Condition"]]]
+    if "Description" in material:
+        metadata.append(["Description",material["Description"]])
+    metadata.append(["DataSource"]+[source])
+    metadata.append(["Filename"]+list(filenames))
+
+    ## get the property names, abbreviate, and add a table to the front ws.
+    properties = [material[p] for p in material 
+                  if type(material[p]) is MaterialProperty]
+    propertynames = [p['PropertyName'] for p in properties]
+    abbreviate = lambda name: ''.join([w[0] for w in name.split(' ')])
+    metadata.append(["Propertynames"]+propertynames)
+    metadata.append(["Abbreviations"]+[abbreviate(p) for p in propertynames])
+    sheets = [("Metadata", metadata)]
+
+    ## one worksheet for each property 
+    for prop in properties:
+        parameters = [prop[par] for par in prop 
+                      if type(prop[par]) is MaterialParameter]
+        names = [par["ParameterName"] for par in parameters]
+        if verbose is True: 
+            print('\t',prop["PropertyName"],':',names)
+        units = [par["Units"][0] for par in parameters]
+        columns = [_xlsx_column(par["Values"]) for par in parameters]
+        
+        ## if master property values not already given, add them if they are there
+        if prop["PropertyName"] not in names and "Values" in prop:
+            names.append(prop["PropertyName"])
+            units.append(prop["Units"][0])
+            columns.append(_xlsx_column(prop["Values"]))
+        rows = [names, units] + [list(row) for row in zip_longest(*columns)]
+        sheets.append((abbreviate(prop["PropertyName"]), rows))
+    return sheets
+
+def _xlsx_workbook(filename, sheets):
+    """ writes one workbook in write-only mode
+    
+    returns:
+        dict with the filename, status ('written', 'permission denied' or
+        'failed') and any error message
+    """
     from openpyxl import Workbook
-    from materialtools import Material, MaterialProperty, MaterialParameter
+    result = {'filename': filename, 'status': 'written', 'error': None}
+    try:
+        ## open the file first so that a bad target fails before any sheet
+        ## is streamed
+        with open(filename, 'wb') as f:
+            wb = Workbook(write_only=True)
+            for title, rows in sheets:
+                ws = wb.create_sheet(title=title)
+                for row in rows: ws.append(row)
+            wb.save(f)
+    except PermissionError as error:
+        result.update(status='permission denied', error=str(error))
+    except Exception as error:
+        result.update(status='failed', 
+                      error='{}: {}'.format(type(error).__name__, error))
+    return result
+
+def xlsx(materialdata,filepath,verbose=False,workers=None):
+    """ writes each material to its own excel file
+    
+    The workbooks are built in openpyxl write-only mode, one whole row at a
+    time. With ``workers`` they are written by a pool of that many 
+    processes.
+    
+    returns:
+        list of dicts, one per material, with the ``material`` name, the
+        ``filename``, the ``status`` ('written', 'permission denied' or 
+        'failed') and any ``error`` message
+    """
+    from materialtools import Material
     import os
     
     ## create directory if necessary
     if filepath.endswith('/'): filepath = filepath[:-1]
-    try: os.stat(filepath)
-    except FileNotFoundError: 
-        os.mkdir(filepath) 
+    if not os.path.isdir(filepath):
+        os.makedirs(filepath) 
         print("creating directory:",filepath)
-    except: raise
         
     ## cycle through materials
-    materials = [materialdata[m] for m in materialdata if type(materialdata[m]) is Material]
-    for m in materials:
-        ## create empty workbook and dictionary of worksheets
-        wb = Workbook()
-        
-        ## create materialdata metadata worksheet
-        ws = wb.active
-        ws.title = "Metadata"
+    names, filenames, sheets = [], [], []
+    for name in materialdata:
+        m = materialdata[name]
+        if type(m) is not Material: continue
+        if verbose is True: print(m.name)
+        names.append(m.name)
+        filenames.append('{}/{}-{}.xlsx'.format(filepath,m.name,
+                                                materialdata.source))
+        sheets.append(_xlsx_sheets(m, materialdata.source, 
+                                   materialdata.filename, verbose))
 
-        ## this bit just takes the "useful" bits of metadata
-        ws.append(["MaterialName",m.name])
-        ws.append(["Condition",m["Condition"]])
-        try: ws.append(["Description",m["Description"]])
-        except: pass
-        ws.append(["DataSource"]+[materialdata.source])
-        ws.append(["Filename"]+materialdata.filename)
-        
-        
-        ## get the property names, abbreviate, and add a table to the front ws.
-        properties = [m[p] for p in m if type(m[p]) is MaterialProperty]
-        propertynames = [p['PropertyName'] for p in properties]
-        abbreviate = lambda name: ''.join([w[0] for w in name.split(' ')])
-        abbreviations = [abbreviate(p) for p in propertynames]
-        ws.append(["Propertynames"]+propertynames)        
-        ws.append(["Abbreviations"]+abbreviations)
-        """
-        for row in zip(abbreviations,properties):
-            ws.append([row[0],row[1]["Name"]])
-        """ 
-        ## cycle through properties
-        for prop in properties:
-            propertyname = prop["PropertyName"]
-            
-            ## create a worksheet for each property 
-            ws=wb.create_sheet(title=abbreviate(propertyname))
-            
-            ## cycle through parameters for each property
-            parameters = [prop[par] for par in prop 
-                                if type(prop[par]) is MaterialParameter]
-            #print("XXX",parameters,"XXX")                                                          #### debug
-            parameternames = [par["ParameterName"] for par in parameters]
+    ## save workbook for each material
+    if workers is None or workers == 1:
+        results = list(map(_xlsx_workbook, filenames, sheets))
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_xlsx_workbook, filenames, sheets))
+    for name, result in zip(names, results):
+        result['material'] = name
+        if result['status'] != 'written':
+            print("cannot write {}: {}".format(result['filename'],
+                                               result['error']))
+        elif verbose is True: print("wrote {}".format(result['filename']))
+    return results
 
-            if verbose is True: 
-                print('\t',prop["PropertyName"],':',parameternames)
-
-            ws.append(parameternames)
-            units = [par["Units"][0] for par in parameters]
-            ws.append(units)
-            for i,par in enumerate(parameters):
-                for j,val in enumerate(par["Values"]):
-                    ws.cell(row=j+3,column=i+1,value=val)
-                    
-            ## if master property values not already given, add them if they are there
-            if prop["PropertyName"] not in parameternames:
-                if "Values" in prop:
-                    ws.cell(row = 1, column = len(parameters)+1,value=prop["PropertyName"])
-                    ws.cell(row = 2, column = len(parameters)+1,value=prop["Units"][0])
-                    for j, val in enumerate(prop["Values"]):
-                        ws.cell(row = j+3, column=len(parameters)+1,value=val)
-                    
-            ## add columns for other fields
-            pass
-        ## save workbook for each material
-        filename = '{}/{}-{}.xlsx'.format(filepath,m.name,materialdata.source)
-        tryagain = True
-        writefile = True
-        while tryagain is True:
-            try: 
-                #   print("trying to open ",filename)
-                with open(filename,'w') as _: pass
-                tryagain = False
-            except PermissionError: 
-                print()
-                t = input("cannot open {}".format(filename)+
-                          "\nPermission denied, try again? [Y/n]")
-                if t.lower() in ["no","n"]: 
-                    tryagain = False
-                    writefile = False
-                
-        if writefile is True: wb.save(filename=filename)
-        if verbose is True: print("wrote {}".format(filename))
-    return wb
+def _matml_data(values):
+    """ returns (format, text) for a list or array of values """
+    from xml.sax.saxutils import escape
+    if hasattr(values, "tolist"): values = values.tolist()
+    if len(values) == 0: return "", ""
+    dformat = str(type(values[0]).__name__)
+    if dformat == "str": dformat = "string"
+    elif dformat == "NoneType": dformat = ""
+    elif dformat == "int": dformat = "float"
+    if dformat == "string" and '-' in values: return dformat, "-"
+    return dformat, escape(','.join(map(str, values)))
 
-def matml(materialdata,filename,verbose=False,ansys=True):
-    """ writes MatML file [*]_
+def matml_iter(materialdata, ansys=True, summary=None, ids=None):
+    """ yields a MatML document as consecutive pieces of text
     
-    .. [*] not yet completely compatible with ANSYS
-    """
+    Each material is converted only when it is reached, so the document 
+    is never held in memory as a whole.
     
+    arguments:
+        materialdata:
+            :class:`materialtools.MaterialData`
+        ansys:
+            wrap the MatML_Doc in an ANSYS EngineeringData element
+        summary:
+            optional dict, counts of ``materials``, ``properties`` and 
+            ``parameters`` are added to it
+        ids:
+            :class:`materialtools.ids.IdRegistry` to take the property and
+            parameter ids from, default 
+            :meth:`materialtools.MaterialData.id_registry`. Only the ids 
+            used by the materials written are listed in the Metadata.
+    """
+    from xml.sax.saxutils import escape
     from materialtools import Material
     from materialtools import MaterialProperty as Property
     from materialtools import MaterialParameter as Parameter
-
-    def write_material(material,indent=1):
-        """
-        """
-        ''' write the top lines'''
-        material_lines = ["<Material>\n\t<BulkDetails>"]
-        
-        ''' get the non-property material atributes'''
-        othervalues = [p for p in material if type(material[p]) is not Property]
-        #for value in othervalues:     
-        for value in ["Name","Description"]:     
-            ''' write each non-property attribute to a line'''
-            material_lines.append('\t\t<{0:}>{1:}</{0:}>'.format(value,material[value]))
-        
-        ''' get the list of properties for this material'''
-        properties = [p for p in material.values() if type(p) is Property]
-        for mproperty in properties:
-            '''write the lines for each property '''
-            material_lines.append(write_property(mproperty))
-            
-        ''' close the tags'''    
-        material_lines.append("\t</BulkDetails>\n</Material>")
-        linesep = "\n"+"\t"*indent
-        return linesep.join(material_lines)
-        
-    def write_property(materialproperty,indent=2):
-        """ write property
-        
-        runs through a material property and writes parameters
-        """
-        ''' find the id'''
-        id = materialdata.ids[materialproperty["Name"]]
-
-        ''' write the first line'''
-        property_lines = ["\t\t<PropertyData property=\"{}\">".format(id)]
-        
-        ''' get the list of parameters'''
-        parameters = [pa for pa in materialproperty.values() if type(pa) is Parameter]
-        for parameter in parameters:
-            
-            ''' write the lines for each parameter'''
-            property_lines.append(write_parameter(parameter))
-            
-        ''' write the closing tag on the last line'''    
-        property_lines.append("</PropertyData>")
-        linesep = "\n"+"\t"*indent
-        return linesep.join(property_lines)
-
-    def write_parameter(materialparameter,indent=3):
-        """ write parameter
-        
-        runs through qualifiers in a parameter and writes them as xml
-        """
-        name = materialparameter["Name"]
-        mid = materialdata.ids[name]
-        
-        data = materialparameter["Values"]
-
-        dformat = str(type(data[0]).__name__)
-        if dformat == "str": dformat = "string"
-        elif dformat == "NoneType": dformat = ""
-        elif dformat == "int": dformat = "float"
-        
-        try: data = ','.join([str(x) for x in data])
-        except: pass
-        if '-' in data: data = "-"
-        qualifiers = []
-        
-        parameter_lines = ["<ParameterValue parameter='{}' format=\"{}\">".format(mid,dformat)]
-        parameter_lines.append("<Data format=\"{}\">{}</Data>".format(dformat,data))
-        
-        for qualifier in qualifiers:
-            parameter_lines.append(write_qualifier(qualifier))
-            
-        parameter_lines.append("</ParameterValue>")
-        linesep = "\n"+"\t"*indent
-        return linesep.join(parameter_lines)
-                
-    def write_qualifier(qualifier,indent=4):
-        """
-        """
-        name = ''
-        data = ''
-        #name = qualifier.keys()
-        #content = (x for x in qualifier.values())
-        qualifier_lines = "<Qualifier name =\"{}\">{}</Qualifier>".format(name,data)
-        
-        linesep = "\n"+"\t"*indent
-        return linesep.join(qualifier_lines)
-
-    def write_metadata(materialdata,indent=2):
-        mdata_lines = ["<Metadata>"]
-        properties = [pr for pr in materialdata.ids.items() if "pr" in pr[1]]
-        parameters = [pa for pa in materialdata.ids.items() if "pa" in pa[1]]        
-        properties.sort(key=lambda x: x[1])
-        parameters.sort(key=lambda x: x[1])
-        for pa in parameters:
-            name, paid = pa
-            mdata_lines.append("<ParameterDetails id=\"{}\">".format(paid))
-            mdata_lines.append("\t<Name>{}</Name>".format(name))
-            mdata_lines.append(write_unitlines(materialdata,paid))
-            mdata_lines.append("</ParameterDetails>")
-        
-        for pr in properties:
-            name, prid = pr
-            mdata_lines.append("<PropertyDetails id=\"{}\">".format(prid))
-            mdata_lines.append("\t<Name>{}</Name>".format(name))
-            mdata_lines.append(write_unitlines(materialdata,prid))
-            mdata_lines.append("</PropertyDetails>")
-        
-
-        
-        mdata_lines.append("</Metadata>")
-        linesep = "\n"+"\t"*indent
-        return linesep.join(mdata_lines)
+    from materialtools.ids import name as _matml_name
+    if summary is None: summary = {}
+    summary.update(materials=0, properties=0, parameters=0)
     
-    def write_unitlines(materialdata,pid,indent = 1):
-        unitlines = ["\t<Unitless />"]
-        linesep = "\n"+"\t"*indent
-        return linesep.join(unitlines)
+    try: 
+        registry = materialdata.id_registry() if ids is None \
+            else ids.add(materialdata)
+    except: print("could not generate ids for metadata"); raise
+    ## only the ids used in this document are listed in its Metadata
+    used = {'properties': set(), 'parameters': set()}
+    def property_id(name):
+        used['properties'].add(name)
+        return registry.property_id(name)
+    def parameter_id(name):
+        used['parameters'].add(name)
+        return registry.parameter_id(name)
+    
+    if ansys is True:
+        yield ("<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n"+
+               "<EngineeringData version='15.0.0.504' versiondate='16/10/2013 16:34:00'>\n"+
+               "\t<Notes>\n"+
+               "\t</Notes>\n"+
+               "<Materials>\n")
+    yield "<MatML_Doc>"
+    for name in materialdata:
+        material = materialdata[name]
+        if type(material) is not Material: continue
+        summary['materials'] += 1
+        yield ("\n\t<Material>\n\t<BulkDetails>"+
+               "\n\t\t\t<Name>{}</Name>".format(
+                   escape(str(material.get("Name", material.name))))+
+               "\n\t\t\t<Description>{}</Description>".format(
+                   escape(str(material.get("Description")))))
+        for materialproperty in material.values():
+            if type(materialproperty) is not Property: continue
+            summary['properties'] += 1
+            lines = ["\n\t\t\t<PropertyData property=\"{}\">".format(
+                escape(property_id(_matml_name(materialproperty))))]
+            for parameter in materialproperty.values():
+                if type(parameter) is not Parameter: continue
+                summary['parameters'] += 1
+                dformat, data = _matml_data(parameter["Values"])
+                lines.append(
+                    "\n\t\t<ParameterValue parameter='{}' format=\"{}\">".format(
+                        escape(parameter_id(_matml_name(parameter))), dformat)+
+                    "\n\t\t\t<Data format=\"{}\">{}</Data>".format(
+                        dformat, data)+
+                    "\n\t\t\t</ParameterValue>")
+            lines.append("\n\t\t</PropertyData>")
+            yield ''.join(lines)
+        yield "\n\t\t</BulkDetails>\n</Material>"
+    
+    lines = ["\n\t<Metadata>"]
+    for tag, details, names in (
+            ("ParameterDetails", registry.parameters, used['parameters']), 
+            ("PropertyDetails", registry.properties, used['properties'])):
+        for name, pid in details.items():
+            if name not in names: continue
+            lines.append("\n\t\t<{} id=\"{}\">".format(tag, escape(pid))+
+                         "\n\t\t\t<Name>{}</Name>".format(escape(str(name)))+
+                         "\n\t\t\t<Unitless />"+
+                         "\n\t\t</{}>".format(tag))
+    lines.append("\n\t\t</Metadata>")
+    yield ''.join(lines)
+    yield "\n\t</MatML_Doc>"
+    if ansys is True:
+        yield "\n</Materials>\n</EngineeringData>"
 
-    def write_matml_lines(materialdata,indent = 1):
-        try: materialdata.generate_ids()
-        except: print("could not generate ids for metadata"); raise
-        materials = [m for m in materialdata.values() if type(m) is Material]
-        #print([m.name for m in materials])    
-        matml_lines = ["<MatML_Doc>"]
-        for material in materials:
-            matml_lines.append(write_material(material))
-            
-        matml_lines.append(write_metadata(materialdata))
-        matml_lines.append("</MatML_Doc>")
-        
-        linesep = "\n"+"\t"*indent
-        return linesep.join(matml_lines)
+def matml(materialdata,filename,verbose=False,ansys=True,buffering=2**20,
+          ids=None):
+    """ writes MatML file [*]_
+    
+    The document is streamed to the file material by material (see 
+    :func:`matml_iter`).
+    
+    ``ids`` may be a :class:`materialtools.ids.IdRegistry` or the name of 
+    a json file of ids (see :meth:`materialtools.ids.IdRegistry.save`), 
+    which is read if it exists and updated with any new ids, so that 
+    repeated exports use the same ids.
+    
+    returns:
+        dict with the ``filename``, the number of utf-8 encoded ``bytes`` 
+        written and the number of ``materials``, ``properties`` and 
+        ``parameters``
+    
+    .. [*] not yet completely compatible with ANSYS
+    """
+    from materialtools.ids import IdRegistry
+    idfile = ids if isinstance(ids, str) else None
+    if idfile is not None: ids = IdRegistry.load(idfile)
+    encoding = "utf-8"
+    summary = {'filename': filename, 'bytes': 0}
+    with open(filename, "w", encoding=encoding, buffering=buffering) as f:
+        for text in matml_iter(materialdata, ansys, summary, ids):
+            f.write(text)
+            summary['bytes'] += len(text.encode(encoding))
+    if idfile is not None: ids.save(idfile)
+    if verbose is True: 
+        print("wrote {materials} materials to {filename}".format(**summary))
+    return summary
 
-    matml_lines = write_matml_lines(materialdata)
-    if ansys is True:
-        xml_wrapper = ["<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n"+
-                       "<EngineeringData version='15.0.0.504' versiondate='16/10/2013 16:34:00'>\n"+
-                       "\t<Notes>\n"+
-                       "\t</Notes>\n"+
-                       "<Materials>\n",
-                        "\n</Materials>\n"+
-                        "</EngineeringData>"]
-        matml_lines = xml_wrapper[0]+matml_lines+xml_wrapper[1]
-        
-    try:
-        with open(filename,"w") as f:
-            f.writelines(matml_lines)
-    except:
-        print("no file output")
-        #raise
+def mtb(materialdata,filename,verbose=False,dtype='float64'):
+    """ writes a materialtools binary (.mtb) file
     
-    return matml_lines
+    Every numeric ``Values`` list is stored in one contiguous ``dtype`` 
+    array, after a json index of the materials and a json layout of their 
+    properties, parameters, units and sources (see 
+    :func:`materialtools.columnar.save`). 
+    :func:`materialtools.read.mtb` memory-maps the array back.
+    
+    returns:
+        dict with the ``filename``, the number of ``materials`` and the 
+        number of ``values``
+    """
+    from materialtools import Material, columnar
+    keys = [k for k in materialdata if type(materialdata[k]) is Material]
+    index = {'format': 1,
+             'materials': keys,
+             'sources': [materialdata[k].source for k in keys],
+             'source': getattr(materialdata, 'source', None),
+             'filename': list(getattr(materialdata, 'filename', []))}
+    layout = columnar.save(materialdata, filename, dtype, index)
+    summary = {'filename': filename, 
+               'materials': len(layout['materials']), 
+               'values': layout['size']}
+    if verbose is True: 
+        print("wrote {materials} materials to {filename}".format(**summary))
+    return summary
 
 def list_contents(material):
     """ lists the contents of a material object
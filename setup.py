@@ -21,5 +21,10 @@ setup(
     author_email='david@adlhancock.net',
     url='https://github.com/adlhancock/materialtools',
     #license=license,
-    packages=find_packages(exclude=('tests', 'docs','sampledata'))
+    packages=find_packages(exclude=('tests', 'docs','sampledata')),
+    entry_points={
+        'console_scripts': [
+            'materialtools-convert=materialtools.convert:main',
+        ],
+    },
 )
\ No newline at end of file
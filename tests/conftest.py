@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""shared fixtures for the materialtools tests"""
+import pytest
+
+from materialtools import (MaterialData,
+                           Material,
+                           MaterialProperty,
+                           MaterialParameter)
+
+temperatures = [20., 200., 400., 600., 800., 1000.]
+
+
+def tabulated(name, temperatures, values, units='-', parametername=None):
+    """ a property with one dependent parameter against Temperature """
+    parametername = parametername or name
+    materialproperty = MaterialProperty(name=name, units=[units], values=[],
+                                        source='test')
+    materialproperty['Temperature'] = MaterialParameter(
+        'Temperature', ['C']*len(temperatures), list(temperatures))
+    materialproperty[parametername] = MaterialParameter(
+        parametername, [units]*len(values), list(values))
+    return materialproperty
+
+
+def make_material(name='Tungsten', scale=1.0):
+    """ a material with the properties used by the calculators """
+    material = Material(name)
+    material['Condition'] = 'annealed'
+    material['DataSource'] = 'test ' + name
+    material.source = material['DataSource']
+    material['Thermal Conductivity'] = tabulated(
+        'Thermal Conductivity', temperatures,
+        [scale*v for v in (170., 160., 150., 140., 130., 120.)], 'W/m.K')
+    material['Coefficient of Thermal Expansion'] = tabulated(
+        'Coefficient of Thermal Expansion', temperatures,
+        [4.5e-6, 4.6e-6, 4.7e-6, 4.8e-6, 4.9e-6, 5.0e-6], '1/K')
+    material['Ultimate Tensile Strength'] = tabulated(
+        'Ultimate Tensile Strength', temperatures,
+        [scale*v for v in (900e6, 800e6, 700e6, 600e6, 500e6, 400e6)], 'Pa')
+    elasticity = tabulated('Elasticity', temperatures,
+                           [400e9, 395e9, 390e9, 385e9, 380e9, 375e9], 'Pa',
+                           "Young's Modulus")
+    elasticity["Poisson's Ratio"] = MaterialParameter(
+        "Poisson's Ratio", ['-']*6, [0.28]*6)
+    material['Elasticity'] = elasticity
+    material['Density'] = tabulated('Density', [20.], [19300.*scale],
+                                    'kg/m^3')
+    return material
+
+
+def matml_document(n=3):
+    """ an Ansys style MatML document with ``n`` materials """
+    materials = []
+    for i in range(n):
+        materials.append('''<Material><BulkDetails>
+<Name>Steel {i}</Name><Description>grade {i} &amp; co</Description>
+<PropertyData property="pr0"><Data format="string">-</Data>
+<Qualifier name="Behavior">Isotropic</Qualifier>
+<ParameterValue parameter="pa0" format="float">
+<Data>{a},{b},{c}</Data>
+<Qualifier name="Variable Type">Dependent,Dependent,Dependent</Qualifier>
+</ParameterValue>
+<ParameterValue parameter="pa1" format="float"><Data>20,100,200</Data>
+<Qualifier name="Variable Type">Independent,Independent,Independent</Qualifier>
+</ParameterValue>
+</PropertyData>
+<PropertyData property="pr1"><Data format="string">-</Data>
+<ParameterValue parameter="pa2" format="float"><Data>{k},38,36,34</Data>
+</ParameterValue>
+<ParameterValue parameter="pa1" format="float"><Data>20,200,400,600</Data>
+</ParameterValue>
+</PropertyData>
+</BulkDetails></Material>'''.format(i=i, a=7800+i, b=7790+i, c=7780+i,
+                                     k=40+i))
+    return '''<?xml version="1.0" encoding="UTF-8"?>
+<EngineeringData version="15"><Notes></Notes><Materials><MatML_Doc>
+{}
+<Metadata>
+<ParameterDetails id="pa0"><Name>Density</Name><Units><Unit><Name>kg</Name>
+</Unit><Unit power="-3"><Name>m</Name></Unit></Units></ParameterDetails>
+<ParameterDetails id="pa1"><Name>Temperature</Name><Units><Unit><Name>C</Name>
+</Unit></Units></ParameterDetails>
+<ParameterDetails id="pa2"><Name>Thermal Conductivity</Name><Units><Unit>
+<Name>W</Name></Unit><Unit power="-1"><Name>m</Name></Unit><Unit power="-1">
+<Name>C</Name></Unit></Units></ParameterDetails>
+<PropertyDetails id="pr0"><Name>Density</Name><Unitless/></PropertyDetails>
+<PropertyDetails id="pr1"><Name>Thermal Conductivity</Name><Unitless/>
+</PropertyDetails>
+</Metadata></MatML_Doc></Materials></EngineeringData>
+'''.format('\n'.join(materials))
+
+
+@pytest.fixture
+def matmlfile(tmp_path):
+    filename = tmp_path / 'library.xml'
+    filename.write_text(matml_document(), encoding='utf-8')
+    return str(filename)
+
+
+@pytest.fixture
+def material():
+    return make_material()
+
+
+@pytest.fixture
+def materialdata():
+    materialdata = MaterialData()
+    for i in range(3):
+        name = 'Material {}'.format(i)
+        materialdata[name] = make_material(name, 1 + 0.1*i)
+    return materialdata
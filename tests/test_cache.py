@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""tests for the on-disk cache of imported files"""
+import os
+
+import numpy as np
+import pytest
+
+from materialtools import MaterialData, cache
+from conftest import matml_document
+
+## reader arguments import_file uses, which are part of the cache key
+reader = {'materialname': 'auto'}
+
+
+@pytest.fixture
+def cachedir(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, 'directory', str(tmp_path / 'cache'))
+    monkeypatch.setattr(cache, 'maxsize', cache.maxsize)
+    return tmp_path / 'cache'
+
+
+def test_cache_hit(matmlfile, cachedir):
+    first = MaterialData()
+    first.import_file(matmlfile, cache=True)
+    assert len(cache.entries()) == 1
+    assert cache.load(matmlfile, **reader) is not None
+
+    second = MaterialData()
+    second.import_file(matmlfile, cache=True)
+    assert second.materialnames == first.materialnames
+    values = second['Steel 1']['Density']['Density']['Values']
+    assert isinstance(values, np.ndarray)
+    assert list(values) == first['Steel 1']['Density']['Density']['Values']
+    assert second['Steel 1'].get_value('Thermal Conductivity', 300) == \
+        first['Steel 1'].get_value('Thermal Conductivity', 300)
+
+
+def test_stale_entries_are_not_used(matmlfile, cachedir):
+    MaterialData().import_file(matmlfile, cache='hash')
+    assert cache.load(matmlfile, hashed=True, **reader) is not None
+
+    with open(matmlfile, 'w') as f:
+        f.write(matml_document(4))
+    assert cache.load(matmlfile, **reader) is None
+    materialdata = MaterialData()
+    materialdata.import_file(matmlfile, cache='hash')
+    assert len(materialdata.materialnames) == 4
+
+    ## same size and modification time, different contents
+    status = os.stat(matmlfile)
+    with open(matmlfile, 'w') as f:
+        f.write(matml_document(4).replace('7803', '7903'))
+    os.utime(matmlfile, ns=(status.st_atime_ns, status.st_mtime_ns))
+    assert cache.load(matmlfile, **reader) is not None
+    assert cache.load(matmlfile, hashed=True, **reader) is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, cachedir):
+    filenames = []
+    for i in range(3):
+        filename = tmp_path / 'library{}.xml'.format(i)
+        filename.write_text(matml_document(2))
+        filenames.append(str(filename))
+        MaterialData().import_file(str(filename), cache=True)
+        os.utime(cache.entry(str(filename), **reader), (1000 + i, 1000 + i))
+    sizes = [os.path.getsize(cache.entry(f, **reader)) for f in filenames]
+
+    cache.load(filenames[0], **reader)
+    cache.evict(sizes[0] + sizes[2])
+    assert [os.path.isfile(cache.entry(f, **reader)) for f in filenames] == \
+        [True, False, True]
+
+    cache.configure(maxsize=0)
+    MaterialData().import_file(filenames[1], cache=True)
+    assert cache.entries() == []
+
+
+@pytest.mark.parametrize('workers', [None, 2])
+def test_import_directory_uses_cache(tmp_path, cachedir, workers):
+    for name in ('a', 'b'):
+        (tmp_path / (name + '.xml')).write_text(matml_document(2).replace(
+            'Steel', name))
+    materialdata = MaterialData()
+    materialdata.import_directory(str(tmp_path), filetype='xml',
+                                  workers=workers, cache=True)
+    assert len(cache.entries()) == 2
+    again = MaterialData()
+    again.import_directory(str(tmp_path), filetype='xml', workers=workers,
+                           cache=True)
+    assert again.materialnames == materialdata.materialnames == \
+        ['a 0', 'a 1', 'b 0', 'b 1']
+    assert isinstance(again['b 1']['Density']['Density']['Values'],
+                      np.ndarray)
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""tests for polynomial (Calculated) properties"""
+import numpy as np
+import pytest
+
+from materialtools import MaterialProperty
+
+
+@pytest.fixture
+def calculated():
+    return MaterialProperty.Calculated('Thermal Conductivity', 'W/m.K',
+                                       [100., 0.5, -1e-4], [0., 1000.])
+
+
+def test_value_evaluates_every_term(calculated):
+    assert calculated.value(200.) == pytest.approx(100. + 100. - 4.)
+    values = calculated.value([0., 500., 1000.])
+    assert np.allclose(values, [100., 325., 500.])
+
+
+def test_value_outside_temperaturerange(calculated):
+    assert calculated.value(1050., tolerance=100) == calculated.value(1000.)
+    assert np.isnan(calculated.value(1200., tolerance=100))
+    with pytest.raises(ValueError):
+        calculated.value([500., 1200.], strict=True)
+
+
+def test_tabulate_matches_value(calculated):
+    tabulated = calculated.tabulate(npoints=11)
+    temperatures = tabulated['Temperature']['Values']
+    assert len(temperatures) == 11
+    assert np.allclose(tabulated['Thermal Conductivity']['Values'],
+                       calculated.value(temperatures))
+
+
+def test_material_lookups(material, calculated):
+    material['Thermal Conductivity'] = calculated
+    assert material.get_value('Thermal Conductivity', 200.) == \
+        pytest.approx(196.)
+    assert np.allclose(
+        material.get_values('Thermal Conductivity', [0., 1000.]),
+        [100., 500.])
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""tests for the figure of merit and thermal stress calculators"""
+import numpy as np
+import pytest
+
+from materialtools import MaterialProperty
+from materialtools.calculators import (thermal_stress_fom,
+                                       thermal_stress_fom_matrix)
+
+temperatures = np.array([20., 150., 333., 600., 1000.])
+
+
+def test_fom_matrix_matches_scalar_fom(materialdata):
+    M = thermal_stress_fom_matrix(materialdata, temperatures)
+    assert M.shape == (3, 5)
+    for i, name in enumerate(materialdata):
+        expected = [thermal_stress_fom(materialdata[name], t)
+                    for t in temperatures]
+        assert np.allclose(M[i], expected)
+
+
+def test_fom_matrix_rows_follow_materials(materialdata, material):
+    del material['Ultimate Tensile Strength']
+    materials = [materialdata['Material 1'], material]
+    M = thermal_stress_fom_matrix(materials, temperatures)
+    assert np.isfinite(M[0]).all()
+    assert np.isnan(M[1]).all()
+    with pytest.raises(TypeError):
+        thermal_stress_fom_matrix([materialdata['Material 1'], 'Material 2'],
+                                  temperatures)
+
+
+def test_fom_with_calculated_property(material):
+    expected = thermal_stress_fom(material, 300.)
+    material['Coefficient of Thermal Expansion'] = MaterialProperty.Calculated(
+        'Coefficient of Thermal Expansion', '1/K', [4.5e-6, 5e-10],
+        [0., 1000.])
+    assert thermal_stress_fom(material, 300.) == pytest.approx(expected)
+    M = thermal_stress_fom_matrix([material], [300.])
+    assert M[0, 0] == pytest.approx(expected)
+
+
+def test_populate_thermal_stress_fom(material):
+    fom = material.populate_thermal_stress_fom(range(0, 1100, 100))
+    values = fom['Thermal Stress Figure of Merit']['Values']
+    assert type(values) is list
+    assert fom['Temperature']['Values'] == [float(t)
+                                            for t in range(0, 1100, 100)]
+    assert values[3] == pytest.approx(thermal_stress_fom(material, 300.))
+    material.compact('float32')
+    fom = material.populate_thermal_stress_fom(range(0, 1100, 100))
+    assert fom['Thermal Stress Figure of Merit']['Values'].dtype == np.float32
+
+
+def test_sweep_matches_scalar_stress(materialdata):
+    from materialtools.calculators import (thermal_missmatch_stress,
+                                           thermal_missmatch_stress_sweep)
+    armour, heatsink = materialdata['Material 0'], materialdata['Material 2']
+    thickness = np.array([1e-3, 2e-3, 5e-3])
+    heat_flux = np.array([[1e6], [5e6]])
+    stress = thermal_missmatch_stress_sweep(armour, heatsink, thickness, 3e-3,
+                                            heat_flux, 2e4, 400.)
+    assert stress.shape == (2, 3)
+    for i, q in enumerate(heat_flux[:, 0]):
+        for j, t1 in enumerate(thickness):
+            assert stress[i, j] == pytest.approx(thermal_missmatch_stress(
+                armour, heatsink, t1, 3e-3, q, 2e4, 400.))
+    grid = thermal_missmatch_stress_sweep(armour, heatsink, thickness, 3e-3,
+                                          heat_flux[:, 0], 2e4, 400.,
+                                          grid=True)
+    assert np.allclose(grid[:, 0, :, 0, 0].T, stress)
+
+
+def test_converged_layer_temperatures(materialdata):
+    from materialtools.calculators import (solve_layer_temperatures,
+                                           thermal_missmatch_stress)
+    armour, heatsink = materialdata['Material 0'], materialdata['Material 2']
+    inputs = (armour, heatsink, 5e-3, 3e-3, np.array([1e6, 4e6]), 2e4, 400.)
+    T1, T2, info = solve_layer_temperatures(*inputs, convergence=1e-6)
+    assert info['converged'].all()
+    k1 = armour.get_values('Thermal Conductivity', T1, tolerance=200)
+    assert np.allclose(T1, 400. + inputs[4]/2e4 + inputs[4]*5e-3/(2*k1))
+    _, _, aitken = solve_layer_temperatures(*inputs, convergence=1e-6,
+                                            acceleration='aitken')
+    assert aitken['converged'].all()
+
+    fixed = thermal_missmatch_stress(armour, heatsink, 5e-3, 3e-3, 4e6,
+                                     2e4, 400.)
+    converged, info = thermal_missmatch_stress(armour, heatsink, 5e-3, 3e-3,
+                                               4e6, 2e4, 400.,
+                                               convergence=1e-6,
+                                               max_iterations=50,
+                                               full_output=True)
+    assert info['converged']
+    assert converged != fixed
+    assert converged == pytest.approx(fixed, rel=0.05)
+    with pytest.raises(ValueError):
+        thermal_missmatch_stress(armour, heatsink, 5e-3, 3e-3, 1e9, 2e4,
+                                 400., convergence=0.01)
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""tests for packing material data into one array"""
+import gc
+import json
+
+import numpy as np
+import pytest
+
+from materialtools import Material, MaterialParameter, MaterialProperty
+from materialtools import columnar
+
+
+def same_values(a, b):
+    """ compares two trees of materials, properties and parameters """
+    assert type(a) is type(b)
+    assert list(a) == list(b)
+    for key in a:
+        if isinstance(a[key], dict):
+            same_values(a[key], b[key])
+        elif key == 'Values' and a[key] is not None:
+            assert np.array_equal(np.asarray(a[key], dtype=float), b[key],
+                                  equal_nan=True)
+        elif isinstance(a[key], MaterialProperty.Calculated):
+            assert vars(a[key]) == vars(b[key])
+        else:
+            assert a[key] == b[key]
+
+
+def test_pack_unpack_round_trip(materialdata):
+    materialdata['Material 1'].set_value('Density', [20.], [9000.])
+    materialdata['Material 2']['Thermal Conductivity'] = \
+        MaterialProperty.Calculated('Thermal Conductivity', 'W/m.K',
+                                    [100., 0.1], [0., 1000.])
+    layout, values = columnar.pack(materialdata)
+    assert values.ndim == 1 and values.flags['C_CONTIGUOUS']
+    json.dumps(layout)
+
+    unpacked = columnar.unpack(layout, values)
+    assert list(unpacked) == list(materialdata)
+    for name in materialdata:
+        same_values(materialdata[name], unpacked[name])
+        assert unpacked[name].name == materialdata[name].name
+        for t in (20., 333., 1000.):
+            assert unpacked[name].get_value('Thermal Conductivity', t) == \
+                materialdata[name].get_value('Thermal Conductivity', t)
+    conductivity = unpacked['Material 0']['Thermal Conductivity']
+    assert isinstance(conductivity, MaterialProperty)
+    assert isinstance(conductivity['Temperature'], MaterialParameter)
+    assert np.shares_memory(conductivity['Temperature']['Values'], values)
+    with pytest.raises(ValueError):
+        conductivity['Temperature']['Values'][0] = 0.
+
+    subset = columnar.unpack(layout, values.tobytes(),
+                             materialnames=['Material 1'])
+    assert list(subset) == ['Material 1']
+    assert isinstance(subset['Material 1'], Material)
+
+
+def test_shared_memory_attach(materialdata):
+    from materialtools.sharedmemory import SharedMaterialData
+    with SharedMaterialData(materialdata, dtype='float32') as shared:
+        attached = shared.attach()
+        material = attached['Material 2']
+        assert material['Density']['Density']['Values'].dtype == np.float32
+        assert material.get_value('Ultimate Tensile Strength', 300.) == \
+            pytest.approx(materialdata['Material 2'].get_value(
+                'Ultimate Tensile Strength', 300.))
+        del attached, material
+        gc.collect()
+
+
+def test_mtb_round_trip(materialdata, tmp_path):
+    from materialtools import MaterialData, read
+    materialdata.source = 'test library'
+    filename = str(tmp_path / 'library.mtb')
+    materialdata.export_file(filename)
+    with open(filename, 'rb') as f:
+        written = f.read()
+
+    index = read.mtb_index(filename)
+    assert index['materials'] == list(materialdata)
+    assert index['source'] == 'test library'
+
+    imported = MaterialData()
+    imported.import_file(filename)
+    assert list(imported) == list(materialdata)
+    for name in materialdata:
+        same_values(materialdata[name], imported[name])
+        assert imported[name].source == materialdata[name].source
+        assert imported[name].get_value('Density', 20.) == \
+            materialdata[name].get_value('Density', 20.)
+
+    values = imported['Material 0']['Density']['Density']['Values']
+    values[0] = 0.
+    del imported, values
+    gc.collect()
+    with open(filename, 'rb') as f:
+        assert f.read() == written
+    assert read.mtb(filename)['Material 0'].get_value('Density', 20.) == \
+        19300.
+
+    single = read.mtb(filename, materialname='Material 2', mmap=False)
+    assert list(single) == ['Material 2']
+    same_values(materialdata['Material 2'], single['Material 2'])
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""tests for numpy-backed parameter values"""
+import numpy as np
+
+from materialtools import MaterialParameter
+
+
+def test_parameter_compact():
+    parameter = MaterialParameter('Temperature', ['C']*3, [20, 200., 400.])
+    assert parameter.is_compact is False
+    assert parameter.compact() is True
+    assert parameter.is_compact is True
+    assert parameter['Values'].dtype == np.float64
+    assert parameter['Values'].flags['C_CONTIGUOUS']
+    assert parameter['Units'] == ['C']
+    assert list(parameter['Values']) == [20., 200., 400.]
+
+
+def test_parameter_compact_float32_and_missing_values():
+    parameter = MaterialParameter('Density', ['kg/m^3']*2, [7800., None],
+                                  dtype='float32')
+    assert parameter['Values'].dtype == np.float32
+    assert parameter['Values'][0] == 7800.
+    assert np.isnan(parameter['Values'][1])
+
+
+def test_non_numeric_values_are_left_alone():
+    parameter = MaterialParameter('Behaviour', ['-'], ['Isotropic'])
+    assert parameter.compact() is False
+    assert parameter['Values'] == ['Isotropic']
+
+
+def test_material_compact_keeps_lookups(material):
+    before = material.get_value('Thermal Conductivity', 300)
+    material.compact('float32')
+    conductivity = material['Thermal Conductivity']['Thermal Conductivity']
+    assert conductivity['Values'].dtype == np.float32
+    assert material.get_value('Thermal Conductivity', 300) == before
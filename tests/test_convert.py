@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""tests for converting directories of material files"""
+import os
+
+from materialtools import convert, read
+
+
+def write_csv(filename, conductivity):
+    with open(filename, 'w') as f:
+        f.write('Material Name,{}\n'.format(
+            os.path.splitext(os.path.basename(filename))[0]))
+        f.write('Temperature,Thermal Conductivity\n')
+        f.write('20,{}\n400,{}\n'.format(conductivity, conductivity - 20))
+
+
+def age(filename, seconds=100):
+    """ moves the modification time of a file into the past """
+    t = os.path.getmtime(filename) - seconds
+    os.utime(filename, (t, t))
+
+
+def test_convert_directory_is_incremental(tmp_path):
+    source, target = tmp_path / 'source', tmp_path / 'target'
+    (source / 'metals').mkdir(parents=True)
+    write_csv(str(source / 'copper.csv'), 400)
+    write_csv(str(source / 'metals' / 'iron.csv'), 80)
+    (source / 'broken.csv').write_text('Material Name,Broken\nDensity,1\n')
+    (source / 'notes.txt').write_text('not converted')
+
+    result = convert.convert_directory(str(source), str(target), 'jsonl')
+    assert sorted(map(os.path.basename, result['converted'])) == \
+        ['copper.csv', 'iron.csv']
+    assert list(map(os.path.basename, result['failed'])) == ['broken.csv']
+    assert 'AssertionError' in list(result['failed'].values())[0]
+    iron = read.jsonl(str(target / 'metals' / 'iron.jsonl'))['iron']
+    assert iron.get_value('Thermal Conductivity', 20) == 80.
+    assert os.path.exists(str(target / convert.manifestname))
+
+    ## outputs newer than their sources are skipped
+    result = convert.convert_directory(str(source), str(target), '.jsonl')
+    assert result['converted'] == []
+    assert len(result['skipped']) == 2
+
+    ## a touched but unchanged source matches its recorded digest
+    age(str(target / 'copper.jsonl'))
+    result = convert.convert_directory(str(source), str(target), 'jsonl')
+    assert result['converted'] == []
+
+    ## a changed source is converted again
+    write_csv(str(source / 'copper.csv'), 390)
+    age(str(target / 'copper.jsonl'))
+    result = convert.convert_directory(str(source), str(target), 'jsonl')
+    assert list(map(os.path.basename, result['converted'])) == ['copper.csv']
+    copper = read.jsonl(str(target / 'copper.jsonl'))['copper']
+    assert copper.get_value('Thermal Conductivity', 20) == 390.
+
+    result = convert.convert_directory(str(source), str(target), 'jsonl',
+                                       force=True, workers=2)
+    assert len(result['converted']) == 2 and len(result['failed']) == 1
+
+
+def test_main(tmp_path):
+    source = tmp_path / 'source'
+    source.mkdir()
+    write_csv(str(source / 'copper.csv'), 400)
+    target = tmp_path / 'copper.json'
+    assert convert.main([str(source / 'copper.csv'), str(target)]) == 0
+    assert list(read.json(str(target))) == ['copper']
+    assert convert.main([str(source), str(tmp_path / 'out'),
+                         '--format', 'mtb']) == 0
+    assert list(read.mtb(str(tmp_path / 'out' / 'copper.mtb'))) == ['copper']
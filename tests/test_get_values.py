@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""tests for vectorised property lookups"""
+import numpy as np
+import pytest
+
+from materialtools import interpolate
+
+
+def test_get_values_matches_get_value(material):
+    temperatures = np.array([20., 110., 200., 555., 1000.])
+    values = material.get_values('Thermal Conductivity', temperatures)
+    expected = [material.get_value('Thermal Conductivity', t)
+                for t in temperatures]
+    assert np.allclose(values, expected)
+
+
+def test_get_values_keeps_shape_and_parameter1(material):
+    temperatures = np.array([[100., 300.], [500., 700.]])
+    values = material.get_values('Elasticity', temperatures, 'Temperature',
+                                 "Young's Modulus")
+    assert values.shape == (2, 2)
+    assert values[0, 0] == pytest.approx(400e9 - 5e9*80/180)
+
+
+def test_get_values_tolerance(material):
+    values = material.get_values('Thermal Conductivity',
+                                 [-50., 1050., 1200.], tolerance=100)
+    assert values[0] == 170.
+    assert values[1] == 120.
+    assert np.isnan(values[2])
+    with pytest.raises(ValueError):
+        material.get_values('Thermal Conductivity', [1200.], strict=True)
+
+
+def test_nearest():
+    xp, fp = interpolate.breakpoints([0., 10., 20.], [1., 2., 3.])
+    values = interpolate.nearest(xp, fp, [4., 6., 26., 40.], tolerance=10)
+    assert list(values[:3]) == [1., 2., 3.]
+    assert np.isnan(values[3])
+
+
+def test_breakpoints_sorts_and_drops_missing_values():
+    xp, fp = interpolate.breakpoints([200., 20., None, 100.],
+                                     [2., 0.2, 5., np.nan])
+    assert list(xp) == [20., 200.]
+    assert list(fp) == [0.2, 2.]
+
+
+@pytest.mark.parametrize('method', interpolate.methods)
+def test_scalar_lookups_match_array_lookups(method):
+    index = interpolate.BreakpointIndex([400., 20., 200., 200.5, 1000.],
+                                        [3., 1., 2., 2.5, 0.])
+    x = np.concatenate([np.linspace(-150., 1150., 261), [20., 400., np.nan]])
+    expected = index.evaluate(x, method, tolerance=100)
+    values = [index.evaluate(v, method, tolerance=100) for v in x]
+    assert all(type(v) is float for v in values)
+    assert np.allclose(values, expected, equal_nan=True)
+
+
+def test_index_is_rebuilt_when_values_are_replaced(material):
+    assert material.get_value('Thermal Conductivity', 110.) == 165.
+    conductivity = material['Thermal Conductivity']['Thermal Conductivity']
+    conductivity['Values'] = [v*2 for v in conductivity['Values']]
+    assert material.get_value('Thermal Conductivity', 110.) == 330.
+    assert material.get_value('Thermal Conductivity', 150.,
+                              method='nearest') == 320.
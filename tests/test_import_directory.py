@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""tests for importing directories of material files"""
+import numpy as np
+import pytest
+
+from materialtools import MaterialData
+from conftest import matml_document
+
+
+@pytest.fixture
+def directory(tmp_path):
+    (tmp_path / 'a.xml').write_text(matml_document(2))
+    (tmp_path / 'b.xml').write_text(
+        matml_document(2).replace('Steel', 'Alloy'))
+    (tmp_path / 'c.xml').write_text('<EngineeringData><Materials>')
+    return str(tmp_path)
+
+
+@pytest.mark.parametrize('workers', [None, 1, 2])
+def test_import_directory_collects_errors(directory, workers):
+    materialdata = MaterialData()
+    materialdata.import_directory(directory, filetype='xml', workers=workers)
+    assert materialdata.materialnames == ['Steel 0', 'Steel 1',
+                                          'Alloy 0', 'Alloy 1']
+    assert list(materialdata.import_errors) == [directory + '/c.xml']
+    assert 'Error' in materialdata.import_errors[directory + '/c.xml']
+
+    materialdata.import_directory(directory, filetype='csv')
+    assert materialdata.import_errors == {}
+
+
+def test_import_directory_compact(directory):
+    for workers in (None, 2):
+        materialdata = MaterialData()
+        materialdata.import_directory(directory, filetype='xml',
+                                      workers=workers, compact='float32')
+        values = materialdata['Alloy 1']['Density']['Density']['Values']
+        assert values.dtype == np.float32
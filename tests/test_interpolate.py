@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""tests for the cubic interpolation methods"""
+import numpy as np
+import pytest
+
+from materialtools import interpolate
+
+
+def cubic(method, xp, fp, x, tolerance=100):
+    xk, c = interpolate.coefficients(np.asarray(xp, dtype=float),
+                                     np.asarray(fp, dtype=float), method)
+    return interpolate.piecewise(xk, c, x, tolerance)
+
+
+@pytest.mark.parametrize('method', interpolate.cubicmethods)
+def test_linear_data_is_reproduced(method):
+    xp = [0., 100., 250., 300., 600.]
+    x = np.linspace(0., 600., 25)
+    assert np.allclose(cubic(method, xp, [2*v + 5 for v in xp], x), 2*x + 5)
+
+
+@pytest.mark.parametrize('method', interpolate.cubicmethods)
+def test_two_points_are_linear(method):
+    values = cubic(method, [0., 10.], [1., 3.], [0., 2.5, 10., 15., 200.])
+    assert np.allclose(values[:4], [1., 1.5, 3., 3.])
+    assert np.isnan(values[4])
+
+
+@pytest.mark.parametrize('method, expected', [('spline', 0.6875),
+                                              ('pchip', 0.75),
+                                              ('akima', 0.75)])
+def test_three_points(method, expected):
+    values = cubic(method, [0., 1., 2.], [0., 1., 0.], [0., 0.5, 1., 1.5, 2.])
+    assert np.allclose(values, [0., expected, 1., expected, 0.])
+
+
+def test_pchip_is_monotone():
+    xp = [0., 1., 2., 3., 4.]
+    fp = [0., 0., 1., 1., 5.]
+    values = cubic('pchip', xp, fp, np.linspace(0., 4., 401))
+    assert (np.diff(values) >= -1e-12).all()
+    assert values.min() >= 0. and values.max() <= 5.
+
+
+@pytest.mark.parametrize('method', interpolate.cubicmethods)
+def test_against_scipy(method):
+    scipy = pytest.importorskip('scipy.interpolate')
+    xp = np.array([20., 150., 200., 400., 650., 800., 1000.])
+    fp = np.array([170., 163., 159., 150., 137., 131., 120.])
+    reference = {'spline': lambda: scipy.CubicSpline(xp, fp,
+                                                     bc_type='natural'),
+                 'pchip': lambda: scipy.PchipInterpolator(xp, fp),
+                 'akima': lambda: scipy.Akima1DInterpolator(xp, fp)}[method]()
+    x = np.linspace(20., 1000., 97)
+    assert np.allclose(cubic(method, xp, fp, x), reference(x))
+
+
+@pytest.mark.parametrize('method', interpolate.cubicmethods)
+def test_material_lookups(material, method):
+    values = material.get_values('Thermal Conductivity', [20., 310., 1050.],
+                                 method=method)
+    assert values[0] == 170. and values[2] == 120.
+    assert material.get_value('Thermal Conductivity', 310.,
+                              method=method) == pytest.approx(values[1])
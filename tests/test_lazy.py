@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""tests for lazily read MatML files"""
+import json
+
+from materialtools import MaterialData, read, write
+from materialtools.classes.matml import LazyMaterial
+
+matml = '''<?xml version="1.0" encoding="UTF-8"?>
+<EngineeringData version="15"><Notes></Notes><Materials><MatML_Doc>
+<Material><BulkDetails><Name>Steel 0</Name>
+<PropertyData property="pr0"><Data format="string">-</Data>
+<ParameterValue parameter="pa0" format="float"><Data>7800,7790,7780</Data></ParameterValue>
+<ParameterValue parameter="pa1" format="float"><Data>20,100,200</Data></ParameterValue>
+</PropertyData>
+</BulkDetails></Material>
+<Material><BulkDetails><Name>Steel 1</Name>
+<PropertyData property="pr0"><Data format="string">-</Data>
+<ParameterValue parameter="pa0" format="float"><Data>7801,7791,7781</Data></ParameterValue>
+<ParameterValue parameter="pa1" format="float"><Data>20,100,200</Data></ParameterValue>
+</PropertyData>
+</BulkDetails></Material>
+<Metadata>
+<ParameterDetails id="pa0"><Name>Density</Name><Units><Unit><Name>kg</Name></Unit><Unit power="-3"><Name>m</Name></Unit></Units></ParameterDetails>
+<ParameterDetails id="pa1"><Name>Temperature</Name><Units><Unit><Name>C</Name></Unit></Units></ParameterDetails>
+<PropertyDetails id="pr0"><Name>Density</Name><Unitless/></PropertyDetails>
+</Metadata></MatML_Doc></Materials></EngineeringData>
+'''
+
+
+def test_export_lazily_read_file(tmp_path):
+    source = tmp_path / 'library.xml'
+    source.write_text(matml)
+    target = str(tmp_path / 'library.json')
+
+    write.json(read.matml(str(source), lazy=True), target)
+    with open(target) as f:
+        exported = json.load(f)
+    assert sorted(exported) == ['Steel 0', 'Steel 1']
+    density = exported['Steel 1']['Density']['Density']['Values']
+    assert density == [7801., 7791., 7781.]
+
+    materialdata = MaterialData()
+    materialdata.import_file(str(source), lazy=True)
+    materialdata.export_file(target)
+    assert not any(type(m) is LazyMaterial
+                   for m in dict(materialdata).values())
+    with open(target) as f:
+        assert sorted(json.load(f)) == ['Steel 0', 'Steel 1']
+
+
+def test_views_load_one_material_at_a_time(matmlfile):
+    materialdata = MaterialData()
+    materialdata.import_file(matmlfile, lazy=True)
+    values = materialdata.values()
+    assert len(values) == 3
+    assert all(type(m) is LazyMaterial for m in dict.values(materialdata))
+
+    first = next(iter(values))
+    assert first.name == 'Steel 0'
+    assert [type(m) is LazyMaterial for m in dict.values(materialdata)] == \
+        [False, True, True]
+    name, material = list(materialdata.items())[2]
+    assert name == 'Steel 2' and material['MaterialName'] == 'Steel 2'
+
+
+def test_lazy_materials_match_eager_read(matmlfile):
+    eager = read.matml(matmlfile, streaming=True)
+    lazy = read.matml(matmlfile, lazy=True)
+    for name in eager:
+        assert dict(lazy[name]) == dict(eager[name])
+
+
+def test_lazy_read_keeps_encoding_and_namespaces(tmp_path):
+    import re
+    from conftest import matml_document
+    document = matml_document().replace('grade 1 &amp; co', 'grade 1 \xe9')
+    document = document.replace('encoding="UTF-8"', 'encoding="ISO-8859-1"')
+    prefixed = re.sub(r'<(/?)(?=[A-Za-z])', r'<\1m:', document).replace(
+        '<m:EngineeringData', '<m:EngineeringData xmlns:m="urn:matml"', 1)
+    default = document.replace('<EngineeringData',
+                               '<EngineeringData xmlns="urn:matml"', 1)
+    for i, text in enumerate((document, prefixed, default)):
+        filename = tmp_path / 'library{}.xml'.format(i)
+        filename.write_bytes(text.encode('latin-1'))
+        materialdata = read.matml(str(filename), lazy=True)
+        material = materialdata['Steel 1']
+        assert material['Description'] == 'grade 1 \xe9'
+        assert material['Density']['Density']['Values'] == \
+            [7801., 7791., 7781.]
+        assert material['Density']['Density']['Units'] == ['kg.m^-3']
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""tests for :class:`materialtools.Material` lookups"""
+import pytest
+
+from materialtools import Material, MaterialProperty, MaterialParameter
+
+
+def conductivity():
+    material = Material('Tungsten')
+    tc = MaterialProperty(name='Thermal Conductivity', units=['W/m.K'],
+                          values=[], source='test')
+    tc['Temperature'] = MaterialParameter('Temperature', ['C']*3,
+                                          [20., 200., 400.])
+    tc['Thermal Conductivity'] = MaterialParameter('Thermal Conductivity',
+                                                   ['W/m.K']*3,
+                                                   [170., 160., 150.])
+    material['Thermal Conductivity'] = tc
+    return material
+
+
+def test_cached_value_follows_replaced_values():
+    material = conductivity()
+    material.enable_cache()
+    assert material.get_value('Thermal Conductivity', 200) == 160.
+    assert material.get_value('Thermal Conductivity', 200) == 160.
+    assert material.cache_info()['hits'] == 1
+
+    parameter = material['Thermal Conductivity']['Thermal Conductivity']
+    parameter['Values'] = [270., 260., 250.]
+    assert material.get_value('Thermal Conductivity', 200) == 260.
+    assert material.get_values('Thermal Conductivity', [200])[0] == 260.
+
+
+def test_cache_evicts_least_recently_used():
+    material = conductivity()
+    material.enable_cache(maxsize=2)
+    for t in (20, 200, 20, 400):
+        material.get_value('Thermal Conductivity', t)
+    info = material.cache_info()
+    assert (info['hits'], info['misses'], info['currsize']) == (1, 3, 2)
+    material.get_value('Thermal Conductivity', 20)
+    assert material.cache_info()['hits'] == 2
+    material.get_value('Thermal Conductivity', 200)
+    assert material.cache_info()['misses'] == 4
+
+
+def test_cache_is_cleared_by_changes():
+    material = conductivity()
+    material.enable_cache()
+    material.get_value('Thermal Conductivity', 200)
+    material.set_value('Thermal Conductivity', [20., 400.], [10., 30.])
+    assert material.get_value('Thermal Conductivity', 200) == \
+        pytest.approx(10. + 20.*180/380)
+
+    material = conductivity()
+    material.enable_cache()
+    values = material['Thermal Conductivity']['Thermal Conductivity']['Values']
+    material.get_value('Thermal Conductivity', 200)
+    values[1] = 0.
+    assert material.get_value('Thermal Conductivity', 200) == 160.
+    material.invalidate()
+    assert material.get_value('Thermal Conductivity', 200) == 0.
+    material.disable_cache()
+    assert material.cache_info() is None
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""tests for the MaterialData name, condition and source indexes"""
+from conftest import make_material
+
+from materialtools import MaterialData
+from materialtools.classes.matml import LazyMaterial
+
+
+def test_indexes_follow_changes(materialdata):
+    assert materialdata.materialnames == ['Material 0', 'Material 1',
+                                          'Material 2']
+    assert materialdata.conditions == ['annealed']*3
+    assert materialdata.find(name='Material 1') == {'Material 1'}
+    assert materialdata.find(condition='annealed') == set(materialdata)
+
+    hardened = make_material('Material 1')
+    hardened['Condition'] = 'hardened'
+    materialdata['Material 1'] = hardened
+    assert materialdata.find(condition='hardened') == {'Material 1'}
+    assert materialdata.find(condition='annealed') == {'Material 0',
+                                                       'Material 2'}
+
+    del materialdata['Material 0']
+    materialdata.pop('Material 2')
+    assert materialdata.materialnames == ['Material 1']
+    assert materialdata.find(name='Material 0') == set()
+    assert materialdata.find(condition='annealed') == set()
+    assert materialdata.find() == {'Material 1'}
+
+    materialdata.update({'Copy': make_material('Material 1')})
+    assert materialdata.find(name='Material 1') == {'Material 1', 'Copy'}
+    assert materialdata.find(name='Material 1',
+                             condition='hardened') == {'Material 1'}
+    assert materialdata.sources == ['test Material 1']*2
+    materialdata.clear()
+    assert materialdata.materialnames == [] and materialdata.find() == set()
+
+
+def test_lazy_materials_are_indexed(matmlfile):
+    materialdata = MaterialData()
+    materialdata.import_file(matmlfile, lazy=True)
+    assert materialdata.materialnames == ['Steel 0', 'Steel 1', 'Steel 2']
+    assert type(dict.get(materialdata, 'Steel 1')) is LazyMaterial
+    assert materialdata.find(name='Steel 1') == {'Steel 1'}
+    condition = materialdata['Steel 1']['Condition']
+    assert materialdata.find(name='Steel 1', condition=condition) == \
+        {'Steel 1'}
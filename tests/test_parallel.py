@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""tests for the process-pool sweep runner"""
+import numpy as np
+import pytest
+
+from materialtools import parallel
+from materialtools.calculators import (thermal_missmatch_stress_sweep,
+                                       thermal_stress_fom_matrix)
+
+
+def test_parallel_sweep_matches_serial(materialdata):
+    armour, heatsink = materialdata['Material 0'], materialdata['Material 2']
+    inputs = dict(thickness_1=np.linspace(1e-3, 6e-3, 7),
+                  thickness_2=3e-3,
+                  heat_flux=np.linspace(1e6, 5e6, 5),
+                  htc=np.array([1e4, 3e4]),
+                  T_coolant=400.)
+    serial = thermal_missmatch_stress_sweep(armour, heatsink, grid=True,
+                                            **inputs)
+    for workers in (1, 2):
+        stress = thermal_missmatch_stress_sweep(armour, heatsink, grid=True,
+                                                workers=workers, **inputs)
+        assert stress.shape == serial.shape
+        assert np.array_equal(stress, serial, equal_nan=True)
+    stress = thermal_missmatch_stress_sweep(armour, heatsink, grid=True,
+                                            workers=2, shared=True, **inputs)
+    assert np.array_equal(stress, serial, equal_nan=True)
+
+
+def test_parallel_fom_matrix_matches_serial(materialdata):
+    temperatures = np.linspace(0., 1100., 23)
+    serial = thermal_stress_fom_matrix(materialdata, temperatures)
+    M = thermal_stress_fom_matrix(materialdata, temperatures, workers=2)
+    assert np.array_equal(M, serial, equal_nan=True)
+    M = thermal_stress_fom_matrix(materialdata, temperatures, workers=2,
+                                  shared=True)
+    assert np.array_equal(M, serial, equal_nan=True)
+
+
+def square(x):
+    return x**2
+
+
+def test_workers():
+    values = np.arange(10.)
+    assert np.array_equal(parallel.sweep(square, (), {'x': values},
+                                         workers=0, chunksize=3),
+                          values**2)
+    with pytest.raises(ValueError):
+        parallel.sweep(square, (), {'x': values}, workers=-1)
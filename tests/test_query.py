@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""tests for range-indexed property queries"""
+import numpy as np
+import pytest
+from conftest import make_material, tabulated
+
+from materialtools import Material, MaterialData, MaterialProperty
+from materialtools import query
+
+
+def library(n=200, seed=1):
+    """ materials with random tabulated and calculated properties """
+    rng = np.random.default_rng(seed)
+    materialdata = MaterialData()
+    for i in range(n):
+        material = Material('M{}'.format(i))
+        low = rng.uniform(0, 300)
+        high = low + rng.uniform(0, 1200)
+        temperatures = np.sort(rng.uniform(low, high, rng.integers(1, 12)))
+        material['Thermal Conductivity'] = tabulated(
+            'Thermal Conductivity', temperatures,
+            rng.uniform(50, 300, len(temperatures)), 'W/m.K')
+        material['Density'] = tabulated('Density', [20.],
+                                        [rng.uniform(2000, 20000)], 'kg/m^3')
+        if i % 5 == 0:
+            material['Specific Heat'] = MaterialProperty.Calculated(
+                'Specific Heat', 'J/kg.K',
+                list(rng.uniform(-1, 1, 4)*[100, 1, 1e-3, 1e-6]), [low, high])
+        materialdata['k{}'.format(i)] = material
+    return materialdata
+
+
+def brute_force(material, propertyname, operator, value, between, mode,
+                tolerance):
+    """ checks a condition by evaluating the property on a fine grid """
+    materialproperty = material.get(propertyname)
+    if materialproperty is None: return False
+    index = None
+    if isinstance(materialproperty, MaterialProperty.Calculated):
+        xmin, xmax = sorted(materialproperty.temperaturerange)
+    else:
+        index = material._index(propertyname, 'Temperature', propertyname,
+                                materialproperty[propertyname]['Values'])
+        xmin, xmax = index.xmin, index.xmax
+    if between is None: low, high = xmin, xmax
+    else: low, high = np.min(between), np.max(between)
+    if mode == 'all' and not (low >= xmin - tolerance and
+                              high <= xmax + tolerance): return False
+    if mode == 'any' and not (high >= xmin - tolerance and
+                              low <= xmax + tolerance): return False
+    points = np.linspace(low, high, 2001)
+    if index is not None:
+        points = np.concatenate(
+            [points, index.xp[(index.xp >= low) & (index.xp <= high)]])
+    values = np.asarray(material.get_values(propertyname, points,
+                                            tolerance=tolerance))
+    values = values[~np.isnan(values)]
+    if len(values) == 0: return False
+    passed = query.operators[operator](values, value)
+    return bool(passed.all() if mode == 'all' else passed.any())
+
+
+@pytest.mark.parametrize('condition, mode, tolerance', [
+    (('Thermal Conductivity', '>', 150, (400, 800)), 'all', 0),
+    (('Thermal Conductivity', '<', 120, (400, 800)), 'any', 0),
+    (('Thermal Conductivity', '<=', 200, None), 'all', 0),
+    (('Thermal Conductivity', '>=', 250, 500.), 'all', 50),
+    (('Thermal Conductivity', '>', 200, (100, 900)), 'any', 100),
+    (('Specific Heat', '>', 50, (300, 600)), 'all', 0),
+    (('Specific Heat', '<', 50, (300, 600)), 'any', 0),
+    (('Density', '<', 10000), 'all', 0)])
+def test_query_matches_brute_force(condition, mode, tolerance):
+    materialdata = library()
+    found = materialdata.query([condition], mode=mode, tolerance=tolerance)
+    between = condition[3] if len(condition) > 3 else None
+    expected = [key for key in materialdata
+                if brute_force(materialdata[key], *condition[:3], between,
+                               mode, tolerance)]
+    assert found == expected
+    assert 0 < len(found) < len(materialdata)
+
+
+def test_indexes_are_reused_and_rebuilt():
+    materialdata = library(50)
+    conditions = [('Thermal Conductivity', '>', 100), ('Density', '<', 1e4)]
+    found = materialdata.query(conditions)
+    indexes = dict(materialdata.rangeindexes)
+    assert materialdata.query(conditions) == found
+    assert all(materialdata.rangeindexes[k] is v for k, v in indexes.items())
+
+    key = found[0]
+    materialdata[key]['Density']['Density']['Values'] = [1e9]
+    assert key not in materialdata.query(conditions)
+    del materialdata[found[1]]
+    assert found[1] not in materialdata.query(conditions)
+    assert query.query(materialdata, conditions[0]) == \
+        materialdata.query([conditions[0]])
+
+
+def test_parameter1():
+    materialdata = MaterialData()
+    for i in range(3):
+        materialdata['W{}'.format(i)] = make_material('W{}'.format(i))
+    materialdata['W2']['Elasticity']["Young's Modulus"]['Values'] = \
+        [100e9]*6
+    condition = (('Elasticity', "Young's Modulus"), '>', 200e9)
+    assert materialdata.query([condition]) == ['W0', 'W1']
+    assert materialdata.query([('Elasticity', '>', 200e9)],
+                              parameter1="Young's Modulus") == ['W0', 'W1']
+    assert materialdata.query([(('Elasticity', "Poisson's Ratio"), '<',
+                                0.3)]) == ['W0', 'W1', 'W2']
+    with pytest.raises(ValueError, match='several dependent parameters'):
+        materialdata.query([('Elasticity', '>', 200e9)])
+
+
+def test_property_without_temperatures_holds_everywhere():
+    materialdata = MaterialData()
+    for name, density in (('light', 2700.), ('heavy', 19300.)):
+        material = make_material(name)
+        material['Density'] = MaterialProperty(name='Density',
+                                               units=['kg/m^3'],
+                                               values=[density])
+        materialdata[name] = material
+    assert materialdata.query([('Density', '<', 5000, (100, 900))]) == \
+        ['light']
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""tests for the file readers"""
+import numpy as np
+import pytest
+
+from materialtools import MaterialData, read
+
+
+def test_streaming_matml_matches_xmltodict(matmlfile):
+    expected = read.matml(matmlfile)
+    streamed = read.matml(matmlfile, streaming=True)
+    assert list(streamed) == list(expected) == ['Steel 0', 'Steel 1',
+                                                'Steel 2']
+    for name in expected:
+        assert dict(streamed[name]) == dict(expected[name])
+        assert streamed[name].get_value('Thermal Conductivity', 300) == \
+            expected[name].get_value('Thermal Conductivity', 300)
+    materials = read.matml_iter(matmlfile)
+    assert next(materials).name == 'Steel 0'
+
+
+def test_import_file_streaming(matmlfile):
+    materialdata = MaterialData()
+    materialdata.import_file(matmlfile, streaming=True)
+    assert materialdata.materialnames == ['Steel 0', 'Steel 1', 'Steel 2']
+    assert materialdata['Steel 2']['Density']['Density']['Values'] == \
+        [7802., 7792., 7782.]
+
+
+def write_workbook(filename):
+    openpyxl = pytest.importorskip('openpyxl')
+    wb = openpyxl.Workbook()
+    metadata = wb.active
+    metadata.title = 'Metadata'
+    for row in (['MaterialName', 'Tungsten'],
+                ['DataSource', 'test'],
+                ['Condition', 'annealed'],
+                ['Propertynames', 'Thermal Conductivity', 'Density'],
+                ['Abbreviations', 'k', 'rho']):
+        metadata.append(row)
+    k = wb.create_sheet('k')
+    for row in (['Temperature', 'Thermal Conductivity'], ['C', 'W/m.K'],
+                [20, 170.], [200, 160.], [400, 150.]):
+        k.append(row)
+    rho = wb.create_sheet('rho')
+    for row in (['Temperature', 'Density'], ['C', 'kg/m^3'], [20, 19300.]):
+        rho.append(row)
+    wb.save(filename)
+
+
+def test_xlsx_reads_every_sheet(tmp_path):
+    filename = str(tmp_path / 'tungsten.xlsx')
+    write_workbook(filename)
+    material = read.xlsx(filename)['Tungsten']
+    assert material['Condition'] == 'annealed'
+    assert material.propertynames == ['Thermal Conductivity', 'Density']
+    conductivity = material['Thermal Conductivity']
+    assert conductivity['Temperature']['Values'] == [20, 200, 400]
+    assert conductivity['Temperature']['Units'] == ['C']*3
+    assert conductivity['Thermal Conductivity']['Values'] == \
+        [170., 160., 150.]
+    assert material.get_value('Thermal Conductivity', 110) == 165.
+    assert material['Density']['Density']['Values'] == [19300.]
+
+
+def test_xlsx_dtype(tmp_path):
+    filename = str(tmp_path / 'tungsten.xlsx')
+    write_workbook(filename)
+    material = read.xlsx(filename, dtype='float32')['Tungsten']
+    values = material['Thermal Conductivity']['Thermal Conductivity']['Values']
+    assert values.dtype == np.float32
+    assert list(values) == [170., 160., 150.]
+
+
+def test_csv_reads_several_materials(tmp_path):
+    filename = tmp_path / 'alloys.csv'
+    filename.write_text('Material Name,Copper\n'
+                        'Temperature,Thermal Conductivity,Density\n'
+                        '20,400,8960\n'
+                        '200,390,\n'
+                        '400,380,x\n'
+                        '\n'
+                        'Material Name,Iron\n'
+                        'Temperature,Thermal Conductivity\n'
+                        '20,80\n'
+                        '300,60\n'
+                        'Material Name,Copper\n'
+                        'Temperature,Thermal Conductivity\n'
+                        '20,1\n')
+    materialdata = read.csv(str(filename))
+    assert list(materialdata) == ['Copper', 'Iron']
+    copper = materialdata['Copper']
+    conductivity = copper['Thermal Conductivity']
+    assert conductivity['Values'] == [400., 390., 380.]
+    assert conductivity['Thermal Conductivity']['Values'] == \
+        [400., 390., 380.]
+    assert conductivity['Values'] is not \
+        conductivity['Thermal Conductivity']['Values']
+    assert conductivity['Temperature']['Values'] == [20., 200., 400.]
+    assert copper['Density']['Density']['Values'] == [8960.]
+    assert copper['Density']['Temperature']['Values'] == [20.]
+    assert materialdata['Iron']['Thermal Conductivity']['Values'] == [80., 60.]
+
+    compact = read.csv(str(filename), dtype='float32')
+    values = compact['Iron']['Thermal Conductivity']['Temperature']['Values']
+    assert values.dtype == np.float32
+    assert list(values) == [20., 300.]
+
+
+def test_csv_without_name_row_uses_file_name(tmp_path):
+    filename = tmp_path / 'copper.csv'
+    filename.write_text('Temperature,Thermal Conductivity\n20,400\n200,390\n')
+    assert list(read.csv(str(filename))) == ['copper']
+    assert list(read.csv(str(filename), materialname='Cu')) == ['Cu']
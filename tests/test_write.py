@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""tests for the file writers"""
+import os
+from xml.etree import ElementTree
+
+import pytest
+from conftest import tabulated
+
+from materialtools import MaterialData, read, write
+from materialtools.classes.matml import LazyMaterial
+
+
+def assert_same_material(material, expected):
+    for t in (20., 110., 555.):
+        assert material.get_value('Thermal Conductivity', t) == \
+            pytest.approx(expected.get_value('Thermal Conductivity', t))
+    assert material.get_value('Density', 20.) == \
+        expected.get_value('Density', 20.)
+    assert material.get_value('Elasticity', 300., parameter1="Young's Modulus") \
+        == pytest.approx(expected.get_value('Elasticity', 300.,
+                                            parameter1="Young's Modulus"))
+
+
+@pytest.mark.parametrize('workers', [None, 2])
+def test_xlsx_round_trip(materialdata, tmp_path, workers):
+    pytest.importorskip('openpyxl')
+    results = write.xlsx(materialdata, str(tmp_path), workers=workers)
+    assert [result['material'] for result in results] == \
+        list(materialdata)
+    assert all(result['status'] == 'written' for result in results)
+    for result in results:
+        name = result['material']
+        material = read.xlsx(result['filename'])[name]
+        assert material['Condition'] == 'annealed'
+        assert_same_material(material, materialdata[name])
+
+
+def test_xlsx_reports_failures(materialdata, tmp_path):
+    pytest.importorskip('openpyxl')
+    results = write.xlsx(materialdata, str(tmp_path))
+    for result in results:
+        os.remove(result['filename'])
+        os.mkdir(result['filename'])
+    results = write.xlsx(materialdata, str(tmp_path))
+    assert [result['material'] for result in results] == \
+        list(materialdata)
+    assert all(result['status'] in ('permission denied', 'failed')
+               for result in results)
+    assert all(result['error'] for result in results)
+
+
+def test_matml_summary_counts_encoded_bytes(materialdata, tmp_path):
+    materialdata['Material 0']['Description'] = 'W & co, 5 µm grains'
+    filename = str(tmp_path / 'library.xml')
+    summary = write.matml(materialdata, filename)
+    assert summary['bytes'] == os.path.getsize(filename)
+    assert (summary['materials'], summary['properties'],
+            summary['parameters']) == (3, 15, 33)
+    root = ElementTree.parse(filename).getroot()
+    materials = root.findall('.//Material/BulkDetails')
+    assert [m.findtext('Name') for m in materials] == list(materialdata)
+    assert materials[0].findtext('Description') == 'W & co, 5 µm grains'
+
+
+def test_matml_loads_lazy_materials(matmlfile, tmp_path):
+    materialdata = MaterialData()
+    materialdata.import_file(matmlfile, lazy=True)
+    assert all(type(dict.get(materialdata, name)) is LazyMaterial
+               for name in materialdata)
+    summary = write.matml(materialdata, str(tmp_path / 'copy.xml'))
+    assert summary['materials'] == 3
+    assert summary['parameters'] == 12
+
+
+@pytest.mark.parametrize('extension', ['json', 'jsonl'])
+def test_json_round_trip(materialdata, tmp_path, extension):
+    filename = str(tmp_path / 'library.{}'.format(extension))
+    materialdata.export_file(filename)
+    imported = MaterialData()
+    imported.import_file(filename)
+    assert list(imported) == list(materialdata)
+    for name in materialdata:
+        material = imported[name]
+        assert material.name == materialdata[name].name
+        assert material['Condition'] == 'annealed'
+        assert_same_material(material, materialdata[name])
+    single = getattr(read, extension)(filename, materialname='Material 1')
+    assert list(single) == ['Material 1']
+
+
+def test_jsonl_loads_lazy_materials(matmlfile, tmp_path):
+    materialdata = MaterialData()
+    materialdata.import_file(matmlfile, lazy=True)
+    filename = str(tmp_path / 'library.jsonl')
+    assert write.jsonl(materialdata, filename)['materials'] == 3
+    materials = read.jsonl_iter(filename)
+    key, material = next(materials)
+    assert key == 'Steel 0'
+    assert material.get_value('Thermal Conductivity', 110.) == 39.
+
+
+def matml_ids(filename):
+    """ the ids referenced by the materials and defined in the Metadata """
+    root = ElementTree.parse(filename).getroot()
+    used = {e.get('property') for e in root.iter('PropertyData')} | \
+        {e.get('parameter') for e in root.iter('ParameterValue')}
+    defined = {(e.tag, e.findtext('Name')): e.get('id') for e in root.iter()
+               if e.tag in ('PropertyDetails', 'ParameterDetails')}
+    return used, defined
+
+
+def test_matml_ids_are_stable_and_only_used_ids_are_listed(materialdata,
+                                                           tmp_path):
+    idfile = str(tmp_path / 'ids.json')
+    materialdata['Material 2']['Melting Point'] = tabulated(
+        'Melting Point', [20.], [3422.], 'C')
+    write.matml(materialdata, str(tmp_path / 'first.xml'), ids=idfile)
+    used, first = matml_ids(str(tmp_path / 'first.xml'))
+    assert set(first.values()) == used
+    assert ('PropertyDetails', 'Melting Point') in first
+
+    del materialdata['Material 2']
+    write.matml(materialdata, str(tmp_path / 'second.xml'), ids=idfile)
+    used, second = matml_ids(str(tmp_path / 'second.xml'))
+    assert set(second.values()) == used
+    assert ('PropertyDetails', 'Melting Point') not in second
+    assert all(first[key] == pid for key, pid in second.items())